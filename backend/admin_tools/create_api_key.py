@@ -12,15 +12,24 @@ def add_api_key_to_firestore(
     key: str,
     digital_human_id: str,
     key_id: str,
-    name: str
+    name: str,
+    course_id: str = None,
+    presenter_id: str = None
 ) -> None:
     db = firestore.Client(project=project_id, database="langbridge")
     api_key_ref = db.collection('ApiKey').document(key)
-    api_key_ref.set({
+    data = {
         'digital_human_id': digital_human_id,
         'key_id': key_id,
         'name': name
-    })
+    }
+    # Optional routing context: requests made with this key default to
+    # this course / presenter (see functions/*/api_key_registry.py)
+    if course_id:
+        data['course_id'] = course_id
+    if presenter_id:
+        data['presenter_id'] = presenter_id
+    api_key_ref.set(data)
 
 
 def create_api_key(project_id: str, key_id: str, name: str) -> Key:
@@ -114,9 +123,11 @@ if __name__ == "__main__":
     if len(sys.argv) >= 3:
         digital_human_id = sys.argv[1]
         digital_human_name = sys.argv[2]
+        course_id = sys.argv[3] if len(sys.argv) >= 4 else None
+        presenter_id = sys.argv[4] if len(sys.argv) >= 5 else None
     else:
-        print("Usage: python create_api_key.py <digital_human_id> <name>")
-        print("Example: python create_api_key.py 123456789 'John Doe'")
+        print("Usage: python create_api_key.py <digital_human_id> <name> [course_id] [presenter_id]")
+        print("Example: python create_api_key.py 123456789 'John Doe' demo cyrus")
         sys.exit(1)
 
     # Create the API key
@@ -134,7 +145,9 @@ if __name__ == "__main__":
         key.key_string,
         digital_human_id,
         key.uid,
-        digital_human_name
+        digital_human_name,
+        course_id,
+        presenter_id
     )
 
     print("\nAPI Key created successfully!")
@@ -152,6 +165,8 @@ if __name__ == "__main__":
         "digital_human_name": digital_human_name,
         "key_id": key.uid,
         "key_string": key.key_string,
+        "course_id": course_id,
+        "presenter_id": presenter_id,
         "created_at": timestamp,
         "project_id": project_id
     }
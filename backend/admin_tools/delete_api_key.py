@@ -1,35 +1,103 @@
-
 """
-Delete or undelete an API key from a hardcoded list for authentication only.
-No Google Cloud logic.
+Revoke (or restore) an API key created by create_api_key.py.
+
+The key's ``ApiKey`` document is marked ``revoked`` rather than deleted, so
+it can be restored and keeps its digital human / course mapping. The
+functions hold the registry in memory and apply the change as soon as
+their listener delivers it (typically within seconds; at most
+API_KEY_CACHE_TTL seconds on instances whose listener is down).
+
+The Google Cloud API key itself is deleted as well (or undeleted on
+restore; deleted keys can be restored for 30 days). Use --firestore-only
+to leave it alone.
+
+Usage:
+  python delete_api_key.py <api_key_string>
+  python delete_api_key.py <api_key_string> --undelete
+  python delete_api_key.py <api_key_string> --purge   # remove the document
 """
 
-VALID_API_KEYS = [
-    {"student_id": "1", "name": "Alice", "key": "key1"},
-    {"student_id": "2", "name": "Bob", "key": "key2"},
-    {"student_id": "3", "name": "Charlie", "key": "key3"}
-]
+import argparse
+import sys
 
+from google.cloud import api_keys_v2
+from google.cloud import firestore
+from config import project_id
 
-def delete_key(key):
-    global VALID_API_KEYS
-    before = len(VALID_API_KEYS)
-    VALID_API_KEYS = [k for k in VALID_API_KEYS if k["key"] != key]
-    after = len(VALID_API_KEYS)
-    print(f"Deleted key {key}. Keys before: {before}, after: {after}")
 
+def _get_db():
+    return firestore.Client(project=project_id, database="langbridge")
 
-def undelete_key(student_id, name, key):
-    global VALID_API_KEYS
-    VALID_API_KEYS.append({"student_id": student_id, "name": name, "key": key})
-    print(f"Undeleted key {key} for {name} (student_id: {student_id})")
 
+def set_revoked(key: str, revoked: bool) -> dict:
+    """Mark the key's registry document revoked (or active); return its data."""
+    doc_ref = _get_db().collection('ApiKey').document(key)
+    doc = doc_ref.get()
+    if not doc.exists:
+        raise KeyError("API key not found in the ApiKey collection")
+    doc_ref.update({
+        'revoked': revoked,
+        'revoked_at': firestore.SERVER_TIMESTAMP if revoked else firestore.DELETE_FIELD,
+    })
+    return doc.to_dict()
 
-if __name__ == "__main__":
-    # Example usage
-    delete_key("key1")
-    undelete_key("1", "Alice", "key1")
+
+def purge_key(key: str) -> dict:
+    """Delete the key's registry document; return its last data."""
+    doc_ref = _get_db().collection('ApiKey').document(key)
+    doc = doc_ref.get()
+    if not doc.exists:
+        raise KeyError("API key not found in the ApiKey collection")
+    doc_ref.delete()
+    return doc.to_dict()
+
+
+def _key_name(key_id: str) -> str:
+    return f"projects/{project_id}/locations/global/keys/{key_id}"
+
+
+def delete_cloud_key(key_id: str) -> None:
+    client = api_keys_v2.ApiKeysClient()
+    client.delete_key(request=api_keys_v2.DeleteKeyRequest(name=_key_name(key_id))).result()
+    print(f"Deleted Cloud API key {_key_name(key_id)}")
+
+
+def undelete_cloud_key(key_id: str) -> None:
+    client = api_keys_v2.ApiKeysClient()
+    client.undelete_key(request=api_keys_v2.UndeleteKeyRequest(name=_key_name(key_id))).result()
+    print(f"Undeleted Cloud API key {_key_name(key_id)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Revoke or restore an API key.")
+    parser.add_argument("key", help="The API key string (as printed by create_api_key.py).")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--undelete", action="store_true", help="Restore a revoked key.")
+    group.add_argument("--purge", action="store_true", help="Delete the registry document.")
+    parser.add_argument("--firestore-only", action="store_true",
+                        help="Do not delete/undelete the Google Cloud API key.")
+    args = parser.parse_args()
+
+    try:
+        if args.purge:
+            data = purge_key(args.key)
+        else:
+            data = set_revoked(args.key, not args.undelete)
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+        sys.exit(1)
+
+    action = "Restored" if args.undelete else "Purged" if args.purge else "Revoked"
+    print(f"{action} API key for digital human {data.get('digital_human_id')} ({data.get('name')})")
+
+    key_id = data.get('key_id')
+    if args.firestore_only or not key_id:
+        return
+    if args.undelete:
+        undelete_cloud_key(key_id)
+    else:
+        delete_cloud_key(key_id)
 
 
 if __name__ == "__main__":
-    undelete_key(name="projects/310301685106/locations/global/keys/studentid-12345678")
\ No newline at end of file
+    main()
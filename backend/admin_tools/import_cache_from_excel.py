@@ -3,8 +3,12 @@
 Import presentation cache from Excel for a specific course.
 Updates Firestore and regenerates speech files if messages have changed.
 
+Changed messages are synthesized as one bulk TTS batch with a resumable
+job journal, so re-running a partially failed import only retries the
+rows that failed.
+
 Usage:
-  python import_cache_from_excel.py --course-id MY_COURSE --file my_course_cache.xlsx
+  python import_cache_from_excel.py --course-id MY_COURSE --file my_course_cache.xlsx [--workers 8]
 """
 
 import argparse
@@ -40,7 +44,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def import_from_excel(course_id: str, input_file: str):
+def import_from_excel(course_id: str, input_file: str, journal_path: str = None, max_workers: int = 8):
     """Import cache entries from Excel and update Firestore/TTS."""
     
     if not os.path.exists(input_file):
@@ -82,10 +86,13 @@ def import_from_excel(course_id: str, input_file: str):
 
     logger.info(f"Processing {len(df)} rows for course '{course_id}'...")
 
+    # Pass 1: find the rows whose message changed
+    changed = {}
+    jobs = []
+    voices = {}
     for index, row in df.iterrows():
         cache_key = row.get("Cache Key (Do Not Edit)")
         new_message = row.get("Generated Message (Edit this)")
-        context = row.get("Speaker Notes (Context)")
         language = row.get("Language")
         
         if pd.isna(cache_key) or not cache_key:
@@ -113,29 +120,50 @@ def import_from_excel(course_id: str, input_file: str):
             skipped_count += 1
             continue
             
-        logger.info(f"Row {index+2}: Message changed for {cache_key}. Updating...")
-        
+        logger.info(f"Row {index+2}: Message changed for {cache_key}.")
+        if language not in voices:
+            voices[language] = course_utils.get_voice_params(course_id, language)
+        changed[cache_key] = (index, doc_ref, new_message)
+        jobs.append(tts_utils.TtsJob(
+            job_id=cache_key,
+            text=new_message,
+            language_code=language,
+            voice=voices[language],
+        ))
+
+    # Pass 2: synthesize every changed message in one batch. File names are
+    # content-addressed on the new message, so old clips stay untouched and
+    # identical audio is reused. The journal makes a re-run retry only the
+    # rows that failed.
+    journal_path = journal_path or f"{input_file}.tts-journal.jsonl"
+    results = tts_utils.synthesize_batch(
+        jobs,
+        bucket_name,
+        journal_path=journal_path,
+        max_workers=max_workers,
+    ) if jobs else {}
+
+    # Pass 3: update Firestore for every clip that is ready
+    for cache_key, (index, doc_ref, new_message) in changed.items():
+        result = results.get(cache_key, {})
+        if result.get("status") != "done":
+            logger.error(f"Failed to update row {index+2} ({cache_key}): {result.get('error')}")
+            error_count += 1
+            continue
         try:
-            # 1. Regenerate Audio
-            voice_params = course_utils.get_voice_params(course_id, language)
-            
-            # Use tts_utils to generate and upload speech
-            # This uses the same filename generation logic (based on context hash)
-            # so it overwrites the old file in the bucket.
-            filename = tts_utils.generate_speech_file(
-                bucket_name=bucket_name,
-                message=new_message,
-                language_code=language,
-                context=context,
-                voice_params=voice_params
-            )
+            variants = result["variants"]
+            filename = variants["mp3"]
             
             new_audio_url = f"https://storage.googleapis.com/{bucket_name}/{filename}"
+            audio_variants = {
+                fmt: f"https://storage.googleapis.com/{bucket_name}/{name}"
+                for fmt, name in variants.items()
+            }
             
-            # 2. Update Firestore
             update_data = {
                 "message": new_message,
                 "audio_url": new_audio_url,
+                "audio_variants": audio_variants,
                 "updated_at": firestore.SERVER_TIMESTAMP
             }
             doc_ref.update(update_data)
@@ -152,15 +180,19 @@ def import_from_excel(course_id: str, input_file: str):
     logger.info(f"Updated: {updated_count}")
     logger.info(f"Skipped (Unchanged): {skipped_count}")
     logger.info(f"Errors: {error_count}")
+    if error_count and jobs:
+        logger.info(f"Re-run to retry failures; finished clips are in {journal_path}")
 
 def main():
     parser = argparse.ArgumentParser(description="Import presentation cache from Excel.")
     parser.add_argument("--course-id", required=True, help="Course ID (for voice config).")
     parser.add_argument("--file", required=True, help="Input Excel file path.")
+    parser.add_argument("--journal", help="TTS job journal (default: <file>.tts-journal.jsonl).")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent TTS jobs.")
     
     args = parser.parse_args()
     
-    import_from_excel(args.course_id, args.file)
+    import_from_excel(args.course_id, args.file, journal_path=args.journal, max_workers=args.workers)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Incremental lecture analytics from the presentation event log.
+
+The config function logs a ``slide_change`` event (presentation, page,
+languages, client_timestamp) to ``courses/{id}/logs`` for every live slide.
+This tool folds those events into rollup documents so questions like "how
+long did we spend on each slide" never need a scan of the raw log:
+
+  courses/{id}/analytics/summary                      course totals, language usage, watermark
+  courses/{id}/analytics/summary/presentations/{pid}  per-slide dwell time and change counts
+
+A slide's dwell time is the time until the next slide change; gaps longer
+than ``--max-dwell`` are taken as the end of the lecture and not counted.
+The slide that is still open is carried in the summary and closed by the
+next run.
+
+Runs are incremental: the summary keeps a watermark (the last processed
+client_timestamp and the IDs of the events at that instant), so a re-run
+only reads newer events. Events younger than ``--settle`` seconds are left
+for the next run, because buffered loggers may still be writing events
+with earlier timestamps. Each presentation rollup carries the watermark it
+was saved with as well, so when a save fails part-way the re-run does not
+fold the same events into presentations that were already written.
+
+Usage:
+  python lecture_analytics.py update --course demo
+  python lecture_analytics.py update --all
+  python lecture_analytics.py show --course demo [--presentation lecture1] [--top 10]
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import sys
+
+try:
+    import config
+except ImportError:
+    from admin_tools import config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(levelname)s:%(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+ANALYTICS_COLLECTION = "analytics"
+SUMMARY_DOCUMENT = "summary"
+PRESENTATIONS_COLLECTION = "presentations"
+DEFAULT_MAX_DWELL_SECONDS = 30 * 60
+DEFAULT_SETTLE_SECONDS = 60
+PAGE_SIZE = 1000
+BATCH_SIZE = 500
+
+
+def _get_db():
+    from google.cloud import firestore
+
+    db_name = os.environ.get("FIRESTORE_DATABASE", "langbridge").strip() or "langbridge"
+    return firestore.Client(project=getattr(config, 'project_id', None), database=db_name)
+
+
+def _seconds(value) -> float:
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    return float(value)
+
+
+class CourseRollup:
+    """Rollup state of one course; ``apply`` folds in events in time order."""
+
+    def __init__(self, summary=None, presentations=None, max_dwell_seconds=DEFAULT_MAX_DWELL_SECONDS):
+        summary = dict(summary or {})
+        summary.setdefault("events", 0)
+        summary.setdefault("skipped_events", 0)
+        summary.setdefault("slide_changes", 0)
+        summary.setdefault("dwell_seconds", 0.0)
+        summary.setdefault("languages", {})
+        summary.setdefault("watermark", None)
+        summary.setdefault("watermark_ids", [])
+        summary.setdefault("open_slide", None)
+        self.summary = summary
+        self.presentations = presentations or {}
+        self.max_dwell_seconds = max_dwell_seconds
+        self.changed = set()
+        self._event = None
+
+    def _already_applied(self, presentation) -> bool:
+        """True if ``presentation`` was saved with the current event folded in."""
+        through = presentation.get("watermark")
+        if through is None or self._event is None:
+            return False
+        timestamp, event_id = self._event
+        if _seconds(timestamp) != _seconds(through):
+            return _seconds(timestamp) < _seconds(through)
+        return event_id in presentation.get("watermark_ids", [])
+
+    def _presentation(self, presentation_id):
+        presentation = self.presentations.get(presentation_id)
+        if presentation is not None and self._already_applied(presentation):
+            # Left over from a partial save: update a throwaway copy instead
+            return {"slide_changes": 0, "dwell_seconds": 0.0, "languages": {}, "slides": {}}
+        if presentation is None:
+            self.presentations[presentation_id] = {
+                "presentation_id": presentation_id,
+                "slide_changes": 0,
+                "dwell_seconds": 0.0,
+                "languages": {},
+                "slides": {},
+            }
+        self.changed.add(presentation_id)
+        return self.presentations[presentation_id]
+
+    def _slide(self, presentation_id, page):
+        slides = self._presentation(presentation_id)["slides"]
+        return slides.setdefault(page, {"dwell_seconds": 0.0, "changes": 0})
+
+    def _close_open_slide(self, at: float):
+        open_slide = self.summary["open_slide"]
+        if not open_slide:
+            return
+        dwell = at - _seconds(open_slide["at"])
+        if 0 < dwell <= self.max_dwell_seconds:
+            self._slide(open_slide["presentation_id"], open_slide["page"])["dwell_seconds"] += dwell
+            self._presentation(open_slide["presentation_id"])["dwell_seconds"] += dwell
+            self.summary["dwell_seconds"] += dwell
+
+    def apply(self, event_id: str, event: dict):
+        """Fold one event in; events must arrive in (client_timestamp, id) order."""
+        timestamp = event.get("client_timestamp")
+        self._event = (timestamp, event_id)
+        self.summary["events"] += 1
+        if timestamp != self.summary["watermark"]:
+            self.summary["watermark"] = timestamp
+            self.summary["watermark_ids"] = []
+        self.summary["watermark_ids"].append(event_id)
+
+        presentation_id = event.get("presentation_id")
+        page = event.get("page_number")
+        if event.get("type") != "slide_change" or presentation_id is None or page is None:
+            self.summary["skipped_events"] += 1
+            return
+
+        at = _seconds(timestamp)
+        page = str(page)
+        self._close_open_slide(at)
+        open_slide = self.summary["open_slide"]
+        same_slide = open_slide and open_slide["presentation_id"] == presentation_id \
+            and open_slide["page"] == page
+        if not same_slide:
+            # A re-broadcast of the open slide is not a slide change
+            self._slide(presentation_id, page)["changes"] += 1
+            self._presentation(presentation_id)["slide_changes"] += 1
+            self.summary["slide_changes"] += 1
+        presentation = self._presentation(presentation_id)
+        for language in event.get("languages") or []:
+            presentation["languages"][language] = presentation["languages"].get(language, 0) + 1
+            self.summary["languages"][language] = self.summary["languages"].get(language, 0) + 1
+        self.summary["open_slide"] = {"presentation_id": presentation_id, "page": page, "at": timestamp}
+
+
+def _analytics_ref(db, course_id):
+    return db.collection('courses').document(course_id).collection(ANALYTICS_COLLECTION).document(SUMMARY_DOCUMENT)
+
+
+def fetch_events(db, course_id, watermark, watermark_ids, settle_before, page_size=PAGE_SIZE):
+    """Yield (id, event) newer than the watermark and older than ``settle_before``.
+
+    Ordered by client_timestamp, then document ID (Firestore's implicit tie-break).
+    """
+    seen = set(watermark_ids or [])
+    query = db.collection('courses').document(course_id).collection('logs') \
+        .where('client_timestamp', '<', settle_before)
+    if watermark is not None:
+        query = query.where('client_timestamp', '>=', watermark)
+    query = query.order_by('client_timestamp')
+    last = None
+    while True:
+        page = query.start_after(last).limit(page_size) if last else query.limit(page_size)
+        docs = list(page.stream())
+        for doc in docs:
+            if doc.id not in seen:
+                yield doc.id, doc.to_dict()
+        if len(docs) < page_size:
+            return
+        last = docs[-1]
+
+
+def load_rollup(db, course_id, max_dwell_seconds=DEFAULT_MAX_DWELL_SECONDS) -> CourseRollup:
+    summary_ref = _analytics_ref(db, course_id)
+    summary = summary_ref.get()
+    if not summary.exists:
+        return CourseRollup(max_dwell_seconds=max_dwell_seconds)
+    presentations = {
+        doc.id: doc.to_dict() for doc in summary_ref.collection(PRESENTATIONS_COLLECTION).stream()
+    }
+    return CourseRollup(summary.to_dict(), presentations, max_dwell_seconds)
+
+
+def save_rollup(db, course_id, rollup: CourseRollup):
+    """Write the summary and every changed presentation rollup (batches of 500)."""
+    summary_ref = _analytics_ref(db, course_id)
+    for pid in rollup.changed:
+        rollup.presentations[pid]["watermark"] = rollup.summary["watermark"]
+        rollup.presentations[pid]["watermark_ids"] = list(rollup.summary["watermark_ids"])
+    writes = [(summary_ref, rollup.summary)] + [
+        (summary_ref.collection(PRESENTATIONS_COLLECTION).document(pid), rollup.presentations[pid])
+        for pid in sorted(rollup.changed)
+    ]
+    # The summary goes last. If a later batch fails, the next run starts from
+    # the old summary watermark again; presentations already written skip the
+    # events their own watermark covers instead of counting them twice.
+    writes.append(writes.pop(0))
+    for start in range(0, len(writes), BATCH_SIZE):
+        batch = db.batch()
+        for ref, data in writes[start:start + BATCH_SIZE]:
+            batch.set(ref, data)
+        batch.commit()
+
+
+def update_course(db, course_id, settle_seconds=DEFAULT_SETTLE_SECONDS,
+                  max_dwell_seconds=DEFAULT_MAX_DWELL_SECONDS, now=None, fetch=fetch_events) -> int:
+    """Fold the course's new events into its rollups; return how many were processed."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    settle_before = now - datetime.timedelta(seconds=settle_seconds)
+    rollup = load_rollup(db, course_id, max_dwell_seconds)
+    processed = 0
+    for event_id, event in fetch(db, course_id, rollup.summary["watermark"],
+                                 rollup.summary["watermark_ids"], settle_before):
+        rollup.apply(event_id, event)
+        processed += 1
+    if processed:
+        rollup.summary["updated_at"] = now
+        save_rollup(db, course_id, rollup)
+    return processed
+
+
+def show(db, course_id, presentation_id=None, top=10):
+    summary_ref = _analytics_ref(db, course_id)
+    summary = summary_ref.get()
+    if not summary.exists:
+        print(f"No analytics for course {course_id} (run: lecture_analytics.py update --course {course_id})")
+        return
+    data = summary.to_dict()
+    print(f"Course {course_id}: {data['slide_changes']} slide changes, "
+          f"{data['dwell_seconds'] / 60:.1f} min on slides, {data['events']} events "
+          f"(up to {data.get('watermark')})")
+    print("Language usage:")
+    for language, count in sorted(data["languages"].items(), key=lambda item: -item[1]):
+        print(f"  {language:<10} {count:>8}")
+
+    presentations = summary_ref.collection(PRESENTATIONS_COLLECTION)
+    docs = [presentations.document(presentation_id).get()] if presentation_id else list(presentations.stream())
+    for doc in docs:
+        if not doc.exists:
+            print(f"No analytics for presentation {presentation_id}")
+            continue
+        p = doc.to_dict()
+        print(f"\nPresentation {doc.id}: {p['slide_changes']} changes, {p['dwell_seconds'] / 60:.1f} min")
+        slides = sorted(p["slides"].items(), key=lambda item: -item[1]["dwell_seconds"])
+        print(f"  {'slide':>6} {'dwell (s)':>10} {'changes':>8}")
+        for page, stats in slides[:top]:
+            print(f"  {page:>6} {stats['dwell_seconds']:>10.1f} {stats['changes']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lecture analytics rollups from presentation events.")
+    subparsers = parser.add_subparsers(dest='command', help='Command to execute')
+
+    parser_update = subparsers.add_parser('update', help='Fold new events into the rollups')
+    target = parser_update.add_mutually_exclusive_group(required=True)
+    target.add_argument('--course', help='Course ID')
+    target.add_argument('--all', action='store_true', help='Every course')
+    parser_update.add_argument('--settle', type=float, default=DEFAULT_SETTLE_SECONDS,
+                               help='Leave events younger than this many seconds for the next run.')
+    parser_update.add_argument('--max-dwell', type=float, default=DEFAULT_MAX_DWELL_SECONDS,
+                               help='Longer gaps between slide changes end the lecture.')
+
+    parser_show = subparsers.add_parser('show', help='Print the rollups of a course')
+    parser_show.add_argument('--course', required=True, help='Course ID')
+    parser_show.add_argument('--presentation', help='Only this presentation')
+    parser_show.add_argument('--top', type=int, default=10, help='Slides to list per presentation')
+
+    args = parser.parse_args()
+    if args.command is None:
+        parser.print_help()
+        return
+
+    db = _get_db()
+    if args.command == 'update':
+        courses = [doc.id for doc in db.collection('courses').stream()] if args.all else [args.course]
+        for course_id in courses:
+            processed = update_course(db, course_id, args.settle, args.max_dwell)
+            logger.info(f"{course_id}: {processed} new events")
+    else:
+        show(db, args.course, args.presentation, args.top)
+
+
+if __name__ == "__main__":
+    main()
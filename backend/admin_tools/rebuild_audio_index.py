@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Rebuild the speech audio index (langbridge_audio_index) from a bucket scan.
+
+Every clip uploaded through the index carries its key in the object
+metadata, so the Firestore index can be restored from list_blobs alone.
+
+Usage:
+  python rebuild_audio_index.py [--bucket BUCKET] [--prefix speech_]
+"""
+
+import argparse
+import logging
+import os
+import sys
+from google.cloud import firestore, storage
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../functions/config')))
+import audio_index
+
+try:
+    import config
+except ImportError:
+    from admin_tools import config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(levelname)s:%(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+
+def rebuild(bucket_name: str, prefix: str):
+    project_id = getattr(config, 'project_id', None)
+    db = firestore.Client(project=project_id, database="langbridge")
+    bucket = storage.Client(project=project_id).bucket(bucket_name)
+
+    index = audio_index.AudioIndex(db=db)
+    logger.info(f"Scanning gs://{bucket_name}/{prefix}* ...")
+    indexed, skipped = index.bootstrap_from_bucket(bucket, prefix=prefix)
+    logger.info(f"Indexed: {indexed}")
+    logger.info(f"Skipped (no key metadata): {skipped}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the audio index from the speech bucket.")
+    parser.add_argument("--bucket", default=getattr(config, 'speech_file_bucket', None),
+                        help="Speech bucket (default: speech_file_bucket from config.py).")
+    parser.add_argument("--prefix", default="speech_", help="Object name prefix to scan.")
+    args = parser.parse_args()
+
+    if not args.bucket:
+        logger.error("No bucket given and speech_file_bucket not defined in config.py")
+        sys.exit(1)
+
+    rebuild(args.bucket, args.prefix)
+
+
+if __name__ == "__main__":
+    main()
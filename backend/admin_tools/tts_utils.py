@@ -1,69 +1,43 @@
 import hashlib
+import json
 import logging
-import re
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from google.cloud import texttospeech, storage
 
+# Shared audio addressing lives with the function code in functions/config
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../functions/config')))
+import audio_index
+from utils import sanitize_text_for_tts
+
 logger = logging.getLogger(__name__)
 
-def _normalize_context(context: str) -> str:
-    """Normalize context by trimming and collapsing whitespace."""
-    if not context:
-        return ""
-    # Collapse all whitespace runs to a single space and strip ends
-    return " ".join(str(context).split())
-
-def _sanitize_text_for_tts(text: str, max_length: int = 5000) -> str:
-    """Clean and prepare text for Google TTS API.
-    
-    Args:
-        text: Input text to sanitize
-        max_length: Maximum character length for TTS input
-        
-    Returns:
-        Sanitized text safe for TTS API
-    """
-    if not text:
-        return ""
-    
-    # Remove or replace problematic characters
-    # Remove special unicode characters that TTS doesn't handle well
-    text = text.replace('⟪', '')
-    text = text.replace('⧸', '/')
-    text = text.replace('⟫', '')
-    
-    # Remove control characters except common whitespace
-    text = re.sub(r'[\x00-\x08\x0b-\x0c\x0e-\x1f\x7f-\x9f]', '', text)
-    
-    # Normalize whitespace
-    text = ' '.join(text.split())
-    
-    # Ensure sentences end with proper punctuation
-    # Split very long sentences at natural break points
-    if len(text) > max_length:
-        # Try to split at sentence boundaries
-        sentences = re.split(r'([.!?。！？])\s*', text)
-        result = []
-        current_chunk = ""
-        
-        for i in range(0, len(sentences), 2):
-            sentence = sentences[i]
-            punct = sentences[i + 1] if i + 1 < len(sentences) else ""
-            
-            # If adding this sentence would exceed max, start new chunk
-            if len(current_chunk) + len(sentence) + len(punct) > max_length:
-                if current_chunk:
-                    result.append(current_chunk.strip())
-                current_chunk = sentence + punct
-            else:
-                current_chunk += sentence + punct
-        
-        if current_chunk:
-            result.append(current_chunk.strip())
-        
-        # Return first chunk only (or consider limiting message generation)
-        text = result[0] if result else text[:max_length]
-    
-    return text.strip()
+# Clients are created once and shared by every clip in this process
+_tts_client = None
+_storage_client = None
+_clients_lock = threading.Lock()
+
+
+def _get_tts_client():
+    global _tts_client
+    with _clients_lock:
+        if _tts_client is None:
+            _tts_client = texttospeech.TextToSpeechClient()
+        return _tts_client
+
+
+def _get_storage_client():
+    global _storage_client
+    with _clients_lock:
+        if _storage_client is None:
+            _storage_client = storage.Client()
+        return _storage_client
+
 
 def generate_speech_file(
     bucket_name: str,
@@ -73,63 +47,202 @@ def generate_speech_file(
     voice_params: texttospeech.VoiceSelectionParams = None
 ) -> str:
     """Generate speech file and upload to bucket.
-    
+
+    The file name is content-addressed on (voice, speaking rate, encoding,
+    sanitized message) through the shared audio index, so an edited message
+    gets a new object instead of overwriting the old one, and a message that
+    was already synthesized for any course is reused as is. ``context`` is
+    kept for callers but no longer affects the file name.
+
     Returns:
         Filename of uploaded speech file
     """
-    tts_client = texttospeech.TextToSpeechClient()
-    storage_client = storage.Client()
-    
-    # Generate stable filename from CONTEXT hash (not message content)
-    # This ensures same context always gets same filename
-    norm_ctx = _normalize_context(context)
-    content_hash = hashlib.sha256(
-        norm_ctx.encode("utf-8")
-    ).hexdigest()[:12]
-    filename = f"speech_{language_code}_{content_hash}.mp3"
-    
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(filename)
-    
-    # Note: We deliberately DO NOT skip if the file exists, 
-    # because the user might have changed the message content (but not context).
-    # In the import flow, we want to overwrite the existing audio file 
-    # with the new message content.
-    
-    # Determine voice params if not provided
-    if not voice_params:
-        if language_code.startswith("en"):
-            voice_language = "en-US"
-        elif language_code.startswith("zh"):
-            voice_language = "zh-CN"
-        else:
-            voice_language = "en-US"
-            
-        voice_params = texttospeech.VoiceSelectionParams(
-            language_code=voice_language,
-            ssml_gender=texttospeech.SsmlVoiceGender.FEMALE
-        )
-    
-    # Sanitize text for TTS
-    clean_message = _sanitize_text_for_tts(message)
-    if clean_message != message:
-        logger.info("Text sanitized for TTS (removed %d chars)", len(message) - len(clean_message))
-    
-    synthesis_input = texttospeech.SynthesisInput(text=clean_message)
-    audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.MP3,
-        speaking_rate=1.0
+    filename, created = audio_index.ensure_audio(
+        _clean_message(message),
+        voice_params or _default_voice(language_code),
+        _get_storage_client().bucket(bucket_name),
+        _get_tts_client(),
+        language_code,
     )
-    
-    tts_response = tts_client.synthesize_speech(
-        input=synthesis_input,
-        voice=voice_params,
-        audio_config=audio_config
+    if created:
+        logger.info("Generated speech file: %s", filename)
+    else:
+        logger.info("Reusing existing speech file: %s", filename)
+    return filename
+
+
+def generate_speech_variants(
+    bucket_name: str,
+    message: str,
+    language_code: str,
+    voice_params: texttospeech.VoiceSelectionParams = None,
+    formats=None,
+) -> dict:
+    """Generate every audio variant (MP3, Opus, ...) of a message.
+
+    Returns:
+        Dict of format name to uploaded filename
+    """
+    variants = audio_index.ensure_audio_variants(
+        _clean_message(message),
+        voice_params or _default_voice(language_code),
+        _get_storage_client().bucket(bucket_name),
+        _get_tts_client(),
+        language_code,
+        formats=formats,
     )
-    
-    blob.upload_from_string(
-        tts_response.audio_content,
-        content_type="audio/mpeg"
+    logger.info("Speech variants: %s", variants)
+    return variants
+
+
+@dataclass
+class TtsJob:
+    """One clip to synthesize. ``job_id`` names the target (e.g. a cache key)."""
+    job_id: str
+    text: str
+    language_code: str
+    voice: texttospeech.VoiceSelectionParams = None
+
+    def fingerprint(self) -> str:
+        """Changes whenever the job would produce different audio."""
+        voice = self.voice or _default_voice(self.language_code)
+        payload = "\n".join([audio_index.voice_id(voice), self.language_code, self.text])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class JobJournal:
+    """Append-only JSON-lines record of finished jobs.
+
+    Re-running a batch with the same journal skips every job whose last
+    entry is ``done`` for the same fingerprint, so only failures (and jobs
+    whose text changed) are retried.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A crash can leave a truncated last line
+                        continue
+                    self._entries[entry["job_id"]] = entry
+
+    def completed(self, job: TtsJob):
+        entry = self._entries.get(job.job_id)
+        if entry and entry.get("status") == "done" and entry.get("fingerprint") == job.fingerprint():
+            return entry
+        return None
+
+    def record(self, job: TtsJob, **fields):
+        entry = {"job_id": job.job_id, "fingerprint": job.fingerprint(), **fields}
+        with self._lock:
+            self._entries[job.job_id] = entry
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return entry
+
+
+def _is_quota_error(error) -> bool:
+    # google.api_core.exceptions.ResourceExhausted / TooManyRequests (429),
+    # ServiceUnavailable (503)
+    return getattr(error, "code", None) in (429, 503) or type(error).__name__ in (
+        "ResourceExhausted", "TooManyRequests", "ServiceUnavailable"
     )
-    logger.info("Generated speech file: %s", filename)
-    return filename
+
+
+def synthesize_batch(
+    jobs,
+    bucket_name: str,
+    journal_path: str = None,
+    max_workers: int = 8,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    formats=None,
+    tts_client=None,
+    storage_client=None,
+    index=None,
+) -> dict:
+    """Synthesize many clips with shared clients and bounded concurrency.
+
+    Quota errors are retried with exponential backoff and jitter; any other
+    error fails the job. Every finished job is appended to the journal at
+    ``journal_path``, and jobs already ``done`` there are not run again.
+
+    Returns:
+        Dict of job_id to journal entry: ``{"status": "done", "variants":
+        {format: filename}}`` or ``{"status": "failed", "error": str}``.
+    """
+    journal = JobJournal(journal_path)
+    tts_client = tts_client or _get_tts_client()
+    bucket = (storage_client or _get_storage_client()).bucket(bucket_name)
+
+    results = {}
+    pending = []
+    for job in jobs:
+        entry = journal.completed(job)
+        if entry:
+            results[job.job_id] = entry
+        else:
+            pending.append(job)
+    if results:
+        logger.info("Journal: %d of %d jobs already done", len(results), len(results) + len(pending))
+
+    def _run(job):
+        text = _clean_message(job.text)
+        voice = job.voice or _default_voice(job.language_code)
+        for attempt in range(max_retries + 1):
+            try:
+                variants = audio_index.ensure_audio_variants(
+                    text, voice, bucket, tts_client, job.language_code,
+                    formats=formats, index=index,
+                )
+                return journal.record(job, status="done", variants=variants)
+            except Exception as e:
+                if not _is_quota_error(e) or attempt == max_retries:
+                    logger.error("Job %s failed: %s", job.job_id, e)
+                    return journal.record(job, status="failed", error=str(e))
+                delay = min(max_delay, base_delay * (2 ** attempt))
+                delay += random.uniform(0, delay / 2)
+                logger.warning("Quota error on %s; retrying in %.1fs", job.job_id, delay)
+                time.sleep(delay)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as executor:
+            futures = {executor.submit(_run, job): job for job in pending}
+            for future in as_completed(futures):
+                results[futures[future].job_id] = future.result()
+
+    failed = sum(1 for entry in results.values() if entry["status"] != "done")
+    logger.info("Batch finished: %d done, %d failed", len(results) - failed, failed)
+    return results
+
+
+def _default_voice(language_code: str) -> texttospeech.VoiceSelectionParams:
+    if language_code.startswith("en"):
+        voice_language = "en-US"
+    elif language_code.startswith("zh"):
+        voice_language = "zh-CN"
+    else:
+        voice_language = "en-US"
+
+    return texttospeech.VoiceSelectionParams(
+        language_code=voice_language,
+        ssml_gender=texttospeech.SsmlVoiceGender.FEMALE
+    )
+
+
+def _clean_message(message: str) -> str:
+    clean_message = sanitize_text_for_tts(message)
+    if clean_message != message:
+        logger.info("Text sanitized for TTS (removed %d chars)", len(message) - len(clean_message))
+    return clean_message
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Per-course usage totals for billing.
+
+The config, speech and talk-stream functions count requests, slide
+changes, TTS characters and LLM calls per course and day in sharded
+counters (see functions/speech/usage_counters.py):
+
+  courses/{id}/usage/{YYYY-MM-DD}/shards/{n}
+
+This tool sums the shards of every day in a range. Counters are flushed
+by each instance every ``USAGE_FLUSH_SECONDS`` (default 10s), so today's
+totals trail live traffic by about that much.
+
+Usage:
+  python usage_report.py --course demo --start 2026-03-01 --end 2026-03-31
+  python usage_report.py --all --start 2026-03-01 --end 2026-03-31 [--daily]
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import sys
+
+try:
+    import config
+except ImportError:
+    from admin_tools import config
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../functions/speech')))
+from usage_counters import read_usage
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(levelname)s:%(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+METRICS = ["requests", "slide_changes", "tts_chars", "llm_calls"]
+
+
+def _get_db():
+    from google.cloud import firestore
+
+    db_name = os.environ.get("FIRESTORE_DATABASE", "langbridge").strip() or "langbridge"
+    return firestore.Client(project=getattr(config, 'project_id', None), database=db_name)
+
+
+def days(start: datetime.date, end: datetime.date):
+    day = start
+    while day <= end:
+        yield day.isoformat()
+        day += datetime.timedelta(days=1)
+
+
+def course_usage(db, course_id, start, end) -> dict:
+    """Return {day: {metric: total}} for the days in [start, end] with usage."""
+    usage = {}
+    for day in days(start, end):
+        totals = read_usage(db, course_id, day)
+        if totals:
+            usage[day] = totals
+    return usage
+
+
+def _print_row(label, totals):
+    print(f"{label:<24}" + "".join(f"{totals.get(metric, 0):>15,}" for metric in METRICS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-course usage totals from the sharded counters.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--course', help='Course ID')
+    target.add_argument('--all', action='store_true', help='Every course')
+    parser.add_argument('--start', type=datetime.date.fromisoformat, required=True, help='First day (YYYY-MM-DD, UTC)')
+    parser.add_argument('--end', type=datetime.date.fromisoformat, help='Last day (default: --start)')
+    parser.add_argument('--daily', action='store_true', help='Also print each day')
+    args = parser.parse_args()
+
+    end = args.end or args.start
+    db = _get_db()
+    courses = [doc.id for doc in db.collection('courses').stream()] if args.all else [args.course]
+    print(f"{'course / day':<24}" + "".join(f"{metric:>15}" for metric in METRICS))
+    for course_id in courses:
+        usage = course_usage(db, course_id, args.start, end)
+        if args.daily:
+            for day, totals in usage.items():
+                _print_row(f"  {day}", totals)
+        totals = {}
+        for day_totals in usage.values():
+            for metric, value in day_totals.items():
+                totals[metric] = totals.get(metric, 0) + value
+        _print_row(course_id, totals)
+
+
+if __name__ == "__main__":
+    main()
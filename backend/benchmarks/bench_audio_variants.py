@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Compare MP3 and low-bitrate Opus synthesis for the notes of the seed decks.
+
+Every slide note found in ``seeds/generate/*_progress.json`` is synthesized
+once per variant in ``audio_index.AUDIO_VARIANTS`` and the total bytes and
+per-clip latency are reported. Calls the real Text-to-Speech API, so
+application default credentials are required; nothing is uploaded.
+
+Usage:
+  python bench_audio_variants.py --limit 20
+  python bench_audio_variants.py --progress ../seeds/generate/cloudtech_en_progress.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+# Shared audio addressing lives with the function code in functions/config
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../functions/config')))
+import audio_index
+import tts_synth
+from utils import sanitize_text_for_tts
+
+GENERATE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../seeds/generate'))
+# Progress files are named <deck>_<lang>_progress.json
+LANGUAGE_VOICES = {"en": "en-US", "yue-HK": "yue-HK", "zh-CN": "cmn-CN"}
+
+
+def load_notes(paths):
+    """Yield (language_code, note) for every non-empty note in the files."""
+    for path in paths:
+        lang = os.path.basename(path)[:-len("_progress.json")].rsplit("_", 1)[-1]
+        with open(path, encoding="utf-8") as f:
+            slides = json.load(f).get("slides", {})
+        for slide in slides.values():
+            note = sanitize_text_for_tts(slide.get("note", ""))
+            if note:
+                yield lang, note
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MP3 vs Opus audio size and latency.")
+    parser.add_argument("--progress", nargs="+",
+                        default=sorted(glob.glob(os.path.join(GENERATE_DIR, "*_progress.json"))),
+                        help="Progress JSON files to read notes from.")
+    parser.add_argument("--limit", type=int, default=0, help="Only synthesize the first N notes.")
+    args = parser.parse_args()
+
+    from google.cloud import texttospeech
+
+    notes = list(load_notes(args.progress))
+    if args.limit:
+        notes = notes[:args.limit]
+    if not notes:
+        print("No notes found.")
+        return
+    print(f"Synthesizing {len(notes)} notes in {len(audio_index.AUDIO_VARIANTS)} variants...")
+
+    client = texttospeech.TextToSpeechClient()
+    results = {}
+    for fmt, spec in audio_index.AUDIO_VARIANTS.items():
+        config_kwargs = {"audio_encoding": getattr(texttospeech.AudioEncoding, spec["encoding"])}
+        if spec["sample_rate_hertz"]:
+            config_kwargs["sample_rate_hertz"] = spec["sample_rate_hertz"]
+        audio_config = texttospeech.AudioConfig(**config_kwargs)
+
+        sizes, latencies = [], []
+        for lang, note in notes:
+            voice = texttospeech.VoiceSelectionParams(
+                language_code=LANGUAGE_VOICES.get(lang, "en-US"),
+                ssml_gender=texttospeech.SsmlVoiceGender.FEMALE,
+            )
+            start = time.perf_counter()
+            audio = tts_synth.synthesize_text(
+                client, note, voice, audio_config, encoding_name=spec["encoding"]
+            )
+            latencies.append(time.perf_counter() - start)
+            sizes.append(len(audio))
+        results[fmt] = (sizes, latencies)
+
+    baseline = sum(results["mp3"][0]) if "mp3" in results else None
+    print(f"{'format':>8} {'total KB':>10} {'avg KB':>8} {'p50 ms':>8} {'p95 ms':>8} {'vs mp3':>8}")
+    for fmt, (sizes, latencies) in results.items():
+        ordered = sorted(latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        ratio = f"{sum(sizes) / baseline:.0%}" if baseline else "-"
+        print(
+            f"{fmt:>8} {sum(sizes) / 1024:>10.1f} {statistics.mean(sizes) / 1024:>8.1f} "
+            f"{statistics.median(latencies) * 1000:>8.0f} {p95 * 1000:>8.0f} {ratio:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Compare cold starts of the per-function layout with the consolidated dialog service.
+
+A session's first calls are welcome -> speech -> recquestions. With one
+function per endpoint each call can land on a cold instance, so the
+session pays every cold start; with the dialog service it pays one. Each
+cold start is measured as a fresh interpreter importing the deployable's
+main module (what the functions framework does before the first request).
+
+Usage:
+  python bench_cold_start.py --runs 5
+  python bench_cold_start.py --sequence welcome speech recquestions goodbye
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+FUNCTIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../functions'))
+
+IMPORT_SNIPPET = (
+    "import time, sys; start = time.perf_counter(); import main; "
+    "print('COLD_START_SECONDS=%f' % (time.perf_counter() - start), flush=True)"
+)
+
+
+def cold_start_seconds(function_dir):
+    """Import main.py of ``function_dir`` in a new interpreter; return seconds."""
+    env = dict(os.environ)
+    # No network during the measurement: background preloads just fail fast
+    env.setdefault("GOOGLE_CLOUD_PROJECT", "bench")
+    env["CONFIG_LISTENER"] = "0"
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=function_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # main.py logs to stdout as well, so pick out the marker line
+    for line in result.stdout.splitlines():
+        if line.startswith("COLD_START_SECONDS="):
+            return float(line.split("=", 1)[1])
+    raise RuntimeError(f"No timing from {function_dir}: {result.stderr[-500:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold starts of both layouts.")
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions per measurement.")
+    parser.add_argument("--sequence", nargs="+", default=["welcome", "speech", "recquestions"],
+                        help="Endpoints hit by a new session, in order.")
+    args = parser.parse_args()
+
+    per_function = {}
+    for name in sorted(set(args.sequence)):
+        samples = [cold_start_seconds(os.path.join(FUNCTIONS_DIR, name)) for _ in range(args.runs)]
+        per_function[name] = statistics.median(samples)
+    dialog = statistics.median(
+        cold_start_seconds(os.path.join(FUNCTIONS_DIR, "dialog")) for _ in range(args.runs)
+    )
+
+    print(f"Median import time over {args.runs} runs (ms)")
+    for name, seconds in per_function.items():
+        print(f"  {name:<14} {seconds * 1000:8.1f}")
+    print(f"  {'dialog':<14} {dialog * 1000:8.1f}")
+
+    separate = sum(per_function[name] for name in args.sequence)
+    print()
+    print(f"Session {' -> '.join(args.sequence)}:")
+    print(f"  per-function layout: {len(args.sequence)} cold starts, {separate * 1000:8.1f} ms")
+    print(f"  dialog service:      1 cold start,  {dialog * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
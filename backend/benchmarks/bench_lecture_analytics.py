@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Measure lecture_analytics rollups over a synthetic event log.
+
+Generates a course log (default 100k slide_change events over many
+lectures), then compares:
+
+- a full rebuild (no watermark: every event is read and folded in),
+- an incremental run after a few new events (only those are read),
+- answering "dwell per slide" from the rollup vs. scanning the raw log.
+
+The log and rollup documents live in an in-memory stand-in for Firestore,
+so the numbers are the tool's own cost; with Firestore every event read is
+also a billed document read, which the "events read" column counts.
+
+Usage:
+  python bench_lecture_analytics.py --events 100000 --new-events 500
+"""
+
+import argparse
+import bisect
+import datetime
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from admin_tools import lecture_analytics
+
+T0 = datetime.datetime(2026, 1, 5, 8, 0, tzinfo=datetime.timezone.utc)
+LANGUAGE_SETS = [["en-US"], ["en-US", "zh-CN"], ["en-US", "zh-CN", "yue-HK"]]
+
+
+class MemoryDoc:
+    def __init__(self, store, path):
+        self.store = store
+        self.path = path
+        self.id = path[-1]
+
+    def get(self):
+        data = self.store.get(self.path)
+        return MemorySnapshot(self.id, data)
+
+    def set(self, data):
+        self.store[self.path] = data
+
+    def collection(self, name):
+        return MemoryCollection(self.store, self.path + (name,))
+
+
+class MemorySnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+
+class MemoryCollection:
+    def __init__(self, store, path):
+        self.store = store
+        self.path = path
+
+    def document(self, doc_id):
+        return MemoryDoc(self.store, self.path + (doc_id,))
+
+    def stream(self):
+        depth = len(self.path) + 1
+        for path, data in list(self.store.items()):
+            if len(path) == depth and path[:-1] == self.path:
+                yield MemorySnapshot(path[-1], data)
+
+
+class MemoryBatch:
+    def __init__(self):
+        self.writes = []
+
+    def set(self, ref, data):
+        self.writes.append((ref, data))
+
+    def commit(self):
+        for ref, data in self.writes:
+            ref.set(data)
+
+
+class MemoryDb:
+    def __init__(self):
+        self.store = {}
+
+    def collection(self, name):
+        return MemoryCollection(self.store, (name,))
+
+    def batch(self):
+        return MemoryBatch()
+
+
+class EventLog:
+    """The course's log ordered by (client_timestamp, id), queried like fetch_events."""
+
+    def __init__(self, events):
+        self.events = sorted(events, key=lambda e: (e[1]["client_timestamp"], e[0]))
+        self.keys = [e[1]["client_timestamp"] for e in self.events]
+        self.reads = 0
+
+    def append(self, events):
+        self.__init__(self.events + events)
+
+    def fetch(self, db, course_id, watermark, watermark_ids, settle_before):
+        seen = set(watermark_ids or [])
+        start = bisect.bisect_left(self.keys, watermark) if watermark is not None else 0
+        end = bisect.bisect_left(self.keys, settle_before)
+        for event_id, event in self.events[start:end]:
+            self.reads += 1
+            if event_id not in seen:
+                yield event_id, event
+
+
+def synthetic_events(count, start_index=0, start=T0):
+    rng = random.Random(start_index)
+    events = []
+    at = start
+    slide = 1
+    presentation = "lecture-0"
+    for i in range(start_index, start_index + count):
+        if rng.random() < 0.01:
+            # Next lecture: new deck after a break
+            presentation = f"lecture-{i // 100}"
+            slide = 1
+            at += datetime.timedelta(hours=rng.randint(2, 48))
+        else:
+            slide = max(1, slide + rng.choice([1, 1, 1, 1, -1]))
+            at += datetime.timedelta(seconds=rng.randint(15, 240))
+        events.append((f"e{i:08d}", {
+            "type": "slide_change",
+            "presentation_id": presentation,
+            "page_number": slide,
+            "languages": rng.choice(LANGUAGE_SETS),
+            "client_timestamp": at,
+        }))
+    return events
+
+
+def scan_dwell(events, max_dwell):
+    """What answering the question costs without rollups: a full scan."""
+    dwell = {}
+    previous = None
+    for _, event in events:
+        at = event["client_timestamp"].timestamp()
+        if previous and 0 < at - previous[2] <= max_dwell:
+            key = (previous[0], previous[1])
+            dwell[key] = dwell.get(key, 0.0) + at - previous[2]
+        previous = (event["presentation_id"], event["page_number"], at)
+    return dwell
+
+
+def run(db, log, now):
+    log.reads = 0
+    start = time.perf_counter()
+    processed = lecture_analytics.update_course(db, "bench", settle_seconds=0, now=now, fetch=log.fetch)
+    return time.perf_counter() - start, processed, log.reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental lecture analytics.")
+    parser.add_argument("--events", type=int, default=100_000, help="Events in the initial log.")
+    parser.add_argument("--new-events", type=int, default=500, help="Events added before the incremental run.")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    events = synthetic_events(args.events)
+    log = EventLog(events)
+    db = MemoryDb()
+    now = events[-1][1]["client_timestamp"] + datetime.timedelta(days=1)
+
+    print(f"{'run':<22} {'seconds':>8} {'processed':>10} {'events read':>12}")
+    elapsed, processed, reads = run(db, log, now)
+    print(f"{'full rebuild':<22} {elapsed:>8.3f} {processed:>10} {reads:>12}")
+
+    elapsed, processed, reads = run(db, log, now)
+    print(f"{'re-run, no new events':<22} {elapsed:>8.3f} {processed:>10} {reads:>12}")
+
+    new_start = now - datetime.timedelta(hours=1)
+    new_events = synthetic_events(args.new_events, start_index=args.events, start=new_start)
+    log.append(new_events)
+    later = new_events[-1][1]["client_timestamp"] + datetime.timedelta(seconds=1)
+    elapsed, processed, reads = run(db, log, later)
+    print(f"{'incremental':<22} {elapsed:>8.3f} {processed:>10} {reads:>12}")
+
+    start = time.perf_counter()
+    scan_dwell(log.events, lecture_analytics.DEFAULT_MAX_DWELL_SECONDS)
+    scan = time.perf_counter() - start
+    start = time.perf_counter()
+    rollups = list(db.collection("courses").document("bench").collection("analytics")
+                   .document("summary").collection("presentations").stream())
+    lookup = time.perf_counter() - start
+    print()
+    print(f"dwell per slide from raw log scan: {scan * 1000:8.1f} ms, {len(log.events)} documents read")
+    print(f"dwell per slide from rollups:      {lookup * 1000:8.1f} ms, {len(rollups)} documents read")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Measure seeding throughput: the old per-slide loop vs. seed_pipeline.
+
+The remote calls are replaced by local stand-ins that sleep for a
+configurable latency (message generation, TTS, visual upload, Firestore
+write), so the numbers show how well each approach overlaps waiting, not
+what the services cost. Three runs over the same synthetic course:
+
+- sequential: slide after slide, per-slide pools for generation and TTS,
+  visuals uploaded one by one, plus the old fixed 1s pause per slide
+  (added to the measured time instead of slept),
+- pipeline: seed_pipeline.run_tasks / run_slide with stage pools; each
+  deck's visuals go up in one concurrent bulk upload, identical images
+  (every other slide shares one image across languages) only once, and
+  the registry writes are batched (seed_pipeline.BulkWrites; a batch of
+  up to 20 writes costs one Firestore call), the deck document once per deck,
+- resume: the pipeline interrupted halfway, then rerun from its checkpoint.
+
+Usage:
+  python bench_seed_pipeline.py --decks 3 --slides 20 --languages 3
+  python bench_seed_pipeline.py --llm 0.5 --tts 0.15 --max-in-flight 32
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../seeds')))
+import seed_pipeline
+
+
+class StandIns:
+    """Remote calls as sleeps; counts calls."""
+
+    def __init__(self, args):
+        self.args = args
+        self.calls = 0
+        self.uploaded = set()
+        self._lock = threading.Lock()
+
+    def _call(self, seconds, result):
+        with self._lock:
+            self.calls += 1
+        time.sleep(seconds)
+        return result
+
+    def generate(self, lang):
+        return self._call(self.args.llm, f"message in {lang}")
+
+    def synthesize(self, lang, text):
+        return self._call(self.args.tts, {"text": text, "audio_url": f"https://example.invalid/{lang}.mp3"})
+
+    def upload(self, lang, visual):
+        with self._lock:
+            self.uploaded.add(visual)
+        return self._call(self.args.upload, f"https://example.invalid/{visual}")
+
+    def write(self, payloads):
+        # The presentation document, then the slide document
+        self._call(self.args.firestore, None)
+        return self._call(self.args.firestore, None)
+
+    def bulk_writer(self):
+        return BulkWriterStandIn(self)
+
+
+class BulkWriterStandIn:
+    """A BulkWriter that commits its queued writes in batches of 20 when closed."""
+
+    def __init__(self, stand_ins):
+        self.stand_ins = stand_ins
+        self.references = []
+
+    def on_write_result(self, callback):
+        self.on_result = callback
+
+    def on_write_error(self, callback):
+        pass
+
+    def set(self, reference, data, merge=False):
+        self.references.append(reference)
+
+    def close(self):
+        for start in range(0, len(self.references), 20):
+            self.stand_ins._call(self.stand_ins.args.firestore, None)
+            for reference in self.references[start:start + 20]:
+                self.on_result(reference, None, self)
+
+
+def course(args):
+    """Yield (key, languages, texts, visuals) for every slide; some languages come pre-generated."""
+    languages = [f"lang-{i}" for i in range(args.languages)]
+    for deck in range(args.decks):
+        for slide in range(1, args.slides + 1):
+            texts = {lang: f"note {slide}" for i, lang in enumerate(languages)
+                     if (slide + i) % 3 != 0 or args.llm == 0}
+            # Content-addressed names: even slides use the same image in every language
+            visuals = {lang: f"deck{deck}/{'all' if slide % 2 == 0 else lang}/slide_{slide}.png"
+                       for lang in languages}
+            yield f"deck{deck}/{slide}", languages, texts, visuals
+
+
+def run_sequential(args, stand_ins):
+    for _, languages, texts, visuals in course(args):
+        links = {lang: stand_ins.upload(lang, visual) for lang, visual in visuals.items()}
+        missing = [lang for lang in languages if lang not in texts]
+        messages = dict(texts)
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(len(missing), 5)) as executor:
+                messages.update(zip(missing, executor.map(stand_ins.generate, missing)))
+        with ThreadPoolExecutor(max_workers=min(len(messages), 5)) as executor:
+            payloads = dict(zip(messages, executor.map(stand_ins.synthesize, messages, messages.values())))
+        for lang, link in links.items():
+            payloads[lang]["slide_link"] = link
+        stand_ins.write(payloads)
+
+
+def run_pipeline(args, stand_ins, checkpoint, stop_after=None):
+    workers = {"llm": args.llm_workers, "tts": args.tts_workers,
+               "upload": args.upload_workers, "firestore": args.firestore_workers}
+    started = [0]
+
+    deck_files = {}
+    for key, _, _, visuals in course(args):
+        deck_files.setdefault(key.split("/")[0], set()).update(visuals.values())
+
+    def upload_deck(files):
+        # Objects already in the "bucket" are skipped, as the seeder's listing does
+        missing = sorted(files - stand_ins.uploaded)
+        with ThreadPoolExecutor(max_workers=args.upload_files) as executor:
+            list(executor.map(stand_ins.upload, [None] * len(missing), missing))
+
+    deck_uploads = {}
+
+    def tasks():
+        for key, languages, texts, visuals in course(args):
+            deck = key.split("/")[0]
+            if deck not in deck_uploads:
+                deck_uploads[deck] = pools.submit("upload", upload_deck, deck_files[deck])
+                writes.set(SimpleNamespace(path=deck), {"updated_at": None}, merge=True)
+            if stop_after is not None and started[0] >= stop_after:
+                return  # the "crash"
+            started[0] += 1
+            yield key, seed_pipeline.digest(key, texts), (key, languages, texts, visuals)
+
+    def work(payload):
+        key, languages, texts, visuals = payload
+        deck = key.split("/")[0]
+
+        def link(lang, visual):
+            deck_uploads[deck].result()
+            return {"slide_link": f"https://example.invalid/{visual}"}
+
+        def write(payloads):
+            return writes.set(SimpleNamespace(path=key), payloads, merge=True)
+
+        return seed_pipeline.run_slide(pools, languages, texts, stand_ins.generate, stand_ins.synthesize,
+                                       write, visuals=visuals, link=link)
+
+    writes = seed_pipeline.BulkWrites(stand_ins.bulk_writer, flush_seconds=args.flush_seconds)
+    with writes, seed_pipeline.StagePools(workers) as pools:
+        return seed_pipeline.run_tasks(tasks(), work, max_in_flight=args.max_in_flight, checkpoint=checkpoint)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the seeding pipeline with local stand-ins.")
+    parser.add_argument("--decks", type=int, default=3)
+    parser.add_argument("--slides", type=int, default=20, help="Slides per deck.")
+    parser.add_argument("--languages", type=int, default=3)
+    parser.add_argument("--llm", type=float, default=0.4, help="Seconds per message generation.")
+    parser.add_argument("--tts", type=float, default=0.1, help="Seconds per synthesis (all variants).")
+    parser.add_argument("--upload", type=float, default=0.03, help="Seconds per visual upload.")
+    parser.add_argument("--firestore", type=float, default=0.01, help="Seconds per Firestore write.")
+    parser.add_argument("--flush-seconds", type=float, default=seed_pipeline.DEFAULT_FLUSH_SECONDS,
+                        help="Longest wait of a queued registry write for its batch.")
+    parser.add_argument("--old-sleep", type=float, default=1.0, help="The old fixed pause per slide.")
+    parser.add_argument("--max-in-flight", type=int, default=seed_pipeline.DEFAULT_MAX_IN_FLIGHT)
+    parser.add_argument("--llm-workers", type=int, default=seed_pipeline.DEFAULT_STAGE_WORKERS["llm"])
+    parser.add_argument("--tts-workers", type=int, default=seed_pipeline.DEFAULT_STAGE_WORKERS["tts"])
+    parser.add_argument("--upload-workers", type=int, default=seed_pipeline.DEFAULT_STAGE_WORKERS["upload"])
+    parser.add_argument("--firestore-workers", type=int, default=seed_pipeline.DEFAULT_STAGE_WORKERS["firestore"])
+    parser.add_argument("--upload-files", type=int, default=seed_pipeline.DEFAULT_UPLOAD_WORKERS,
+                        help="Concurrent file uploads per deck.")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    slides = args.decks * args.slides
+    print(f"{slides} slides x {args.languages} languages")
+    print(f"{'run':<28} {'seconds':>8} {'slides/s':>9} {'remote calls':>13}")
+
+    def row(label, seconds, calls):
+        print(f"{label:<28} {seconds:>8.2f} {slides / seconds:>9.1f} {calls:>13}")
+
+    stand_ins = StandIns(args)
+    elapsed, _ = timed(lambda: run_sequential(args, stand_ins))
+    row("sequential, no pause", elapsed, stand_ins.calls)
+    row(f"sequential + {args.old_sleep:g}s pause/slide", elapsed + slides * args.old_sleep, stand_ins.calls)
+
+    stand_ins = StandIns(args)
+    elapsed, summary = timed(lambda: run_pipeline(args, stand_ins, seed_pipeline.Checkpoint()))
+    row("pipeline", elapsed, stand_ins.calls)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoint.json")
+        stand_ins = StandIns(args)
+        first, _ = timed(lambda: run_pipeline(args, stand_ins, seed_pipeline.Checkpoint(path), slides // 2))
+        second, summary = timed(lambda: run_pipeline(args, stand_ins, seed_pipeline.Checkpoint(path)))
+        row("pipeline, crash + resume", first + second, stand_ins.calls)
+        print(f"  resume skipped {summary['skipped']} checkpointed slides, processed {summary['done']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Compare the wire size of the legacy (v1) and compact (v2) talk_stream SSE framing.
+
+Usage:
+  python bench_sse_framing.py --deltas 200 --delta-chars 12 --extra-bytes 2048
+"""
+
+import argparse
+import os
+import sys
+
+# Import the framing module straight from the talk-stream function
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../functions/talk-stream')))
+import sse_protocol
+
+
+def stream_bytes(protocol, ask_text, extra, pieces, heartbeats=0):
+    """Return the total UTF-8 byte count of a full reply stream."""
+    framer = sse_protocol.make_framer(
+        protocol, ask_text, extra, "trace-0123456789abcdef", "session-0123456789abcdef"
+    )
+    frames = [framer.header()]
+    frames.extend(framer.heartbeat() for _ in range(heartbeats))
+    frames.extend(framer.delta(piece) for piece in pieces)
+    frames.append(framer.final("".join(pieces)))
+    return sum(len(f.encode("utf-8")) for f in frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SSE framing byte counts.")
+    parser.add_argument("--deltas", type=int, default=200, help="Number of streamed pieces.")
+    parser.add_argument("--delta-chars", type=int, default=12, help="Characters per piece.")
+    parser.add_argument("--extra-bytes", type=int, nargs="+", default=[0, 256, 2048, 8192],
+                        help="Sizes of the echoed 'extra' payload to try.")
+    parser.add_argument("--heartbeats", type=int, default=0, help="Heartbeats to include in v2.")
+    args = parser.parse_args()
+
+    ask_text = "Can you explain how a cloud load balancer distributes traffic?"
+    pieces = [("word " * args.delta_chars)[:args.delta_chars] for _ in range(args.deltas)]
+
+    print(f"{'extra':>8} {'v1 bytes':>12} {'v2 bytes':>12} {'saved':>8}")
+    print("-" * 44)
+    for size in args.extra_bytes:
+        extra = {"blob": "x" * size} if size else {}
+        v1 = stream_bytes(sse_protocol.LEGACY, ask_text, extra, pieces)
+        v2 = stream_bytes(sse_protocol.COMPACT, ask_text, extra, pieces, args.heartbeats)
+        saved = 100.0 * (v1 - v2) / v1 if v1 else 0.0
+        print(f"{size:>8} {v1:>12} {v2:>12} {saved:>7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Profile import time and time-to-first-response of each function entry point.
+
+Every measurement runs in a fresh interpreter started in the function's
+directory, the way the functions framework loads a deployable:
+
+- import profile: ``python -X importtime -c "import main"``; the slowest
+  modules (cumulative) are listed so regressions can be traced to a
+  dependency.
+- time to first response: import main, then call the entry point with an
+  unauthenticated probe request. The probe is rejected before any
+  Firestore, TTS or LLM call, so this measures what the instance must do
+  before it can answer anything, without network I/O.
+
+Results are compared against cold_start_thresholds.json (median
+milliseconds per function) and the script exits non-zero when a function
+regresses, so it can run in CI and track cold starts over time.
+
+Usage:
+  python profile_cold_start.py
+  python profile_cold_start.py --functions speech talk-stream --runs 7 --top 15
+  python profile_cold_start.py --update      # record current medians (with headroom)
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+FUNCTIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../functions'))
+THRESHOLDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cold_start_thresholds.json")
+
+# Entry point and probe path per deployable
+ENTRY_POINTS = {
+    "config": ("config", "/config"),
+    "dialog": ("dialog", "/welcome"),
+    "goodbye": ("goodbye", "/goodbye"),
+    "recquestions": ("recquestions", "/recquestions"),
+    "speech": ("speech", "/speech"),
+    "talk-stream": ("talk_stream", "/talk-stream"),
+    "welcome": ("welcome", "/welcome"),
+}
+
+FIRST_RESPONSE_SNIPPET = """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from flask import Flask
+with Flask("probe").test_request_context({path!r}, method="POST", json={{}}):
+    from flask import request
+    response = main.{entry}(request)
+done = time.perf_counter()
+status = response[1] if isinstance(response, tuple) else getattr(response, "status_code", 200)
+print("FIRST_RESPONSE=%f %f %s" % (imported - start, done - start, status), flush=True)
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _env():
+    env = dict(os.environ)
+    # No network during the measurement: background preloads just fail fast
+    env.setdefault("GOOGLE_CLOUD_PROJECT", "bench")
+    env["CONFIG_LISTENER"] = "0"
+    env.setdefault("XIAOICE_CHAT_ACCESS_KEY", "probe")
+    env.setdefault("XIAOICE_CHAT_SECRET_KEY", "probe")
+    env["LOG_LEVEL"] = "ERROR"
+    return env
+
+
+def parse_importtime(stderr):
+    """Return [(module, self_us, cumulative_us, depth)] from ``-X importtime`` output."""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def import_profile(function_dir):
+    """Per-module import times for ``import main`` in ``function_dir``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=function_dir, env=_env(), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import main failed in {function_dir}: {result.stderr[-500:]}")
+    return parse_importtime(result.stderr)
+
+
+def first_response(function_dir, entry, path):
+    """Return (import_seconds, first_response_seconds, status) in a new interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_RESPONSE_SNIPPET.format(entry=entry, path=path)],
+        cwd=function_dir, env=_env(), capture_output=True, text=True,
+    )
+    # main.py logs to stdout as well, so pick out the marker line
+    for line in result.stdout.splitlines():
+        if line.startswith("FIRST_RESPONSE="):
+            imported, done, status = line.split("=", 1)[1].split()
+            return float(imported), float(done), status
+    raise RuntimeError(f"No timing from {function_dir}: {result.stderr[-500:]}")
+
+
+def load_thresholds():
+    if not os.path.exists(THRESHOLDS_FILE):
+        return {}
+    with open(THRESHOLDS_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile function cold starts and check thresholds.")
+    parser.add_argument("--functions", nargs="+", default=sorted(ENTRY_POINTS), help="Deployables to profile.")
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions per measurement.")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list per function.")
+    parser.add_argument("--update", action="store_true", help="Write current medians to the thresholds file.")
+    parser.add_argument("--headroom", type=float, default=1.5, help="Threshold multiplier used by --update.")
+    args = parser.parse_args()
+
+    thresholds = load_thresholds()
+    measured = {}
+    regressions = []
+    for name in args.functions:
+        entry, path = ENTRY_POINTS[name]
+        function_dir = os.path.join(FUNCTIONS_DIR, name)
+
+        rows = import_profile(function_dir)
+        print(f"== {name}: slowest imports (cumulative ms)")
+        for module, _self_us, cumulative_us, depth in sorted(rows, key=lambda r: -r[2])[:args.top]:
+            print(f"  {cumulative_us / 1000:8.1f}  {'  ' * depth}{module}")
+
+        samples = [first_response(function_dir, entry, path) for _ in range(args.runs)]
+        import_ms = statistics.median(s[0] for s in samples) * 1000
+        response_ms = statistics.median(s[1] for s in samples) * 1000
+        measured[name] = {"import_ms": round(import_ms, 1), "first_response_ms": round(response_ms, 1)}
+        print(f"  import {import_ms:.1f} ms, first response {response_ms:.1f} ms "
+              f"(probe status {samples[-1][2]}, median of {args.runs})")
+
+        limit = thresholds.get(name, {})
+        for key, value in measured[name].items():
+            if key in limit and value > limit[key]:
+                regressions.append(f"{name} {key}: {value:.1f} ms > {limit[key]:.1f} ms")
+        print()
+
+    if args.update:
+        for name, values in measured.items():
+            thresholds[name] = {key: round(value * args.headroom, 1) for key, value in values.items()}
+        with open(THRESHOLDS_FILE, "w", encoding="utf-8") as f:
+            json.dump(thresholds, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Thresholds written to {THRESHOLDS_FILE}")
+        return
+
+    if regressions:
+        print("Cold start regressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("No cold start regressions" if thresholds else "No thresholds recorded (run with --update)")
+
+
+if __name__ == "__main__":
+    main()
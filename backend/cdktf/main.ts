@@ -196,6 +196,7 @@ class LangBridgeApiStack extends TerraformStack {
       environmentVariables: {
         "XIAOICE_CHAT_SECRET_KEY": process.env.XIAOICE_CHAT_SECRET_KEY || "default_secret_key",
         "XIAOICE_CHAT_ACCESS_KEY": process.env.XIAOICE_CHAT_ACCESS_KEY || "default_access_key",
+        "SPEECH_FILE_BUCKET": speechFileBucket.name,
       },
       additionalDependencies: [artifactRegistryIamMember, aiPlatformIamMember],
     });
@@ -242,6 +243,7 @@ class LangBridgeApiStack extends TerraformStack {
       environmentVariables: {
         "XIAOICE_CHAT_SECRET_KEY": process.env.XIAOICE_CHAT_SECRET_KEY || "default_secret_key",
         "XIAOICE_CHAT_ACCESS_KEY": process.env.XIAOICE_CHAT_ACCESS_KEY || "default_access_key",
+        "SPEECH_FILE_BUCKET": speechFileBucket.name,
       },
       additionalDependencies: [artifactRegistryIamMember, aiPlatformIamMember],
     });
@@ -282,16 +284,47 @@ class LangBridgeApiStack extends TerraformStack {
       additionalDependencies: [artifactRegistryIamMember, aiPlatformIamMember],
     });
 
+    // Optional: one dialog service for welcome/goodbye/recquestions/speech so a
+    // session pays one cold start and shares warm caches. The per-function
+    // deployments stay in place for direct callers.
+    let dialogRoutes: { [key: string]: string } = {
+      "WELCOME": welcomeFunction.cloudFunction.url,
+      "SPEECH": speechFunction.cloudFunction.url,
+      "GOODBYE": goodbyeFunction.cloudFunction.url,
+      "RECQUESTIONS": recquestionsFunction.cloudFunction.url,
+    };
+    if ((process.env.CONSOLIDATED_DIALOG || "").toLowerCase() === "true") {
+      const dialogFunction = await CloudFunctionConstruct.create(this, "dialogFunction", {
+        functionName: "dialog",
+        runtime: "python311",
+        entryPoint: "dialog",
+        timeout: 60,
+        availableMemory: "512Mi",
+        makePublic: false,
+        cloudFunctionDeploymentConstruct: cloudFunctionDeploymentConstruct,
+        serviceAccount: talkStreamFunction.serviceAccount,
+        environmentVariables: {
+          "XIAOICE_CHAT_SECRET_KEY": process.env.XIAOICE_CHAT_SECRET_KEY || "default_secret_key",
+          "XIAOICE_CHAT_ACCESS_KEY": process.env.XIAOICE_CHAT_ACCESS_KEY || "default_access_key",
+          "SPEECH_FILE_BUCKET": speechFileBucket.name,
+        },
+        additionalDependencies: [artifactRegistryIamMember, aiPlatformIamMember],
+      });
+      dialogRoutes = {
+        "WELCOME": `${dialogFunction.cloudFunction.url}/welcome`,
+        "SPEECH": `${dialogFunction.cloudFunction.url}/speech`,
+        "GOODBYE": `${dialogFunction.cloudFunction.url}/goodbye`,
+        "RECQUESTIONS": `${dialogFunction.cloudFunction.url}/recquestions`,
+      };
+    }
+
     const apigatewayConstruct = await ApigatewayConstruct.create(this, "api-gateway", {
       api: "langbridgeapi",
       project: project.projectId,
       provider: googleBetaProvider,
       replaces: {
         "TALK_STREAM": talkStreamFunction.cloudFunction.url,
-        "WELCOME": welcomeFunction.cloudFunction.url,
-        "SPEECH": speechFunction.cloudFunction.url,
-        "GOODBYE": goodbyeFunction.cloudFunction.url,
-        "RECQUESTIONS": recquestionsFunction.cloudFunction.url,
+        ...dialogRoutes,
         "CONFIG": configFunction.cloudFunction.url
       },
       servicesAccount: talkStreamFunction.serviceAccount,
@@ -1,11 +1,21 @@
-"""Agent configuration and initialization."""
+"""Agent configuration and initialization.
+
+The ADK agent and its runner are built on first use rather than at import,
+so importing message_generator (and anything that imports it) does not pay
+for the ADK import and YAML agent construction until a message is actually
+generated.
+"""
 import os
-from google.adk.agents import config_agent_utils
-from google.adk.runners import InMemoryRunner
+import threading
+
+_runner = None
+_runner_lock = threading.Lock()
 
 
 def create_agent():
     """Create and return an ADK agent from YAML config."""
+    from google.adk.agents import config_agent_utils
+
     # Get the directory where this script is located
     current_dir = os.path.dirname(os.path.abspath(__file__))
     config_file_path = os.path.join(
@@ -18,9 +28,16 @@ def create_agent():
     return agent
 
 
-# Create runner (reusable across requests)
-agent = create_agent()
-runner = InMemoryRunner(
-    agent=agent,
-    app_name='langbridge_message_generator',
-)
+def get_runner():
+    """Return the shared runner (reusable across requests), creating it once."""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                from google.adk.runners import InMemoryRunner
+
+                _runner = InMemoryRunner(
+                    agent=create_agent(),
+                    app_name='langbridge_message_generator',
+                )
+    return _runner
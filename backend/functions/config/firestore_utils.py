@@ -1,21 +1,28 @@
 import logging
 import os
 import hashlib
+import threading
 from google.cloud import firestore
 
 logger = logging.getLogger(__name__)
 
+_db = None
+_db_lock = threading.Lock()
+
 
 def _get_db():
-    """Return a Firestore client using an optional env database name.
+    """Return the shared Firestore client using an optional env database name.
 
     If `FIRESTORE_DATABASE` is set, use that database; otherwise use the
     'langbridge' database.
     """
-    db_name = os.environ.get("FIRESTORE_DATABASE", "langbridge").strip()
-    if db_name:
-        return firestore.Client(database=db_name)
-    return firestore.Client(database="langbridge")
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                db_name = os.environ.get("FIRESTORE_DATABASE", "langbridge").strip()
+                _db = firestore.Client(database=db_name or "langbridge")
+    return _db
 
 
 def get_config():
@@ -92,6 +99,18 @@ def get_cached_presentation_message(language_code: str, context: str = ""):
     
     Returns tuple (message, audio_url) if found, (None, None) otherwise.
     """
+    entry = get_cached_presentation_entry(language_code, context)
+    if not entry:
+        return (None, None)
+    return (entry["message"], entry.get("audio_url"))
+
+
+def get_cached_presentation_entry(language_code: str, context: str = ""):
+    """Retrieve the cached presentation document for a language/context.
+
+    Returns a dict with ``message`` and, when present, ``audio_url`` and
+    ``audio_variants`` ({format: url}); None on a miss.
+    """
     cache_key = _cache_key(language_code, context)
     logger.debug("Looking up cache with key=%s", cache_key)
     try:
@@ -109,9 +128,11 @@ def get_cached_presentation_message(language_code: str, context: str = ""):
                     language_code,
                     cache_key
                 )
-                message = cached_data["message"]
-                audio_url = cached_data.get("audio_url")  # May be None
-                return (message, audio_url)
+                entry = {"message": cached_data["message"]}
+                for field in ("audio_url", "audio_variants"):
+                    if cached_data.get(field):
+                        entry[field] = cached_data[field]
+                return entry
             else:
                 logger.warning(
                     "Cache doc exists but missing 'message' for key=%s",
@@ -128,11 +149,45 @@ def get_cached_presentation_message(language_code: str, context: str = ""):
             cache_key,
             e
         )
-    return (None, None)
+    return None
+
+
+def presentation_cache_write(
+    language_code: str, message: str, context: str = "", course_id: str = None, audio_url: str = None,
+    audio_variants: dict = None,
+):
+    """The (document reference, data) that caches a presentation message.
+
+    Set with merge=True; ``cache_presentation_message`` writes it at once,
+    the course seeder queues it on a BulkWriter.
+    """
+    cache_key = _cache_key(language_code, context)
+    cache_ref = _get_db().collection(
+        'langbridge_presentation_cache'
+    ).document(cache_key)
+
+    cache_data = {
+        "message": message,
+        "language_code": (language_code or "").strip().lower(),
+        "context": _normalize_context(context),
+        "context_hash": cache_key.rsplit(":", 1)[-1],
+        "updated_at": firestore.SERVER_TIMESTAMP
+    }
+
+    if course_id:
+        cache_data["course_ids"] = firestore.ArrayUnion([course_id])
+
+    if audio_url:
+        cache_data["audio_url"] = audio_url
+
+    if audio_variants:
+        cache_data["audio_variants"] = audio_variants
+    return cache_ref, cache_data
 
 
 def cache_presentation_message(
-    language_code: str, message: str, context: str = "", course_id: str = None, audio_url: str = None
+    language_code: str, message: str, context: str = "", course_id: str = None, audio_url: str = None,
+    audio_variants: dict = None,
 ):
     """Store generated presentation message in Firestore cache."""
     if not message:
@@ -143,27 +198,12 @@ def cache_presentation_message(
         return
     
     cache_key = _cache_key(language_code, context)
-    norm_ctx = _normalize_context(context)
     logger.debug("Attempting to cache with key=%s", cache_key)
     try:
-        db = _get_db()
-        cache_ref = db.collection(
-            'langbridge_presentation_cache'
-        ).document(cache_key)
-        
-        cache_data = {
-            "message": message,
-            "language_code": (language_code or "").strip().lower(),
-            "context": norm_ctx,
-            "context_hash": cache_key.rsplit(":", 1)[-1],
-            "updated_at": firestore.SERVER_TIMESTAMP
-        }
-        
-        if course_id:
-            cache_data["course_ids"] = firestore.ArrayUnion([course_id])
-        
-        if audio_url:
-            cache_data["audio_url"] = audio_url
+        cache_ref, cache_data = presentation_cache_write(
+            language_code, message, context, course_id=course_id, audio_url=audio_url,
+            audio_variants=audio_variants,
+        )
 
         logger.debug("Writing cache data: %s", cache_data)
         # Use merge=True so we don't overwrite other fields or the array if it exists
@@ -2,9 +2,14 @@ import json
 import logging
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import functions_framework
 from google.cloud import firestore
-from firestore_utils import get_cached_presentation_message
+from firestore_utils import get_cached_presentation_entry
+import voice_clips
+import course_utils
+import usage_counters
 
 _level_name = os.environ.get("LOG_LEVEL", "DEBUG").upper()
 _level = getattr(logging, _level_name, logging.DEBUG)
@@ -21,6 +26,55 @@ if not any(isinstance(h, logging.StreamHandler) for h in _root.handlers):
 logger = logging.getLogger(__name__)
 logger.setLevel(_level)
 
+# Voice clips for new messages are synthesized in the background: the
+# response returns right after the broadcast writes, and clips not ready
+# yet are synthesized on their first lookup. CONFIG_PRESYNTH_TIMEOUT > 0
+# makes the response wait up to that long (to keep the instance busy
+# where CPU is throttled between requests); it is off by default.
+_presynth_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("CONFIG_PRESYNTH_WORKERS", "4")))
+PRESYNTH_TIMEOUT_SECONDS = float(os.environ.get("CONFIG_PRESYNTH_TIMEOUT", "0"))
+
+
+def _presynthesize_clips(config_data: dict, course_id: str = None) -> int:
+    """Synthesize new welcome/goodbye/presentation clips so lookups are hits.
+
+    Clips already indexed (unchanged text and voice) are skipped by
+    voice_clips.presynthesize.
+    """
+    if not voice_clips.bucket_name():
+        logger.info("SPEECH_FILE_BUCKET not set; skipping clip pre-synthesis")
+        return 0
+    presentation = {
+        lang: data for lang, data in (config_data.get("presentation_messages") or {}).items()
+        if not (isinstance(data, dict) and data.get("audio_url"))
+    }
+    ready = 0
+    for messages in (
+        config_data.get("welcome_messages") or {},
+        config_data.get("goodbye_messages") or {},
+        presentation,
+    ):
+        ready += voice_clips.presynthesize(messages, course_id)
+    logger.info("Pre-synthesized %d voice clips", ready)
+    return ready
+
+
+def _log_presynthesis_error(future):
+    error = future.exception()
+    if error is not None:
+        logger.error("Clip pre-synthesis failed: %s", error)
+
+
+def _await_presynthesis(future):
+    if PRESYNTH_TIMEOUT_SECONDS <= 0:
+        return
+    try:
+        future.result(timeout=PRESYNTH_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        logger.warning("Clip pre-synthesis still running after %.0fs", PRESYNTH_TIMEOUT_SECONDS)
+    except Exception:
+        pass  # Logged by _log_presynthesis_error
+
 
 @functions_framework.http
 def config(request):
@@ -48,6 +102,7 @@ def config(request):
         page_number = request_json.get("page_number")
         latest_languages = request_json.get("latest_languages")
         context = request_json.get("context")
+        usage_counters.increment(course_id, "requests")
 
         # If latest_languages is missing but we have context (e.g. from VBA client),
         # attempt to rehydrate from cache.
@@ -58,11 +113,13 @@ def config(request):
             
             logger.info(f"Rehydrating from cache for languages: {target_langs}")
             for lang in target_langs:
-                msg, audio_url = get_cached_presentation_message(lang, context)
-                if msg:
-                    lang_data = {"text": msg}
-                    if audio_url:
-                        lang_data["audio_url"] = audio_url
+                entry = get_cached_presentation_entry(lang, context)
+                if entry:
+                    lang_data = {"text": entry["message"]}
+                    if entry.get("audio_url"):
+                        lang_data["audio_url"] = entry["audio_url"]
+                    if entry.get("audio_variants"):
+                        lang_data["audio_variants"] = entry["audio_variants"]
                     latest_languages[lang] = lang_data
             
             # Fallback if cache completely empty (at least provide English context)
@@ -84,6 +141,10 @@ def config(request):
         doc_ref = db.collection('langbridge_config').document('messages')
         doc_ref.set(config_data)
         logger.info("Backend config updated in Firestore")
+        presynthesis = _presynth_executor.submit(
+            _presynthesize_clips, config_data, course_id
+        )
+        presynthesis.add_done_callback(_log_presynthesis_error)
 
         # --- Restore Client Broadcast Logic for Live Slide ---
         # This part ensures the web-student client can still track the live slide
@@ -92,6 +153,7 @@ def config(request):
         if not (course_id and ppt_filename and page_number is not None and latest_languages):
             logger.info(
                 "Skipping client broadcast: Missing required fields (courseId, ppt_filename, page_number, or latest_languages).")
+            _await_presynthesis(presynthesis)
             return json.dumps({"success": True}), 200, {"Content-Type": "application/json"}
 
         # 2. Data Preparation / Normalization
@@ -110,6 +172,15 @@ def config(request):
 
         logger.info(
             f"Broadcasting live slide update for course: {course_id} / PPT: {safe_ppt_id} / Slide: {page_number}")
+        # Buffered; written in per-course batches off the request path
+        usage_counters.increment(course_id, "slide_changes")
+        course_utils.log_presentation_event(course_id, {
+            "type": "slide_change",
+            "presentation_id": safe_ppt_id,
+            "page_number": page_number,
+            "languages": sorted(latest_languages),
+            "timestamp": firestore.SERVER_TIMESTAMP,
+        })
 
         # 3. Database Operations
         try:
@@ -155,6 +226,7 @@ def config(request):
             logger.error(
                 f"❌ Failed to broadcast live slide updates: {b_e}", exc_info=True)
 
+        _await_presynthesis(presynthesis)
         return json.dumps({"success": True}), 200, {
             "Content-Type": "application/json"
         }
@@ -1,12 +1,11 @@
 """Message generation logic with caching."""
 import logging
 import asyncio
-from google.genai import types
 from firestore_utils import (
     get_cached_presentation_message,
     cache_presentation_message
 )
-from agent_config import runner
+from agent_config import get_runner
 from utils import normalize_context, session_id_for
 
 
@@ -63,6 +62,9 @@ def generate_presentation_message(language_code="en", context="", course_id=None
         )
 
     try:
+        from google.genai import types
+
+        runner = get_runner()
         # Use per-notes session to avoid reusing earlier conversation
         session_id = session_id_for(language_code, context)
         user_id = "system"
@@ -10,12 +10,21 @@ def normalize_context(context: str) -> str:
     return " ".join(str(context).split())
 
 
-def sanitize_text_for_tts(text: str, max_length: int = 5000) -> str:
+# Google TTS rejects requests whose input exceeds 5000 bytes
+TTS_MAX_INPUT_BYTES = 5000
+
+_SENTENCE_SPLIT = re.compile(r'([.!?。！？])\s*')
+
+
+def sanitize_text_for_tts(text: str, max_length: int = None) -> str:
     """Clean and prepare text for Google TTS API.
     
     Args:
         text: Input text to sanitize
-        max_length: Maximum character length for TTS input
+        max_length: Optional maximum character length. When given, only the
+            first sentence-aligned chunk is returned (legacy behaviour);
+            by default the full text is kept and long texts should be
+            chunked with split_text_for_tts.
         
     Returns:
         Sanitized text safe for TTS API
@@ -35,35 +44,74 @@ def sanitize_text_for_tts(text: str, max_length: int = 5000) -> str:
     # Normalize whitespace
     text = ' '.join(text.split())
     
-    # Ensure sentences end with proper punctuation
-    # Split very long sentences at natural break points
-    if len(text) > max_length:
-        # Try to split at sentence boundaries
-        sentences = re.split(r'([.!?。！？])\s*', text)
-        result = []
-        current_chunk = ""
-        
-        for i in range(0, len(sentences), 2):
-            sentence = sentences[i]
-            punct = sentences[i + 1] if i + 1 < len(sentences) else ""
-            
-            # If adding this sentence would exceed max, start new chunk
-            if len(current_chunk) + len(sentence) + len(punct) > max_length:
-                if current_chunk:
-                    result.append(current_chunk.strip())
-                current_chunk = sentence + punct
-            else:
-                current_chunk += sentence + punct
-        
-        if current_chunk:
-            result.append(current_chunk.strip())
-        
-        # Return first chunk only (or consider limiting message generation)
-        text = result[0] if result else text[:max_length]
+    if max_length and len(text) > max_length:
+        chunks = split_text_for_tts(text, max_chars=max_length)
+        text = chunks[0] if chunks else text[:max_length]
     
     return text.strip()
 
 
+def _hard_split(sentence: str, max_chars: int, max_bytes: int):
+    """Split a single over-long sentence at spaces, else at characters."""
+    pieces = []
+    current = ""
+    for token in re.split(r'(\s+)', sentence):
+        for char in (token if _too_long(token, max_chars, max_bytes) else [token]):
+            if current and _too_long(current + char, max_chars, max_bytes):
+                pieces.append(current.strip())
+                current = ""
+            current += char
+    if current.strip():
+        pieces.append(current.strip())
+    return pieces
+
+
+def _too_long(text: str, max_chars: int, max_bytes: int) -> bool:
+    return len(text) > max_chars or len(text.encode("utf-8")) > max_bytes
+
+
+def split_text_for_tts(
+    text: str,
+    max_chars: int = 5000,
+    max_bytes: int = TTS_MAX_INPUT_BYTES,
+):
+    """Split text into sentence-aligned chunks within char and byte limits.
+
+    Sentences are packed greedily in order; a sentence that alone exceeds
+    the limits is split at whitespace (or characters for CJK text). The
+    chunks joined with spaces reproduce the input text.
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    if not _too_long(text, max_chars, max_bytes):
+        return [text]
+
+    sentences = _SENTENCE_SPLIT.split(text)
+    chunks = []
+    current = ""
+    for i in range(0, len(sentences), 2):
+        sentence = sentences[i]
+        punct = sentences[i + 1] if i + 1 < len(sentences) else ""
+        piece = (sentence + punct).strip()
+        if not piece:
+            continue
+        candidate = f"{current} {piece}" if current else piece
+        if not _too_long(candidate, max_chars, max_bytes):
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+            current = ""
+        if _too_long(piece, max_chars, max_bytes):
+            chunks.extend(_hard_split(piece, max_chars, max_bytes))
+        else:
+            current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
 def session_id_for(language_code: str, context: str) -> str:
     """Build a stable session id per language and notes content.
 
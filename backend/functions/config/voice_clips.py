@@ -0,0 +1,137 @@
+"""Resolve reply texts to public voice clip URLs.
+
+welcome() and goodbye() attach a ``voiceUrl`` to their replies and config()
+pre-synthesizes the clips whenever it writes new messages, so those lookups
+are index hits. Voices come from the course voice config.
+
+The speech function and the dialog service also use its shared clients.
+
+This module is shared by the config, speech, welcome, goodbye and dialog
+functions (the copies must stay identical).
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import audio_index
+import course_utils
+from utils import sanitize_text_for_tts
+
+logger = logging.getLogger(__name__)
+
+# Map the short codes used in config messages to configured voices
+VOICE_LANGUAGE_MAP = {
+    "en": "en-US",
+    "zh": "zh-CN",
+    "yue": "yue-HK",
+}
+
+# Clients are created on first use and reused across requests
+_storage_client = None
+_tts_client = None
+
+
+def get_storage_client():
+    global _storage_client
+    if _storage_client is None:
+        from google.cloud import storage
+
+        _storage_client = storage.Client()
+    return _storage_client
+
+
+def get_tts_client():
+    global _tts_client
+    if _tts_client is None:
+        from google.cloud import texttospeech
+
+        _tts_client = texttospeech.TextToSpeechClient()
+    return _tts_client
+
+
+def bucket_name():
+    return os.environ.get("SPEECH_FILE_BUCKET")
+
+
+def voice_language(language_code: str) -> str:
+    return VOICE_LANGUAGE_MAP.get(language_code, language_code)
+
+
+def ensure_clip_variants(text: str, language_code: str, course_id: str = None, formats=None):
+    """Ensure the clip exists in every format; return {format: public_url}.
+
+    Raises on configuration, TTS or upload errors.
+    """
+    name = bucket_name()
+    if not name:
+        raise RuntimeError("SPEECH_FILE_BUCKET env var missing")
+    lang = voice_language(language_code)
+    variants = audio_index.ensure_audio_variants(
+        sanitize_text_for_tts(text),
+        course_utils.get_voice_params(course_id, lang),
+        get_storage_client().bucket(name),
+        get_tts_client(),
+        lang,
+        formats=formats,
+    )
+    return {fmt: audio_index.public_url(name, obj) for fmt, obj in variants.items()}
+
+
+def get_voice_url(text: str, language_code: str, course_id: str = None):
+    """Return the MP3 URL for ``text``, synthesizing it on a miss.
+
+    Returns None (and logs) when the text is empty, no bucket is configured
+    or synthesis fails, so callers can still send the text reply.
+    """
+    if not text or not bucket_name():
+        return None
+    try:
+        return ensure_clip_variants(text, language_code, course_id)["mp3"]
+    except Exception as e:
+        logger.error("Voice clip for %s failed: %s", language_code, e)
+        return None
+
+
+def clip_indexed(text: str, language_code: str, course_id: str = None, formats=None) -> bool:
+    """Whether every variant of the clip is in this instance's index LRU (no I/O).
+
+    The key covers the text and the course's voice, so a changed message
+    or voice is not indexed yet.
+    """
+    try:
+        lang = voice_language(language_code)
+        voice = audio_index.voice_id(course_utils.get_voice_params(course_id, lang))
+        clean_text = sanitize_text_for_tts(text)
+        index = audio_index.get_index()
+        for fmt in formats or audio_index.DEFAULT_VARIANTS:
+            spec = audio_index.AUDIO_VARIANTS[fmt]
+            key = audio_index.audio_key(voice, clean_text, encoding=spec["encoding"],
+                                        sample_rate_hertz=spec["sample_rate_hertz"])
+            if index.cached(key) is None:
+                return False
+        return True
+    except Exception as e:
+        logger.debug("Index check for %s failed: %s", language_code, e)
+        return False
+
+
+def presynthesize(texts_by_language: dict, course_id: str = None) -> int:
+    """Synthesize every {language: text} clip that is not indexed yet.
+
+    Values may be plain texts or ``{"text": ...}`` dicts (presentation
+    messages). Clips already in the index LRU are skipped without any call,
+    so only new or changed messages (or voices) cost work. Returns the
+    number of clips that are now available.
+    """
+    jobs = [
+        (language_code, text.get("text") if isinstance(text, dict) else text)
+        for language_code, text in texts_by_language.items()
+    ]
+    jobs = [(lang, text) for lang, text in jobs if text]
+    missing = [(lang, text) for lang, text in jobs if not clip_indexed(text, lang, course_id)]
+    ready = len(jobs) - len(missing)
+    if not missing:
+        return ready
+    with ThreadPoolExecutor(max_workers=min(len(missing), 4)) as executor:
+        urls = list(executor.map(lambda job: get_voice_url(job[1], job[0], course_id), missing))
+    return ready + sum(1 for url in urls if url)
@@ -0,0 +1,45 @@
+import config_snapshot
+
+def get_config():
+    """Return the messages config from this instance's live snapshot.
+
+    Served from memory; see config_snapshot for how it is kept fresh.
+    """
+    return config_snapshot.get_snapshot(get_default_config).get()
+
+def get_versioned_config():
+    """Return ``(config, version)`` from the same snapshot (see get_config)."""
+    return config_snapshot.get_snapshot(get_default_config).get_versioned()
+
+def get_default_config():
+    return {
+        "welcome_messages": {
+            "en": "Welcome! How can I help you today?",
+            "zh": "欢迎！今天我能为您做些什么？"
+        },
+        "goodbye_messages": {
+            "en": "Goodbye! Have a great day!",
+            "zh": "再见！祝您有美好的一天！"
+        },
+        "recommended_questions": {
+            "en": [
+                "What can you help me with?",
+                "How does this work?",
+                "Can you explain more about this topic?"
+            ],
+            "zh": [
+                "你能帮我做什么？",
+                "这是如何工作的？",
+                "你能详细解释一下这个话题吗？"
+            ]
+        },
+        "talk_responses": {
+            "en": "I understand your question. Let me help you with that.",
+            "zh": "我理解您的问题。让我来帮助您。"
+        },
+        "presentation_messages": {
+            "en": "Hello! I am your presenter for today. Let's get started.",
+            "zh-CN": "大家好！我是今天的演讲者。让我们开始吧。",
+            "yue-HK": "大家好！我係今日嘅演讲者。让我哋开始啦。"
+        }
+    }
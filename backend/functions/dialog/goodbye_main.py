@@ -0,0 +1,76 @@
+import json
+import uuid
+import logging
+import os
+import sys
+from datetime import datetime
+import functions_framework
+from auth_utils import validate_authentication, get_key_context
+from firestore_utils import get_versioned_config
+import http_cache
+import voice_clips
+
+_level_name = os.environ.get("LOG_LEVEL", "DEBUG").upper()
+_level = getattr(logging, _level_name, logging.DEBUG)
+_root = logging.getLogger()
+_root.setLevel(_level)
+if not any(isinstance(h, logging.StreamHandler) for h in _root.handlers):
+    _handler = logging.StreamHandler(sys.stdout)
+    _formatter = logging.Formatter(
+        "%(levelname)s:%(name)s:%(asctime)s:%(message)s"
+    )
+    _handler.setFormatter(_formatter)
+    _handler.setLevel(_level)
+    _root.addHandler(_handler)
+logger = logging.getLogger(__name__)
+logger.setLevel(_level)
+
+
+@functions_framework.http
+def goodbye(request):
+    # Authentication check
+    logger.debug("goodbye invoked")
+    auth_error = validate_authentication(request)
+    if auth_error:
+        logger.warning("auth_error: %s", auth_error)
+        return auth_error
+    
+    request_json = request.get_json(silent=True) or {}
+    logger.debug("request_json: %s", request_json)
+    
+    trace_id = request_json.get("traceId", str(uuid.uuid4()))
+    session_id = request_json.get("sessionId", str(uuid.uuid4()))
+    language_code = request_json.get("languageCode", "en")
+    # A registered API key pins the course (and presenter) it serves; the body cannot override it
+    key_context = get_key_context(request)
+    course_id = key_context.get("course_id") or request_json.get("courseId")
+    
+    config, config_version = get_versioned_config()
+    goodbye_messages = config.get("goodbye_messages", {})
+    
+    reply = goodbye_messages.get(
+        language_code, goodbye_messages.get("en", "Goodbye!")
+    )
+    logger.debug("reply_text: %s", reply)
+    voice_language = language_code if language_code in goodbye_messages else "en"
+    voice_url = voice_clips.get_voice_url(reply, voice_language, course_id)
+    # A reply without its voice clip gets no validator, so the next request retries the clip
+    etag = http_cache.make_etag(config_version, "goodbye", reply, voice_language, course_id, voice_url) \
+        if voice_url else None
+    if etag and http_cache.etag_matches(request, etag):
+        logger.debug("not modified: %s", etag)
+        return http_cache.not_modified(etag)
+    response = {
+        "id": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "traceId": trace_id,
+        "sessionId": session_id,
+        "replyText": reply,
+        "replyType": "Goodbye",
+        "timestamp": datetime.now().timestamp(),
+        "extra": request_json.get("extra", {})
+    }
+    if voice_url:
+        response["voiceUrl"] = voice_url
+    
+    headers = {"Content-Type": "application/json", **(http_cache.cache_headers(etag) if etag else {})}
+    return json.dumps(response), 200, headers
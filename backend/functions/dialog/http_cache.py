@@ -0,0 +1,49 @@
+"""Conditional requests (ETag / If-None-Match) for the read endpoints.
+
+recquestions, welcome and goodbye answer every student with the same
+content until the messages config changes. Their ETags are derived from
+the config snapshot version plus the request inputs that select the
+content (language, presenter, course) and, for welcome and goodbye, the
+resolved voice clip URL, so a poller that sends the ETag back in
+``If-None-Match`` gets an empty 304 until the config (or the clip)
+changes, and the handler skips building the body. A reply whose voice
+clip could not be resolved carries no ETag, so it is never revalidated
+in place of the reply with audio.
+
+The ETag validates the content fields (``data``, ``replyText``,
+``voiceUrl``); per-request echo fields such as ``traceId`` and
+``timestamp`` are not part of it.
+
+This module is shared by the welcome, goodbye, recquestions and dialog
+functions (the copies must stay identical).
+"""
+import hashlib
+import json
+import os
+
+CACHE_CONTROL = os.environ.get("READ_CACHE_CONTROL", "private, no-cache")
+
+
+def make_etag(config_version, *parts) -> str:
+    """Strong ETag for the content selected by ``parts`` under ``config_version``."""
+    payload = json.dumps([config_version, *parts], ensure_ascii=False, default=str)
+    return '"%s"' % hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def etag_matches(request, etag: str) -> bool:
+    """True when the request's If-None-Match lists ``etag`` (or is ``*``)."""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    # If-None-Match uses the weak comparison (RFC 9110, 13.1.2)
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str):
+    """Empty 304 response carrying the validator."""
+    return "", 304, cache_headers(etag)
@@ -0,0 +1,47 @@
+"""Optional consolidated dialog service.
+
+One deployable that serves welcome, goodbye, recquestions and speech, so a
+session's first welcome -> speech -> recquestions sequence costs one cold
+start and every handler shares the same warm clients, config snapshot,
+presenter directory and audio index.
+
+Requests are routed on the last path segment (``/welcome``,
+``/api/welcome``, ...). The per-function entry points are re-exported, so
+this source can also be deployed with ``entryPoint: welcome`` etc.
+
+The ``*_main.py`` handler modules are copies of the per-function main.py
+files (the copies must stay identical).
+"""
+import json
+import logging
+
+import functions_framework
+
+from welcome_main import welcome
+from goodbye_main import goodbye
+from recquestions_main import recquestions
+from speech_main import speech
+
+logger = logging.getLogger(__name__)
+
+ROUTES = {
+    "welcome": welcome,
+    "goodbye": goodbye,
+    "recquestions": recquestions,
+    "speech": speech,
+}
+
+
+def route_for(path: str):
+    return (path or "").rstrip("/").rsplit("/", 1)[-1]
+
+
+@functions_framework.http
+def dialog(request):
+    route = route_for(request.path)
+    handler = ROUTES.get(route)
+    if handler is None:
+        logger.warning("No dialog route for path %s", request.path)
+        return json.dumps({"error": "Not found"}), 404, {"Content-Type": "application/json"}
+    logger.debug("dialog route: %s", route)
+    return handler(request)
@@ -0,0 +1,235 @@
+import json
+import uuid
+import logging
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+import functions_framework
+from flask import Response
+from auth_utils import validate_authentication, get_key_context
+from firestore_utils import get_config
+import course_utils
+import audio_index
+import usage_counters
+import voice_clips
+from utils import sanitize_text_for_tts
+
+_level_name = os.environ.get("LOG_LEVEL", "DEBUG").upper()
+_level = getattr(logging, _level_name, logging.DEBUG)
+_root = logging.getLogger()
+_root.setLevel(_level)
+if not any(isinstance(h, logging.StreamHandler) for h in _root.handlers):
+    _handler = logging.StreamHandler(sys.stdout)
+    _formatter = logging.Formatter(
+        "%(levelname)s:%(name)s:%(asctime)s:%(message)s"
+    )
+    _handler.setFormatter(_formatter)
+    _handler.setLevel(_level)
+    _root.addHandler(_handler)
+logger = logging.getLogger(__name__)
+logger.setLevel(_level)
+
+# Clients are created on first use and shared with voice_clips, so one pair
+# serves every handler in the process
+_get_storage_client = voice_clips.get_storage_client
+_get_tts_client = voice_clips.get_tts_client
+
+# Runs synthesis + upload for streamed responses so the audio can be sent
+# while the upload is still in flight
+_audio_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SPEECH_STREAM_WORKERS", "8"))
+)
+STREAM_CHUNK_BYTES = 32 * 1024
+
+
+def _negotiate_audio_format(request, request_json):
+    """Return the variant the client asked for ("mp3" unless it opts in).
+
+    ``audioFormat`` in the body wins; otherwise an Accept header that lists
+    ``audio/ogg`` or ``audio/opus`` selects the Opus variant. XiaoIce sends
+    neither and keeps getting MP3.
+    """
+    requested = str(request_json.get("audioFormat") or "").strip().lower()
+    if requested in audio_index.AUDIO_VARIANTS:
+        return requested
+    accept = (request.headers.get("Accept") or "").lower()
+    if "audio/ogg" in accept or "audio/opus" in accept:
+        return "opus"
+    return "mp3"
+
+
+def _wants_stream(request, request_json) -> bool:
+    """Streamed mode is opt-in: ``responseMode: "stream"`` or the header."""
+    mode = request_json.get("responseMode") or request.headers.get("X-Speech-Response")
+    return str(mode or "").strip().lower() in ("stream", "audio")
+
+
+def _stream_audio(audio_content, content_type, pending, headers):
+    """Send freshly synthesized bytes while the background upload finishes.
+
+    The generator waits for the upload after the last chunk so the work
+    completes inside the request (instances may not get CPU afterwards).
+    The client already has every byte by then thanks to Content-Length.
+    """
+    def _generate():
+        for start in range(0, len(audio_content), STREAM_CHUNK_BYTES):
+            yield audio_content[start:start + STREAM_CHUNK_BYTES]
+        try:
+            variants = pending.result()
+            logger.info("Background upload finished: %s", variants)
+        except Exception as e:
+            logger.error("Background upload failed: %s", e)
+
+    headers = dict(headers, **{"Content-Length": str(len(audio_content))})
+    return Response(_generate(), status=200, mimetype=content_type, headers=headers)
+
+
+@functions_framework.http
+def speech(request):
+    logger.debug("speech invoked")
+    auth_error = validate_authentication(request)
+    if auth_error:
+        logger.warning("auth_error: %s", auth_error)
+        return auth_error
+
+    request_json = request.get_json(silent=True) or {}
+    logger.debug("request_json: %s", request_json)
+
+    trace_id = request_json.get("traceId", str(uuid.uuid4()))
+    session_id = request_json.get("sessionId", str(uuid.uuid4()))
+    language_code = request_json.get("languageCode", "en")
+    # A registered API key pins the course (and presenter) it serves; the body cannot override it
+    key_context = get_key_context(request)
+    course_id = key_context.get("course_id") or request_json.get("courseId")
+    usage_counters.increment(course_id, "requests")
+
+    userParams = request_json.get("userParams", {})
+    logger.debug("userParams: %s", userParams)
+
+    is_presentation = False
+    if isinstance(userParams, str):
+        is_presentation = "presentation" in userParams.lower()
+
+    config = get_config()
+
+    if is_presentation:
+        messages = config.get("presentation_messages", {})
+        logger.debug("Using presentation_messages")
+        reply = messages.get(language_code, messages.get("en", "Hello"))
+    else:
+        messages = config.get("welcome_messages", {})
+        logger.debug("Using welcome_messages")
+        reply = messages.get(language_code, messages.get("en", "Welcome!"))
+
+    bucket_name = os.environ.get("SPEECH_FILE_BUCKET")
+    if not bucket_name:
+        logger.error("SPEECH_FILE_BUCKET env var missing")
+        error_resp = {"error": "Server configuration error"}
+        return (
+            json.dumps(error_resp),
+            500,
+            {"Content-Type": "application/json"}
+        )
+
+    audio_format = _negotiate_audio_format(request, request_json)
+    formats = list(audio_index.DEFAULT_VARIANTS)
+    if audio_format not in formats:
+        formats.append(audio_format)
+
+    audio_url = None
+    variant_urls = {}
+    try:
+        # Content address: (voice, rate, encoding, sanitized text). A known
+        # clip is resolved from the index without touching the bucket.
+        voice = course_utils.get_voice_params(course_id, language_code)
+        bucket = _get_storage_client().bucket(bucket_name)
+        text = sanitize_text_for_tts(reply)
+        ensure_args = (
+            text,
+            voice,
+            bucket,
+            _get_tts_client(),
+            language_code,
+        )
+
+        def _count_tts(fmt, content, object_name):
+            # Only fresh syntheses are billed; indexed clips cost nothing
+            usage_counters.increment(course_id, "tts_chars", len(text))
+
+        if _wants_stream(request, request_json):
+            # Whichever comes first: fresh audio bytes (stream them now and
+            # upload behind them) or the requested variant's object name (a
+            # cached clip). Other variants finish on the executor.
+            fresh_audio, resolved = Future(), Future()
+            ready = {}
+
+            def _on_audio(fmt, content, object_name):
+                _count_tts(fmt, content, object_name)
+                if fmt == audio_format and not fresh_audio.done():
+                    fresh_audio.set_result((content, object_name))
+
+            def _on_ready(fmt, object_name):
+                ready[fmt] = object_name
+                if fmt == audio_format:
+                    resolved.set_result(object_name)
+
+            pending = _audio_executor.submit(
+                audio_index.ensure_audio_variants,
+                *ensure_args,
+                formats=formats,
+                on_audio=_on_audio,
+                on_ready=_on_ready,
+            )
+            wait([fresh_audio, resolved, pending], return_when=FIRST_COMPLETED)
+            if fresh_audio.done():
+                content, object_name = fresh_audio.result()
+                encoding = audio_index.AUDIO_VARIANTS[audio_format]["encoding"]
+                logger.info("Streaming fresh speech audio: %s", object_name)
+                return _stream_audio(
+                    content,
+                    audio_index.content_type_for(encoding),
+                    pending,
+                    {
+                        "X-Voice-Url": audio_index.public_url(bucket_name, object_name),
+                        "X-Voice-Format": audio_format,
+                        "X-Trace-Id": trace_id,
+                        "X-Session-Id": session_id,
+                        "Cache-Control": "no-store",
+                    },
+                )
+            # Variants still being synthesized are left out of voiceVariants
+            variants = dict(ready) if resolved.done() else pending.result()
+        else:
+            variants = audio_index.ensure_audio_variants(*ensure_args, formats=formats, on_audio=_count_tts)
+        logger.info("Speech files: %s", variants)
+        logger.info("Audio metrics: %s", json.dumps(audio_index.get_metrics()))
+
+        variant_urls = {
+            fmt: audio_index.public_url(bucket_name, name)
+            for fmt, name in variants.items()
+        }
+        audio_url = variant_urls[audio_format]
+    except Exception as e:
+        logger.error("Text-to-Speech or upload failed: %s", e)
+        error_resp = {"error": "Speech synthesis failed", "details": str(e)}
+        return (
+            json.dumps(error_resp),
+            500,
+            {"Content-Type": "application/json"}
+        )
+
+    response = {
+        "id": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "traceId": trace_id,
+        "sessionId": session_id,
+        "voiceUrl": audio_url,
+        "voiceFormat": audio_format,
+        "voiceVariants": variant_urls,
+        "replyType": "Voice",
+        "timestamp": datetime.now().timestamp(),
+        "extra": request_json.get("extra", {})
+    }
+
+    return json.dumps(response), 200, {"Content-Type": "application/json"}
+
@@ -0,0 +1,158 @@
+import json
+import uuid
+import logging
+import os
+import sys
+from datetime import datetime
+import functions_framework
+from auth_utils import validate_authentication, get_key_context
+from firestore_utils import get_versioned_config
+import http_cache
+import voice_clips
+import presenter_directory
+
+_level_name = os.environ.get("LOG_LEVEL", "DEBUG").upper()
+_level = getattr(logging, _level_name, logging.DEBUG)
+_root = logging.getLogger()
+_root.setLevel(_level)
+if not any(isinstance(h, logging.StreamHandler) for h in _root.handlers):
+    _handler = logging.StreamHandler(sys.stdout)
+    _formatter = logging.Formatter(
+        "%(levelname)s:%(name)s:%(asctime)s:%(message)s"
+    )
+    _handler.setFormatter(_formatter)
+    _handler.setLevel(_level)
+    _root.addHandler(_handler)
+logger = logging.getLogger(__name__)
+logger.setLevel(_level)
+
+# Load the presenters while the instance waits for its first request
+presenter_directory.preload_async()
+
+
+@functions_framework.http
+def welcome(request):
+    logger.debug("welcome invoked")
+    auth_error = validate_authentication(request)
+    if auth_error:
+        logger.warning("auth_error: %s", auth_error)
+        return auth_error
+    
+    request_json = request.get_json(silent=True) or {}
+    logger.debug("request_json: %s", request_json)
+    
+    trace_id = request_json.get("traceId", str(uuid.uuid4()))
+    session_id = request_json.get("sessionId", str(uuid.uuid4()))
+    language_code = request_json.get("languageCode", "en")
+    # A registered API key pins the course (and presenter) it serves; the body cannot override it
+    key_context = get_key_context(request)
+    course_id = key_context.get("course_id") or request_json.get("courseId")
+
+    userParams = request_json.get("userParams", {})
+    logger.debug("userParams: %s", userParams)
+
+    presenter_id = None
+    if isinstance(userParams, dict):
+        presenter_id = userParams.get("presenterId")
+    elif isinstance(userParams, str):
+        # Handle string format like "summer-presentation" or just "summer"
+        if "-" in userParams:
+            parts = userParams.split("-")
+            # Heuristic: assume the first part is the ID if the second is 'presentation'
+            # or just take the first part as a best guess.
+            if len(parts) > 0:
+                presenter_id = parts[0]
+        else:
+            presenter_id = userParams
+            
+    presenter_id = key_context.get("presenter_id") or presenter_id
+    logger.debug(f"Extracted presenter_id: {presenter_id}")
+
+    presenter = None
+    if presenter_id:
+        presenter = presenter_directory.get_presenter(presenter_id)
+        logger.debug(f"Fetched presenter: {presenter}")
+        if presenter and "language" in presenter:
+            language_code = presenter["language"]
+            logger.debug(f"Using presenter language: {language_code}")
+        if presenter and not course_id:
+            course_id = presenter.get("courseId")
+
+    # Check if this is a presentation context
+    is_presentation = False
+    if isinstance(userParams, str):
+        is_presentation = "presentation" in userParams.lower()
+    
+    config, config_version = get_versioned_config()
+    
+    # Use presentation_messages if presentation context,
+    # otherwise welcome_messages
+    voice_url = None
+    voice_language = language_code
+    if is_presentation:
+        logger.debug("Using presentation_messages logic")
+        
+        # Map simple language codes to full codes used in the configuration
+        LANG_CODE_MAP = {
+            "en": "en-US",
+            "zh": "zh-CN",
+            "yue": "yue-HK",
+            "yue-HK": "yue-HK",
+            "zh-CN": "zh-CN",
+            "en-US": "en-US"
+        }
+        target_lang = LANG_CODE_MAP.get(language_code, "en-US")
+        logger.debug(f"Targeting language: {target_lang} for code: {language_code}")
+
+        presentation_messages = config.get("presentation_messages", {})
+        message_data = presentation_messages.get(target_lang)
+
+        voice_language = target_lang
+        if message_data and isinstance(message_data, dict) and "text" in message_data:
+            reply = message_data["text"]
+            # The seeder/config already synthesized this clip
+            voice_url = message_data.get("audio_url")
+        elif isinstance(message_data, str):
+            reply = message_data
+        else:
+            # Fallback to English if target lang not found
+            logger.warning(f"No presentation message found for {target_lang}, falling back to en-US")
+            voice_language = "en-US"
+            fallback_data = presentation_messages.get("en-US", {})
+            if isinstance(fallback_data, dict):
+                reply = fallback_data.get("text", "Hello")
+            elif isinstance(fallback_data, str):
+                reply = fallback_data
+            else:
+                reply = "Hello"
+    else:
+        messages = config.get("welcome_messages", {})        
+        logger.debug("Using welcome_messages")    
+        reply = messages.get(language_code, messages.get("en", "Welcome!"))
+        if language_code not in messages:
+            voice_language = "en"
+        
+    logger.debug("reply_text: %s", reply)
+    if not voice_url:
+        # Index hit after config() pre-synthesized it; synthesized otherwise
+        voice_url = voice_clips.get_voice_url(reply, voice_language, course_id)
+    # A reply without its voice clip gets no validator, so the next request retries the clip
+    etag = http_cache.make_etag(config_version, "welcome", reply, voice_language, course_id, voice_url) \
+        if voice_url else None
+    if etag and http_cache.etag_matches(request, etag):
+        logger.debug("not modified: %s", etag)
+        return http_cache.not_modified(etag)
+    response = {
+        "id": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "traceId": trace_id,
+        "sessionId": session_id,
+        "replyText": reply,
+        "replyType": "Llm",
+        "timestamp": datetime.now().timestamp(),
+        "extra": request_json.get("extra", {})
+    }
+    if voice_url:
+        response["voiceUrl"] = voice_url
+    
+    headers = {"Content-Type": "application/json", **(http_cache.cache_headers(etag) if etag else {})}
+    return json.dumps(response), 200, headers
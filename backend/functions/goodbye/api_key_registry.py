@@ -0,0 +1,202 @@
+"""Instance-local cache of the ``ApiKey`` registry.
+
+admin_tools/create_api_key.py registers each digital human's key as an
+``ApiKey`` document (the document ID is the key string) that may name a
+``course_id`` and ``presenter_id``. Authentication resolves the request's
+key here instead of reading Firestore on every request:
+
+- while the collection listener is healthy the whole registry is held in
+  memory, so known and unknown keys alike cost no read, and a revocation
+  (``revoked: true`` or a deleted document, see delete_api_key.py) is
+  applied as soon as the listener delivers it, typically within seconds;
+- while the listener is down (or disabled) keys are read one by one and
+  cached for ``API_KEY_CACHE_TTL`` seconds; unknown or revoked keys are
+  cached as well, for ``API_KEY_NEGATIVE_TTL`` seconds, so guessing keys
+  does not turn into a Firestore read per request. Only these per-key
+  entries are bounded (an LRU of ``API_KEY_CACHE_MAX``); the registry the
+  listener holds is never evicted, since a missing key there means invalid.
+
+This module is shared by the functions that use auth_utils (the copies
+must stay identical).
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+API_KEY_COLLECTION = "ApiKey"
+DEFAULT_TTL_SECONDS = float(os.environ.get("API_KEY_CACHE_TTL", "60"))
+DEFAULT_NEGATIVE_TTL_SECONDS = float(os.environ.get("API_KEY_NEGATIVE_TTL", "30"))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("API_KEY_CACHE_MAX", "10000"))
+LISTENER_ENABLED = os.environ.get(
+    "API_KEY_LISTENER", os.environ.get("CONFIG_LISTENER", "1")
+).strip().lower() not in ("0", "false", "no")
+
+
+def _api_keys_ref():
+    from google.cloud import firestore
+
+    db_name = os.environ.get("FIRESTORE_DATABASE", "langbridge").strip() or "langbridge"
+    return firestore.Client(database=db_name).collection(API_KEY_COLLECTION)
+
+
+def key_fingerprint(key: str) -> str:
+    """Short hash of a key string, for logs (never log the key itself)."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
+
+def key_context(data):
+    """Routing context of a registry document, or None if it is revoked."""
+    if not data or data.get("revoked"):
+        return None
+    return {
+        "digital_human_id": data.get("digital_human_id"),
+        "name": data.get("name"),
+        "course_id": data.get("course_id"),
+        "presenter_id": data.get("presenter_id"),
+    }
+
+
+class ApiKeyRegistry:
+    """Key string -> routing context (None for unknown or revoked keys)."""
+
+    def __init__(self, ref_factory=_api_keys_ref, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 negative_ttl_seconds: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, use_listener: bool = LISTENER_ENABLED,
+                 clock=time.monotonic):
+        self.ref_factory = ref_factory
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.use_listener = use_listener
+        self.clock = clock
+        self._ref = None
+        self._watch = None
+        # key -> (context or None, expires_at); the listener keeps it complete
+        self._entries = OrderedDict()
+        self._complete = False
+        # Bumped per subscription; snapshots of a replaced listener are ignored
+        self._generation = 0
+        self._listener_retry_at = 0.0
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "negative_hits": 0, "reads": 0, "read_errors": 0,
+                         "listener_events": 0, "revocations": 0}
+
+    def _collection(self):
+        if self._ref is None:
+            self._ref = self.ref_factory()
+        return self._ref
+
+    def _listener_active(self) -> bool:
+        return self._watch is not None and getattr(self._watch, "is_active", True)
+
+    def _store(self, key, context, now):
+        ttl = self.ttl_seconds if context is not None else self.negative_ttl_seconds
+        self._entries[key] = (context, now + ttl)
+        self._entries.move_to_end(key)
+        # A complete registry is authoritative: evicting a key would revoke it
+        while not self._complete and len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _start_listener(self):
+        if not self.use_listener or self._listener_active() or self.clock() < self._listener_retry_at:
+            return
+        # A broken listener is retried at most once per TTL
+        self._listener_retry_at = self.clock() + self.ttl_seconds
+        if self._watch is not None:
+            try:
+                self._watch.unsubscribe()
+            except Exception:
+                pass
+        # The new listener's first snapshot rebuilds the registry: keys deleted
+        # or revoked while the old one was down must not survive
+        self._complete = False
+        self._generation += 1
+        generation = self._generation
+        try:
+            self._watch = self._collection().on_snapshot(
+                lambda docs, changes, read_time: self._on_snapshot(docs, changes, read_time, generation)
+            )
+        except Exception as e:
+            self._watch = None
+            logger.warning("API key listener unavailable, caching per key: %s", e)
+
+    def _on_snapshot(self, docs, changes, read_time, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            now = self.clock()
+            if not self._complete:
+                # The first snapshot carries the whole registry
+                self._entries.clear()
+                self._complete = True
+                for doc in docs:
+                    self._store(doc.id, key_context(doc.to_dict()), now)
+            else:
+                for change in changes:
+                    doc = change.document
+                    removed = getattr(change.type, "name", change.type) == "REMOVED"
+                    context = None if removed else key_context(doc.to_dict())
+                    previous = self._entries.get(doc.id, (None, 0))[0]
+                    if previous is not None and context is None:
+                        self._metrics["revocations"] += 1
+                        logger.info("API key %s revoked", key_fingerprint(doc.id))
+                    self._store(doc.id, context, now)
+            self._metrics["listener_events"] += 1
+
+    def _read(self, collection, key):
+        """Point read of one key; called without the lock so misses do not queue behind I/O."""
+        try:
+            doc = collection.document(key).get()
+        except Exception as e:
+            with self._lock:
+                self._metrics["read_errors"] += 1
+            logger.error("Failed to read API key %s: %s", key_fingerprint(key), e)
+            return None
+        context = key_context(doc.to_dict()) if doc.exists else None
+        with self._lock:
+            self._store(key, context, self.clock())
+        return context
+
+    def resolve(self, key: str):
+        """Return the routing context of ``key``, or None if it is not valid."""
+        if not key:
+            return None
+        with self._lock:
+            self._start_listener()
+            now = self.clock()
+            listening = self._complete and self._listener_active()
+            entry = self._entries.get(key)
+            if entry is not None and (listening or now < entry[1]):
+                self._metrics["hits" if entry[0] is not None else "negative_hits"] += 1
+                return entry[0]
+            if listening:
+                # The registry is complete in memory: unknown key
+                self._metrics["negative_hits"] += 1
+                return None
+            self._complete = False
+            self._metrics["reads"] += 1
+            collection = self._collection()
+        return self._read(collection, key)
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["entries"] = len(self._entries)
+            metrics["listener_active"] = self._listener_active()
+            return metrics
+
+
+_registry = ApiKeyRegistry()
+
+
+def resolve(key: str):
+    return _registry.resolve(key)
+
+
+def get_metrics() -> dict:
+    return _registry.get_metrics()
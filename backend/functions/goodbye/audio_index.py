@@ -0,0 +1,411 @@
+"""Content-addressed naming and lookup of synthesized speech clips.
+
+This module is shared by speech(), the seeder and the admin tools. It is
+copied into the config, speech, welcome, goodbye and dialog functions (the
+copies must stay identical; tests/test_shared_modules.py checks them).
+
+A clip is addressed by (voice name, speaking rate, encoding, sanitized
+text), so identical audio is synthesized once and reused across courses.
+Object names are derived from that key and are never overwritten in place,
+which keeps them safe to cache at the CDN.
+
+Lookups are served from an in-process LRU first and from the Firestore
+``langbridge_audio_index`` collection second, so a known clip costs no GCS
+round trip. Entries are only written after a successful upload, and the
+index can be rebuilt from the bucket with ``bootstrap_from_bucket`` because
+every uploaded clip carries its key in the object metadata.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import tts_synth
+
+logger = logging.getLogger(__name__)
+
+INDEX_COLLECTION = "langbridge_audio_index"
+# Object metadata field that carries the index key (used for bootstrap)
+METADATA_KEY = "audio_key"
+DEFAULT_LRU_SIZE = 1024
+DEFAULT_ENCODING = "MP3"
+DEFAULT_SPEAKING_RATE = 1.0
+# Objects are immutable once written, so caches may keep them forever
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Named output variants generated together for every clip. OGG_OPUS at a
+# 16 kHz sample rate is several times smaller than the MP3 for speech. MP3
+# is always produced because ``audio_url``/``voiceUrl`` keep pointing at it.
+AUDIO_VARIANTS = {
+    "mp3": {"encoding": "MP3", "sample_rate_hertz": None},
+    "opus": {"encoding": "OGG_OPUS", "sample_rate_hertz": 16000},
+}
+DEFAULT_VARIANTS = ("mp3",) + tuple(
+    v.strip() for v in os.environ.get("SPEECH_AUDIO_FORMATS", "mp3,opus").split(",")
+    if v.strip() in AUDIO_VARIANTS and v.strip() != "mp3"
+)
+
+_ENCODING_FORMATS = {
+    "MP3": ("mp3", "audio/mpeg"),
+    "OGG_OPUS": ("ogg", "audio/ogg"),
+    "LINEAR16": ("wav", "audio/wav"),
+}
+
+
+def voice_id(voice) -> str:
+    """Stable identifier for a VoiceSelectionParams (name, else language)."""
+    name = getattr(voice, "name", "") or ""
+    if name:
+        return name
+    return f"{getattr(voice, 'language_code', '') or 'default'}:default"
+
+
+def encoding_name(encoding) -> str:
+    """Normalize an AudioEncoding enum or string to its name (e.g. 'MP3')."""
+    return str(getattr(encoding, "name", encoding) or DEFAULT_ENCODING).upper()
+
+
+def audio_key(
+    voice_name: str,
+    text: str,
+    speaking_rate: float = DEFAULT_SPEAKING_RATE,
+    encoding=DEFAULT_ENCODING,
+    sample_rate_hertz: int = None,
+) -> str:
+    """Hex SHA256 over voice, speaking rate, encoding and sanitized text.
+
+    A non-default sample rate is folded into the encoding part so keys of
+    default-rate clips stay unchanged.
+    """
+    encoding_part = encoding_name(encoding)
+    if sample_rate_hertz:
+        encoding_part = f"{encoding_part}@{int(sample_rate_hertz)}"
+    payload = "\n".join([
+        voice_name,
+        f"{float(speaking_rate):.2f}",
+        encoding_part,
+        text,
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def object_name_for(language_code: str, key: str, encoding=DEFAULT_ENCODING) -> str:
+    """Bucket object name for a clip with the given key."""
+    lang = (language_code or "").strip() or "unknown"
+    ext = _ENCODING_FORMATS.get(encoding_name(encoding), ("bin", None))[0]
+    return f"speech_{lang}_{key[:16]}.{ext}"
+
+
+def content_type_for(encoding) -> str:
+    return _ENCODING_FORMATS.get(
+        encoding_name(encoding), (None, "application/octet-stream")
+    )[1]
+
+
+def public_url(bucket_name: str, object_name: str) -> str:
+    """Direct public URL (the speech bucket is publicly readable)."""
+    return f"https://storage.googleapis.com/{bucket_name}/{object_name}"
+
+
+def _get_db():
+    from google.cloud import firestore
+
+    db_name = os.environ.get("FIRESTORE_DATABASE", "langbridge").strip()
+    if db_name:
+        return firestore.Client(database=db_name)
+    return firestore.Client(database="langbridge")
+
+
+class AudioIndex:
+    """LRU in front of a Firestore collection of key -> object name."""
+
+    def __init__(self, db=None, collection=INDEX_COLLECTION, max_entries=None):
+        self._db = db
+        self.collection = collection
+        self.max_entries = max_entries or int(
+            os.environ.get("AUDIO_INDEX_LRU_SIZE", DEFAULT_LRU_SIZE)
+        )
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = _get_db()
+        return self._db
+
+    def _remember(self, key, object_name):
+        with self._lock:
+            self._lru[key] = object_name
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def cached(self, key):
+        """Return the object name from the LRU only (no I/O)."""
+        with self._lock:
+            object_name = self._lru.get(key)
+            if object_name is not None:
+                self._lru.move_to_end(key)
+            return object_name
+
+    def lookup(self, key):
+        """Return the object name for ``key`` or None if it was never stored."""
+        object_name = self.cached(key)
+        if object_name is not None:
+            return object_name
+        try:
+            doc = self.db.collection(self.collection).document(key).get()
+        except Exception as e:
+            logger.error("Audio index lookup failed for %s: %s", key, e)
+            return None
+        if not doc.exists:
+            return None
+        object_name = (doc.to_dict() or {}).get("object_name")
+        if object_name:
+            self._remember(key, object_name)
+        return object_name
+
+    def record(self, key, object_name, **fields):
+        """Store ``key -> object_name``. Call only after the upload succeeded."""
+        from google.cloud import firestore
+
+        data = {"object_name": object_name, "updated_at": firestore.SERVER_TIMESTAMP}
+        data.update(fields)
+        try:
+            self.db.collection(self.collection).document(key).set(data, merge=True)
+        except Exception as e:
+            # The clip exists, so keep serving it from memory on this instance
+            logger.error("Audio index write failed for %s: %s", key, e)
+        self._remember(key, object_name)
+
+    def bootstrap_from_bucket(self, bucket, prefix="speech_"):
+        """Rebuild index entries from the object metadata of a bucket scan.
+
+        Returns (indexed, skipped). Objects uploaded before the index existed
+        carry no key metadata and are skipped.
+        """
+        indexed = skipped = 0
+        batch = self.db.batch()
+        pending = 0
+        for blob in bucket.list_blobs(prefix=prefix):
+            key = (blob.metadata or {}).get(METADATA_KEY)
+            if not key:
+                skipped += 1
+                continue
+            ref = self.db.collection(self.collection).document(key)
+            batch.set(ref, {"object_name": blob.name}, merge=True)
+            self._remember(key, blob.name)
+            indexed += 1
+            pending += 1
+            if pending >= 500:
+                batch.commit()
+                batch = self.db.batch()
+                pending = 0
+        if pending:
+            batch.commit()
+        logger.info("Audio index bootstrap: %d indexed, %d skipped", indexed, skipped)
+        return indexed, skipped
+
+
+_default_index = None
+
+
+def get_index() -> AudioIndex:
+    """Process-wide index instance (shared across requests)."""
+    global _default_index
+    if _default_index is None:
+        _default_index = AudioIndex()
+    return _default_index
+
+
+# In-process single flight: key -> Future resolving to the object name
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+_metrics = {
+    "index_hits": 0,
+    "syntheses": 0,
+    "deduplicated_in_process": 0,
+    "deduplicated_across_instances": 0,
+}
+_metrics_lock = threading.Lock()
+
+
+def _count(name: str):
+    with _metrics_lock:
+        _metrics[name] += 1
+
+
+def get_metrics() -> dict:
+    """Snapshot of the synthesis/deduplication counters for this instance."""
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def _is_precondition_failure(error) -> bool:
+    # google.api_core.exceptions.PreconditionFailed (HTTP 412)
+    return getattr(error, "code", None) == 412 or type(error).__name__ == "PreconditionFailed"
+
+
+def _synthesize_and_store(
+    key, text, voice, bucket, tts_client, language_code, speaking_rate, encoding,
+    sample_rate_hertz, index, on_audio=None
+):
+    """Synthesize and upload one clip. Returns (object_name, created)."""
+    from google.cloud import texttospeech
+
+    vid = voice_id(voice)
+    object_name = object_name_for(language_code, key, encoding)
+    config_kwargs = {
+        "audio_encoding": getattr(texttospeech.AudioEncoding, encoding_name(encoding)),
+        "speaking_rate": speaking_rate,
+    }
+    if sample_rate_hertz:
+        config_kwargs["sample_rate_hertz"] = int(sample_rate_hertz)
+    audio_content = tts_synth.synthesize_text(
+        tts_client,
+        text,
+        voice,
+        texttospeech.AudioConfig(**config_kwargs),
+        encoding_name=encoding_name(encoding),
+    )
+    _count("syntheses")
+    if on_audio is not None:
+        # Hand the bytes out before the upload (streamed responses)
+        on_audio(audio_content, object_name)
+
+    blob = bucket.blob(object_name)
+    blob.metadata = {METADATA_KEY: key}
+    blob.cache_control = CACHE_CONTROL
+    created = True
+    try:
+        # Only the first writer across all instances creates the object
+        blob.upload_from_string(
+            audio_content,
+            content_type=content_type_for(encoding),
+            if_generation_match=0,
+        )
+    except Exception as e:
+        if not _is_precondition_failure(e):
+            raise
+        logger.info("Another instance already uploaded %s; reusing it", object_name)
+        _count("deduplicated_across_instances")
+        created = False
+
+    # Index only after the object is known to exist
+    index.record(
+        key,
+        object_name,
+        voice=vid,
+        language_code=language_code,
+        speaking_rate=float(speaking_rate),
+        encoding=encoding_name(encoding),
+        sample_rate_hertz=sample_rate_hertz,
+    )
+    return object_name, created
+
+
+def ensure_audio(
+    text: str,
+    voice,
+    bucket,
+    tts_client,
+    language_code: str,
+    speaking_rate: float = DEFAULT_SPEAKING_RATE,
+    encoding=DEFAULT_ENCODING,
+    index: AudioIndex = None,
+    sample_rate_hertz: int = None,
+    on_audio=None,
+):
+    """Return (object_name, created) for the clip, synthesizing it only once.
+
+    ``text`` must already be sanitized for TTS. On an index hit this does no
+    GCS or TTS call at all. On a miss, concurrent calls for the same clip in
+    this process are coalesced so only one of them synthesizes (in parallel
+    chunks for long texts); the upload uses ``if_generation_match=0`` so only
+    one writer wins across instances and the others reuse its object.
+
+    ``on_audio(audio_bytes, object_name)`` is called only when this call
+    synthesizes the clip, as soon as the audio exists and before it is
+    uploaded.
+    """
+    index = index or get_index()
+    key = audio_key(voice_id(voice), text, speaking_rate, encoding, sample_rate_hertz)
+    object_name = index.lookup(key)
+    if object_name:
+        _count("index_hits")
+        return object_name, False
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+    if not leader:
+        _count("deduplicated_in_process")
+        return future.result(), False
+
+    try:
+        # A previous leader may have finished between our lookup and now
+        object_name = index.cached(key)
+        if object_name:
+            created = False
+        else:
+            object_name, created = _synthesize_and_store(
+                key, text, voice, bucket, tts_client, language_code,
+                speaking_rate, encoding, sample_rate_hertz, index, on_audio,
+            )
+        future.set_result(object_name)
+        return object_name, created
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def ensure_audio_variants(
+    text: str,
+    voice,
+    bucket,
+    tts_client,
+    language_code: str,
+    formats=None,
+    speaking_rate: float = DEFAULT_SPEAKING_RATE,
+    index: AudioIndex = None,
+    on_audio=None,
+    on_ready=None,
+):
+    """Ensure every requested variant exists; return {format: object_name}.
+
+    Variants are synthesized concurrently and indexed under their own keys,
+    so a cached MP3 and a missing Opus clip cost one synthesis only.
+    ``on_audio(format, audio_bytes, object_name)`` is forwarded to
+    ensure_audio. ``on_ready(format, object_name)`` is called as soon as each
+    variant is available (cached or uploaded), before the others finish.
+    """
+    formats = [f for f in (formats or DEFAULT_VARIANTS) if f in AUDIO_VARIANTS]
+
+    def _ensure(fmt):
+        spec = AUDIO_VARIANTS[fmt]
+        object_name, _ = ensure_audio(
+            text, voice, bucket, tts_client, language_code,
+            speaking_rate=speaking_rate,
+            encoding=spec["encoding"],
+            index=index,
+            sample_rate_hertz=spec["sample_rate_hertz"],
+            on_audio=(lambda *args: on_audio(fmt, *args)) if on_audio else None,
+        )
+        if on_ready:
+            on_ready(fmt, object_name)
+        return fmt, object_name
+
+    if len(formats) == 1:
+        return dict([_ensure(formats[0])])
+    with ThreadPoolExecutor(max_workers=len(formats)) as executor:
+        return dict(executor.map(_ensure, formats))
@@ -5,8 +5,10 @@ import os
 import sys
 from datetime import datetime
 import functions_framework
-from auth_utils import validate_authentication
-from firestore_utils import get_config
+from auth_utils import validate_authentication, get_key_context
+from firestore_utils import get_versioned_config
+import http_cache
+import voice_clips
 
 _level_name = os.environ.get("LOG_LEVEL", "DEBUG").upper()
 _level = getattr(logging, _level_name, logging.DEBUG)
@@ -39,14 +41,25 @@ def goodbye(request):
     trace_id = request_json.get("traceId", str(uuid.uuid4()))
     session_id = request_json.get("sessionId", str(uuid.uuid4()))
     language_code = request_json.get("languageCode", "en")
+    # A registered API key pins the course (and presenter) it serves; the body cannot override it
+    key_context = get_key_context(request)
+    course_id = key_context.get("course_id") or request_json.get("courseId")
     
-    config = get_config()
+    config, config_version = get_versioned_config()
     goodbye_messages = config.get("goodbye_messages", {})
     
     reply = goodbye_messages.get(
         language_code, goodbye_messages.get("en", "Goodbye!")
     )
     logger.debug("reply_text: %s", reply)
+    voice_language = language_code if language_code in goodbye_messages else "en"
+    voice_url = voice_clips.get_voice_url(reply, voice_language, course_id)
+    # A reply without its voice clip gets no validator, so the next request retries the clip
+    etag = http_cache.make_etag(config_version, "goodbye", reply, voice_language, course_id, voice_url) \
+        if voice_url else None
+    if etag and http_cache.etag_matches(request, etag):
+        logger.debug("not modified: %s", etag)
+        return http_cache.not_modified(etag)
     response = {
         "id": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "traceId": trace_id,
@@ -56,5 +69,8 @@ def goodbye(request):
         "timestamp": datetime.now().timestamp(),
         "extra": request_json.get("extra", {})
     }
+    if voice_url:
+        response["voiceUrl"] = voice_url
     
-    return json.dumps(response), 200, {"Content-Type": "application/json"}
+    headers = {"Content-Type": "application/json", **(http_cache.cache_headers(etag) if etag else {})}
+    return json.dumps(response), 200, headers
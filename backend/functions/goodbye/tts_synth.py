@@ -0,0 +1,288 @@
+"""Chunked, parallel Text-to-Speech synthesis.
+
+Texts longer than one TTS request are split at sentence boundaries (see
+utils.split_text_for_tts), the chunks are synthesized concurrently with a
+bounded thread pool, and the audio is stitched back together in order.
+
+MP3 chunks are stitched at the frame level: ID3 tags and Xing/Info header
+frames are dropped so the result is one continuous stream of audio frames.
+OGG_OPUS chunks are remuxed into a single logical Ogg stream: the first
+chunk's OpusHead/OpusTags headers are kept and every chunk's audio packets
+are repaginated under one serial number with continuous granule positions.
+Browsers' ``<audio>`` elements often stop after the first stream of a
+chained Ogg file, so plain concatenation is not enough.
+
+This module is shared by the config, speech, welcome, goodbye and dialog
+functions (the copies must stay identical).
+"""
+import logging
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import split_text_for_tts
+
+logger = logging.getLogger(__name__)
+
+# Target chunk size. Smaller than the 5000-byte API limit so that long texts
+# fan out into several parallel requests.
+DEFAULT_CHUNK_BYTES = int(os.environ.get("TTS_CHUNK_BYTES", "1500"))
+DEFAULT_MAX_WORKERS = int(os.environ.get("TTS_MAX_PARALLEL", "4"))
+
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG 1
+    2: [22050, 24000, 16000],  # MPEG 2
+    0: [11025, 12000, 8000],   # MPEG 2.5
+}
+
+
+def mp3_frame_length(header: bytes):
+    """Return the byte length of the Layer III frame starting at ``header``.
+
+    Returns None if the four bytes are not a valid MPEG audio Layer III
+    frame header.
+    """
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_index = (header[2] >> 4) & 0x0F
+    rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = _MP3_BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    coefficient = 144 if version == 3 else 72
+    return coefficient * bitrate // sample_rate + padding
+
+
+def _strip_id3(data: bytes) -> bytes:
+    """Remove a leading ID3v2 tag and a trailing ID3v1 tag."""
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = 0
+        for b in data[6:10]:
+            size = (size << 7) | (b & 0x7F)
+        footer = 10 if data[5] & 0x10 else 0
+        data = data[10 + size + footer:]
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
+
+
+def _strip_info_frame(data: bytes) -> bytes:
+    """Drop a leading Xing/Info metadata frame (it describes one chunk only)."""
+    length = mp3_frame_length(data[:4])
+    if length and (b"Xing" in data[:length] or b"Info" in data[:length]):
+        return data[length:]
+    return data
+
+
+def stitch_mp3(parts):
+    """Concatenate MP3 chunks into one frame stream, in order."""
+    if len(parts) == 1:
+        return parts[0]
+    return b"".join(_strip_info_frame(_strip_id3(part)) for part in parts)
+
+
+_OGG_HEADER = struct.Struct("<4sBBqIIIB")
+_OGG_CONTINUED, _OGG_BOS, _OGG_EOS = 0x01, 0x02, 0x04
+# Pages close after the packet that crosses this size, as libogg's do
+_OGG_PAGE_BYTES = 4096
+
+
+def _ogg_crc_table():
+    table = []
+    for i in range(256):
+        r = i << 24
+        for _ in range(8):
+            r = ((r << 1) ^ 0x04C11DB7) if r & 0x80000000 else (r << 1)
+        table.append(r & 0xFFFFFFFF)
+    return table
+
+
+_OGG_CRC_TABLE = _ogg_crc_table()
+
+
+def _ogg_crc(data: bytes) -> int:
+    crc = 0
+    for b in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _OGG_CRC_TABLE[(crc >> 24) ^ b]
+    return crc
+
+
+def ogg_pages(data: bytes):
+    """Yield ``(header_type, granule, serial, segment_table, body)`` per page."""
+    pos = 0
+    while pos < len(data):
+        capture, _, header_type, granule, serial, _, _, count = \
+            _OGG_HEADER.unpack_from(data, pos)
+        if capture != b"OggS":
+            raise ValueError(f"no Ogg page at offset {pos}")
+        table = data[pos + _OGG_HEADER.size:pos + _OGG_HEADER.size + count]
+        start = pos + _OGG_HEADER.size + count
+        pos = start + sum(table)
+        yield header_type, granule, serial, table, data[start:pos]
+
+
+def _ogg_packets(data: bytes):
+    """Return ``(packets, last_granule)`` for a single-stream Ogg file."""
+    packets, partial, granule = [], b"", 0
+    for _, page_granule, _, table, body in ogg_pages(data):
+        offset = 0
+        for lacing in table:
+            partial += body[offset:offset + lacing]
+            offset += lacing
+            if lacing < 255:
+                packets.append(partial)
+                partial = b""
+        if page_granule != -1:
+            granule = page_granule
+    return packets, granule
+
+
+def opus_packet_samples(packet: bytes) -> int:
+    """Duration of an Opus packet in 48 kHz samples (RFC 6716, section 3.1)."""
+    if not packet:
+        return 0
+    config = packet[0] >> 3
+    if config < 12:
+        frame = (480, 960, 1920, 2880)[config % 4]
+    elif config < 16:
+        frame = (480, 960)[config % 2]
+    else:
+        frame = (120, 240, 480, 960)[config % 4]
+    code = packet[0] & 0x03
+    if code == 0:
+        frames = 1
+    elif code in (1, 2):
+        frames = 2
+    else:
+        frames = packet[1] & 0x3F if len(packet) > 1 else 0
+    return frame * frames
+
+
+def _ogg_page(header_type, granule, serial, sequence, segments, body) -> bytes:
+    header = _OGG_HEADER.pack(b"OggS", 0, header_type, granule, serial, sequence, 0,
+                              len(segments))
+    page = bytearray(header + bytes(segments) + body)
+    struct.pack_into("<I", page, 22, _ogg_crc(page))
+    return bytes(page)
+
+
+def _paginate(packets, serial, sequence, first_flags=0, last_flags=0):
+    """Lay ``(packet, granule)`` pairs out as pages; granule -1 means none."""
+    pages, segments, body, granule, flags = [], [], b"", -1, first_flags
+
+    def flush(continued):
+        nonlocal segments, body, granule, flags
+        pages.append([flags, granule, segments, body])
+        segments, body, granule = [], b"", -1
+        flags = _OGG_CONTINUED if continued else 0
+
+    for packet, packet_granule in packets:
+        remaining = packet
+        while True:
+            lacing = min(len(remaining), 255)
+            segments.append(lacing)
+            body += remaining[:lacing]
+            remaining = remaining[lacing:]
+            if lacing < 255:
+                granule = packet_granule
+                if len(segments) == 255 or len(body) >= _OGG_PAGE_BYTES:
+                    flush(False)
+                break
+            if len(segments) == 255:
+                flush(True)
+    if segments:
+        flush(False)
+    if pages:
+        pages[-1][0] |= last_flags
+    return [_ogg_page(flags, granule, serial, sequence + i, segments, body)
+            for i, (flags, granule, segments, body) in enumerate(pages)]
+
+
+def stitch_ogg_opus(parts):
+    """Remux Ogg Opus chunks into one logical stream, in order."""
+    if len(parts) == 1:
+        return parts[0]
+    serial = next(ogg_pages(parts[0]))[2]
+    audio, offset, final_granule = [], 0, 0
+    for index, part in enumerate(parts):
+        packets, last_granule = _ogg_packets(part)
+        headers, part_audio = packets[:2], packets[2:]
+        if index == 0:
+            head, tags = headers
+        total = offset
+        for packet in part_audio:
+            total += opus_packet_samples(packet)
+            audio.append((packet, total))
+        # The chunk's own end trimming applies only to the end of the stream
+        final_granule = min(total, offset + last_granule)
+        offset = total
+    if audio:
+        audio[-1] = (audio[-1][0], final_granule)
+    pages = _paginate([(head, 0)], serial, 0, first_flags=_OGG_BOS)
+    pages += _paginate([(tags, 0)], serial, len(pages))
+    pages += _paginate(audio, serial, len(pages), last_flags=_OGG_EOS)
+    return b"".join(pages)
+
+
+def stitch_audio(parts, encoding_name: str) -> bytes:
+    if encoding_name == "MP3":
+        return stitch_mp3(parts)
+    return stitch_ogg_opus(parts)
+
+
+def _synthesis_input(text: str):
+    from google.cloud import texttospeech
+
+    return texttospeech.SynthesisInput(text=text)
+
+
+def synthesize_text(
+    tts_client,
+    text: str,
+    voice,
+    audio_config,
+    encoding_name: str = "MP3",
+    max_workers: int = None,
+    chunk_bytes: int = None,
+) -> bytes:
+    """Synthesize ``text`` of any length and return the audio bytes.
+
+    ``text`` must already be sanitized. Short texts cost exactly one request;
+    longer texts are split and synthesized with at most ``max_workers``
+    requests in flight.
+    """
+    if encoding_name in ("MP3", "OGG_OPUS"):
+        chunks = split_text_for_tts(text, max_bytes=chunk_bytes or DEFAULT_CHUNK_BYTES)
+    else:
+        # Containers such as WAV cannot simply be concatenated
+        chunks = split_text_for_tts(text)
+        if len(chunks) > 1:
+            logger.warning("Encoding %s cannot be chunked; truncating text", encoding_name)
+            chunks = chunks[:1]
+    if not chunks:
+        chunks = [text]
+
+    def _synthesize(chunk):
+        response = tts_client.synthesize_speech(
+            input=_synthesis_input(chunk),
+            voice=voice,
+            audio_config=audio_config,
+        )
+        return response.audio_content
+
+    if len(chunks) == 1:
+        return _synthesize(chunks[0])
+
+    workers = min(len(chunks), max_workers or DEFAULT_MAX_WORKERS)
+    logger.info("Synthesizing %d chunks with %d workers", len(chunks), workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        parts = list(executor.map(_synthesize, chunks))
+    return stitch_audio(parts, encoding_name)
@@ -5,7 +5,8 @@ import os
 import sys
 import functions_framework
 from auth_utils import validate_authentication
-from firestore_utils import get_config
+from firestore_utils import get_versioned_config
+import http_cache
 
 _level_name = os.environ.get("LOG_LEVEL", "DEBUG").upper()
 _level = getattr(logging, _level_name, logging.DEBUG)
@@ -38,7 +39,12 @@ def recquestions(request):
     trace_id = request_json.get("traceId", str(uuid.uuid4()))
     language_code = request_json.get("languageCode", "en")
     
-    config = get_config()
+    config, config_version = get_versioned_config()
+    etag = http_cache.make_etag(config_version, "recquestions", language_code)
+    if http_cache.etag_matches(request, etag):
+        logger.debug("not modified: %s", etag)
+        return http_cache.not_modified(etag)
+
     recommended_questions = config.get("recommended_questions", {})
     
     data = recommended_questions.get(
@@ -51,4 +57,5 @@ def recquestions(request):
         "traceId": trace_id
     }
     
-    return json.dumps(response), 200, {"Content-Type": "application/json"}
+    headers = {"Content-Type": "application/json", **http_cache.cache_headers(etag)}
+    return json.dumps(response), 200, headers
@@ -2,6 +2,8 @@ import hashlib
 import json
 import os
 
+import api_key_registry
+
 
 def validate_authentication(request):
     """Validates authentication headers and returns error response if invalid."""
@@ -19,9 +21,6 @@ def validate_authentication(request):
         if not all([timestamp, signature, access_key]):
             return json.dumps({"error": "Missing authentication headers"}), 401
 
-        if access_key != valid_access_key:
-            return json.dumps({"error": "Invalid access key"}), 401
-
         body_string = request.data.decode("utf-8")
         
         # Calculate v2 signature
@@ -32,7 +31,25 @@ def validate_authentication(request):
         if calculated_signature != signature:
             return json.dumps({"error": "Invalid signature"}), 401
 
+        # Besides the shared access key, keys registered in the ApiKey
+        # collection are accepted unless revoked (answered from memory; the
+        # signature is checked first so forged requests cost no lookup)
+        if access_key != valid_access_key and api_key_registry.resolve(access_key) is None:
+            return json.dumps({"error": "Invalid access key"}), 401
+
         return None
 
     except Exception as e:
         return json.dumps({"error": f"Authentication failed: {e}"}), 401
+
+
+def get_key_context(request) -> dict:
+    """Course/presenter context of the request's registered API key.
+
+    Empty for the shared access key. Call after validate_authentication; the
+    lookup is answered from the registry cache.
+    """
+    access_key = request.headers.get("X-Key") or request.headers.get("key")
+    if not access_key or access_key == os.getenv("XIAOICE_CHAT_ACCESS_KEY"):
+        return {}
+    return api_key_registry.resolve(access_key) or {}
@@ -1,17 +1,11 @@
-from google.cloud import firestore
+import config_snapshot
 
 def get_config():
-    try:
-        db = firestore.Client(database="langbridge")
-        doc_ref = db.collection('langbridge_config').document('messages')
-        doc = doc_ref.get()
-        
-        if doc.exists:
-            return doc.to_dict()
-        else:
-            return get_default_config()
-    except Exception:
-        return get_default_config()
+    """Return the messages config from this instance's live snapshot.
+
+    Served from memory; see config_snapshot for how it is kept fresh.
+    """
+    return config_snapshot.get_snapshot(get_default_config).get()
 
 def get_default_config():
     return {
@@ -3,13 +3,17 @@ import uuid
 import logging
 import os
 import sys
-import hashlib
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
 import functions_framework
-from auth_utils import validate_authentication
+from flask import Response
+from auth_utils import validate_authentication, get_key_context
 from firestore_utils import get_config
-from google.cloud import texttospeech, storage
 import course_utils
+import audio_index
+import usage_counters
+import voice_clips
+from utils import sanitize_text_for_tts
 
 _level_name = os.environ.get("LOG_LEVEL", "DEBUG").upper()
 _level = getattr(logging, _level_name, logging.DEBUG)
@@ -26,6 +30,60 @@ if not any(isinstance(h, logging.StreamHandler) for h in _root.handlers):
 logger = logging.getLogger(__name__)
 logger.setLevel(_level)
 
+# Clients are created on first use and shared with voice_clips, so one pair
+# serves every handler in the process
+_get_storage_client = voice_clips.get_storage_client
+_get_tts_client = voice_clips.get_tts_client
+
+# Runs synthesis + upload for streamed responses so the audio can be sent
+# while the upload is still in flight
+_audio_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SPEECH_STREAM_WORKERS", "8"))
+)
+STREAM_CHUNK_BYTES = 32 * 1024
+
+
+def _negotiate_audio_format(request, request_json):
+    """Return the variant the client asked for ("mp3" unless it opts in).
+
+    ``audioFormat`` in the body wins; otherwise an Accept header that lists
+    ``audio/ogg`` or ``audio/opus`` selects the Opus variant. XiaoIce sends
+    neither and keeps getting MP3.
+    """
+    requested = str(request_json.get("audioFormat") or "").strip().lower()
+    if requested in audio_index.AUDIO_VARIANTS:
+        return requested
+    accept = (request.headers.get("Accept") or "").lower()
+    if "audio/ogg" in accept or "audio/opus" in accept:
+        return "opus"
+    return "mp3"
+
+
+def _wants_stream(request, request_json) -> bool:
+    """Streamed mode is opt-in: ``responseMode: "stream"`` or the header."""
+    mode = request_json.get("responseMode") or request.headers.get("X-Speech-Response")
+    return str(mode or "").strip().lower() in ("stream", "audio")
+
+
+def _stream_audio(audio_content, content_type, pending, headers):
+    """Send freshly synthesized bytes while the background upload finishes.
+
+    The generator waits for the upload after the last chunk so the work
+    completes inside the request (instances may not get CPU afterwards).
+    The client already has every byte by then thanks to Content-Length.
+    """
+    def _generate():
+        for start in range(0, len(audio_content), STREAM_CHUNK_BYTES):
+            yield audio_content[start:start + STREAM_CHUNK_BYTES]
+        try:
+            variants = pending.result()
+            logger.info("Background upload finished: %s", variants)
+        except Exception as e:
+            logger.error("Background upload failed: %s", e)
+
+    headers = dict(headers, **{"Content-Length": str(len(audio_content))})
+    return Response(_generate(), status=200, mimetype=content_type, headers=headers)
+
 
 @functions_framework.http
 def speech(request):
@@ -41,7 +99,10 @@ def speech(request):
     trace_id = request_json.get("traceId", str(uuid.uuid4()))
     session_id = request_json.get("sessionId", str(uuid.uuid4()))
     language_code = request_json.get("languageCode", "en")
-    course_id = request_json.get("courseId")
+    # A registered API key pins the course (and presenter) it serves; the body cannot override it
+    key_context = get_key_context(request)
+    course_id = key_context.get("course_id") or request_json.get("courseId")
+    usage_counters.increment(course_id, "requests")
 
     userParams = request_json.get("userParams", {})
     logger.debug("userParams: %s", userParams)
@@ -71,46 +132,84 @@ def speech(request):
             {"Content-Type": "application/json"}
         )
 
+    audio_format = _negotiate_audio_format(request, request_json)
+    formats = list(audio_index.DEFAULT_VARIANTS)
+    if audio_format not in formats:
+        formats.append(audio_format)
+
     audio_url = None
+    variant_urls = {}
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        
-        # Generate stable filename from message content and language
-        content_hash = hashlib.sha256(
-            f"{reply}:{language_code}".encode("utf-8")
-        ).hexdigest()[:12]
-        filename = f"speech_{language_code}_{content_hash}.mp3"
-        blob = bucket.blob(filename)
-        
-        # Check if file already exists
-        if blob.exists():
-            logger.info("Using cached speech file: %s", filename)
-        else:
-            logger.info("Generating new speech file: %s", filename)
-            tts_client = texttospeech.TextToSpeechClient()
-            
-            # Use Course Config for Voice Selection
-            voice = course_utils.get_voice_params(course_id, language_code)
-            
-            synthesis_input = texttospeech.SynthesisInput(text=reply)
-            audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.MP3,
-                speaking_rate=1.0
-            )
-            tts_response = tts_client.synthesize_speech(
-                input=synthesis_input,
-                voice=voice,
-                audio_config=audio_config
-            )
-            
-            blob.upload_from_string(
-                tts_response.audio_content,
-                content_type="audio/mpeg"
+        # Content address: (voice, rate, encoding, sanitized text). A known
+        # clip is resolved from the index without touching the bucket.
+        voice = course_utils.get_voice_params(course_id, language_code)
+        bucket = _get_storage_client().bucket(bucket_name)
+        text = sanitize_text_for_tts(reply)
+        ensure_args = (
+            text,
+            voice,
+            bucket,
+            _get_tts_client(),
+            language_code,
+        )
+
+        def _count_tts(fmt, content, object_name):
+            # Only fresh syntheses are billed; indexed clips cost nothing
+            usage_counters.increment(course_id, "tts_chars", len(text))
+
+        if _wants_stream(request, request_json):
+            # Whichever comes first: fresh audio bytes (stream them now and
+            # upload behind them) or the requested variant's object name (a
+            # cached clip). Other variants finish on the executor.
+            fresh_audio, resolved = Future(), Future()
+            ready = {}
+
+            def _on_audio(fmt, content, object_name):
+                _count_tts(fmt, content, object_name)
+                if fmt == audio_format and not fresh_audio.done():
+                    fresh_audio.set_result((content, object_name))
+
+            def _on_ready(fmt, object_name):
+                ready[fmt] = object_name
+                if fmt == audio_format:
+                    resolved.set_result(object_name)
+
+            pending = _audio_executor.submit(
+                audio_index.ensure_audio_variants,
+                *ensure_args,
+                formats=formats,
+                on_audio=_on_audio,
+                on_ready=_on_ready,
             )
+            wait([fresh_audio, resolved, pending], return_when=FIRST_COMPLETED)
+            if fresh_audio.done():
+                content, object_name = fresh_audio.result()
+                encoding = audio_index.AUDIO_VARIANTS[audio_format]["encoding"]
+                logger.info("Streaming fresh speech audio: %s", object_name)
+                return _stream_audio(
+                    content,
+                    audio_index.content_type_for(encoding),
+                    pending,
+                    {
+                        "X-Voice-Url": audio_index.public_url(bucket_name, object_name),
+                        "X-Voice-Format": audio_format,
+                        "X-Trace-Id": trace_id,
+                        "X-Session-Id": session_id,
+                        "Cache-Control": "no-store",
+                    },
+                )
+            # Variants still being synthesized are left out of voiceVariants
+            variants = dict(ready) if resolved.done() else pending.result()
+        else:
+            variants = audio_index.ensure_audio_variants(*ensure_args, formats=formats, on_audio=_count_tts)
+        logger.info("Speech files: %s", variants)
+        logger.info("Audio metrics: %s", json.dumps(audio_index.get_metrics()))
 
-        # Direct public URL (bucket is publicly readable)
-        audio_url = f"https://storage.googleapis.com/{bucket_name}/{filename}"
+        variant_urls = {
+            fmt: audio_index.public_url(bucket_name, name)
+            for fmt, name in variants.items()
+        }
+        audio_url = variant_urls[audio_format]
     except Exception as e:
         logger.error("Text-to-Speech or upload failed: %s", e)
         error_resp = {"error": "Speech synthesis failed", "details": str(e)}
@@ -125,6 +224,8 @@ def speech(request):
         "traceId": trace_id,
         "sessionId": session_id,
         "voiceUrl": audio_url,
+        "voiceFormat": audio_format,
+        "voiceVariants": variant_urls,
         "replyType": "Voice",
         "timestamp": datetime.now().timestamp(),
         "extra": request_json.get("extra", {})
@@ -0,0 +1,230 @@
+"""Sharded per-course, per-day usage counters (requests, TTS characters, LLM calls).
+
+A single counter document per course would exceed Firestore's sustained
+write rate for one document during a busy lecture, so each counter is
+split over ``USAGE_COUNTER_SHARDS`` shard documents:
+
+  courses/{course_id}/usage/{YYYY-MM-DD}               {"course_id", "day", "shards"}
+  courses/{course_id}/usage/{YYYY-MM-DD}/shards/{n}    {"requests": .., "tts_chars": .., ...}
+
+``increment()`` only adds to an in-memory tally; a background thread
+flushes the tallies every ``USAGE_FLUSH_SECONDS`` (and at interpreter
+exit) as ``Increment`` writes to a randomly chosen shard, all in one
+WriteBatch; the parent document is written once per instance and day.
+A failed flush puts its tallies back for the next one; when a batch
+fails, its courses are retried one by one so a single failing course
+does not hold back the others. Course IDs come from request bodies, so
+IDs that cannot name a document are not counted (``invalid`` in the
+metrics). ``read_usage()`` sums the shards.
+
+This module is shared by the config, speech, talk-stream and dialog
+functions (the copies must stay identical).
+"""
+import atexit
+import datetime
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARDS = int(os.environ.get("USAGE_COUNTER_SHARDS", "10"))
+DEFAULT_FLUSH_SECONDS = float(os.environ.get("USAGE_FLUSH_SECONDS", "10"))
+UNASSIGNED_COURSE = "_unassigned"
+# Firestore caps a WriteBatch at 500 writes
+MAX_WRITES_PER_BATCH = 500
+
+
+def _get_db():
+    from google.cloud import firestore
+
+    db_name = os.environ.get("FIRESTORE_DATABASE", "langbridge").strip() or "langbridge"
+    return firestore.Client(database=db_name)
+
+
+def _increment(value):
+    from google.cloud import firestore
+
+    return firestore.Increment(value)
+
+
+def today() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")
+
+
+def valid_course_id(course_id) -> bool:
+    """Whether ``course_id`` can name a Firestore document."""
+    return (isinstance(course_id, str) and bool(course_id.strip()) and "/" not in course_id
+            and course_id not in (".", ".."))
+
+
+def _usage_ref(db, course_id, day):
+    return db.collection('courses').document(course_id).collection('usage').document(day)
+
+
+class UsageCounters:
+    """Locally pre-aggregated counters, flushed to sharded documents."""
+
+    def __init__(self, db_factory=_get_db, shards: int = DEFAULT_SHARDS,
+                 flush_seconds: float = DEFAULT_FLUSH_SECONDS, increment=_increment,
+                 clock=time.monotonic, day=today, background: bool = True):
+        self.db_factory = db_factory
+        self.shards = shards
+        self.flush_seconds = flush_seconds
+        self.increment_value = increment
+        self.clock = clock
+        self.day = day
+        self.background = background
+        self._tallies = {}
+        # (course, day) parents this instance has already written
+        self._registered = set()
+        self._last_flush = clock()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._metrics = {"flushes": 0, "flush_errors": 0, "writes": 0, "invalid": 0}
+
+    def increment(self, course_id, metric: str, amount: int = 1):
+        """Add ``amount`` to today's ``metric`` of ``course_id`` (never blocks on I/O)."""
+        if not amount:
+            return
+        course_id = course_id or UNASSIGNED_COURSE
+        if not valid_course_id(course_id):
+            with self._lock:
+                self._metrics["invalid"] += 1
+            return
+        key = (course_id, self.day())
+        with self._lock:
+            tally = self._tallies.setdefault(key, {})
+            tally[metric] = tally.get(metric, 0) + amount
+            # Also checked here: an idle instance's thread may get no CPU
+            due = self.clock() - self._last_flush >= self.flush_seconds
+        if self.background:
+            self._ensure_thread()
+            if due:
+                self._wake.set()
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="usage-counters", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def _restore(self, tallies):
+        with self._lock:
+            for key, counts in tallies.items():
+                tally = self._tallies.setdefault(key, {})
+                for metric, value in counts.items():
+                    tally[metric] = tally.get(metric, 0) + value
+
+    def _write(self, db, items):
+        """Commit one batch for ``items``: [((course_id, day), {metric: value})]."""
+        batch = db.batch()
+        for (course_id, day), counts in items:
+            usage_ref = _usage_ref(db, course_id, day)
+            if (course_id, day) not in self._registered:
+                batch.set(usage_ref, {"course_id": course_id, "day": day, "shards": self.shards},
+                          merge=True)
+            shard_ref = usage_ref.collection('shards').document(str(random.randrange(self.shards)))
+            batch.set(shard_ref, {metric: self.increment_value(value)
+                                  for metric, value in counts.items()}, merge=True)
+        batch.commit()
+        self._registered.update(key for key, _ in items)
+
+    def flush(self) -> int:
+        """Write the pending tallies; return the number of shard writes."""
+        with self._flush_lock:
+            with self._lock:
+                tallies, self._tallies = self._tallies, {}
+                self._last_flush = self.clock()
+            if not tallies:
+                return 0
+            items = list(tallies.items())
+            written = 0
+            errors = 0
+            for start in range(0, len(items), MAX_WRITES_PER_BATCH // 2):
+                chunk = items[start:start + MAX_WRITES_PER_BATCH // 2]
+                try:
+                    db = self.db_factory()
+                except Exception as e:
+                    errors += 1
+                    logger.error("Failed to flush usage counters: %s", e)
+                    self._restore(dict(items[start:]))
+                    break
+                try:
+                    self._write(db, chunk)
+                    written += len(chunk)
+                    continue
+                except Exception as e:
+                    errors += 1
+                    logger.error("Failed to flush usage counters: %s", e)
+                if len(chunk) == 1:
+                    self._restore(dict(chunk))
+                    continue
+                # Retry the chunk's courses one by one so one failing course does not block the rest
+                failed = {}
+                for key, counts in chunk:
+                    try:
+                        self._write(db, [(key, counts)])
+                        written += 1
+                    except Exception as e:
+                        errors += 1
+                        logger.error("Failed to flush usage counters of %s: %s", key, e)
+                        failed[key] = counts
+                self._restore(failed)
+                if len(failed) == len(chunk):
+                    # Every write failed: the backend is down, keep the rest for the next flush
+                    self._restore(dict(items[start + len(chunk):]))
+                    break
+            with self._lock:
+                self._metrics["flushes"] += 1
+                self._metrics["flush_errors"] += errors
+                self._metrics["writes"] += written
+            return written
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["pending_keys"] = len(self._tallies)
+            return metrics
+
+
+def read_usage(db, course_id: str, day: str) -> dict:
+    """Sum the shards of ``course_id``'s usage on ``day`` into {metric: total}."""
+    totals = {}
+    for shard in _usage_ref(db, course_id, day).collection('shards').stream():
+        for metric, value in (shard.to_dict() or {}).items():
+            totals[metric] = totals.get(metric, 0) + value
+    return totals
+
+
+_counters = None
+_counters_lock = threading.Lock()
+
+
+def get_counters() -> UsageCounters:
+    """Process-wide counters (created on first use, flushed at exit)."""
+    global _counters
+    with _counters_lock:
+        if _counters is None:
+            _counters = UsageCounters()
+            atexit.register(_counters.flush)
+        return _counters
+
+
+def increment(course_id, metric: str, amount: int = 1):
+    get_counters().increment(course_id, metric, amount)
+
+
+def get_metrics() -> dict:
+    return _counters.get_metrics() if _counters is not None else {}
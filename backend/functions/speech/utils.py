@@ -0,0 +1,127 @@
+"""Utility functions for message generation."""
+import hashlib
+import re
+
+
+def normalize_context(context: str) -> str:
+    """Trim and collapse whitespace in context (speaker notes)."""
+    if not context:
+        return ""
+    return " ".join(str(context).split())
+
+
+# Google TTS rejects requests whose input exceeds 5000 bytes
+TTS_MAX_INPUT_BYTES = 5000
+
+_SENTENCE_SPLIT = re.compile(r'([.!?。！？])\s*')
+
+
+def sanitize_text_for_tts(text: str, max_length: int = None) -> str:
+    """Clean and prepare text for Google TTS API.
+    
+    Args:
+        text: Input text to sanitize
+        max_length: Optional maximum character length. When given, only the
+            first sentence-aligned chunk is returned (legacy behaviour);
+            by default the full text is kept and long texts should be
+            chunked with split_text_for_tts.
+        
+    Returns:
+        Sanitized text safe for TTS API
+    """
+    if not text:
+        return ""
+    
+    # Remove or replace problematic characters
+    # Remove special unicode characters that TTS doesn't handle well
+    text = text.replace('⟪', '')
+    text = text.replace('⧸', '/')
+    text = text.replace('⟫', '')
+    
+    # Remove control characters except common whitespace
+    text = re.sub(r'[\x00-\x08\x0b-\x0c\x0e-\x1f\x7f-\x9f]', '', text)
+    
+    # Normalize whitespace
+    text = ' '.join(text.split())
+    
+    if max_length and len(text) > max_length:
+        chunks = split_text_for_tts(text, max_chars=max_length)
+        text = chunks[0] if chunks else text[:max_length]
+    
+    return text.strip()
+
+
+def _hard_split(sentence: str, max_chars: int, max_bytes: int):
+    """Split a single over-long sentence at spaces, else at characters."""
+    pieces = []
+    current = ""
+    for token in re.split(r'(\s+)', sentence):
+        for char in (token if _too_long(token, max_chars, max_bytes) else [token]):
+            if current and _too_long(current + char, max_chars, max_bytes):
+                pieces.append(current.strip())
+                current = ""
+            current += char
+    if current.strip():
+        pieces.append(current.strip())
+    return pieces
+
+
+def _too_long(text: str, max_chars: int, max_bytes: int) -> bool:
+    return len(text) > max_chars or len(text.encode("utf-8")) > max_bytes
+
+
+def split_text_for_tts(
+    text: str,
+    max_chars: int = 5000,
+    max_bytes: int = TTS_MAX_INPUT_BYTES,
+):
+    """Split text into sentence-aligned chunks within char and byte limits.
+
+    Sentences are packed greedily in order; a sentence that alone exceeds
+    the limits is split at whitespace (or characters for CJK text). The
+    chunks joined with spaces reproduce the input text.
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    if not _too_long(text, max_chars, max_bytes):
+        return [text]
+
+    sentences = _SENTENCE_SPLIT.split(text)
+    chunks = []
+    current = ""
+    for i in range(0, len(sentences), 2):
+        sentence = sentences[i]
+        punct = sentences[i + 1] if i + 1 < len(sentences) else ""
+        piece = (sentence + punct).strip()
+        if not piece:
+            continue
+        candidate = f"{current} {piece}" if current else piece
+        if not _too_long(candidate, max_chars, max_bytes):
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+            current = ""
+        if _too_long(piece, max_chars, max_bytes):
+            chunks.extend(_hard_split(piece, max_chars, max_bytes))
+        else:
+            current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def session_id_for(language_code: str, context: str) -> str:
+    """Build a stable session id per language and notes content.
+
+    Prevents reusing the same conversation for different slides/notes,
+    which could cause the model to repeat the first response.
+    """
+    norm = normalize_context(context)
+    if not norm:
+        digest = "default"
+    else:
+        digest = hashlib.sha256(norm.encode("utf-8")).hexdigest()[:12]
+    lang = (language_code or "").strip().lower() or "unknown"
+    return f"presentation_gen_{lang}_{digest}"
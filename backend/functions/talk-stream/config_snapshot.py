@@ -0,0 +1,214 @@
+"""Per-instance snapshot of the ``langbridge_config/messages`` document.
+
+The read endpoints serve the config from memory instead of reading
+Firestore on every request. The snapshot is kept fresh by an
+``on_snapshot`` listener; when the listener is down (or disabled) it is
+re-read at most every ``CONFIG_SNAPSHOT_TTL`` seconds, and even with a
+healthy listener it is re-read once it is older than
+``CONFIG_MAX_STALENESS`` seconds, because an idle instance may not get CPU
+to process listener events.
+
+Each snapshot carries a version string (the document's update time, or a
+content hash when there is none) that the read endpoints use as the basis
+of their ETags; see ``get_versioned()``.
+
+Listener lag (document update time to local delivery) is logged as a JSON
+``config_listener_lag_ms`` line for a log-based metric and is part of
+``get_metrics()``.
+
+This module is shared by the welcome, goodbye, recquestions, speech,
+talk-stream and dialog functions (the copies must stay identical).
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CONFIG_COLLECTION = "langbridge_config"
+CONFIG_DOCUMENT = "messages"
+DEFAULT_TTL_SECONDS = float(os.environ.get("CONFIG_SNAPSHOT_TTL", "10"))
+DEFAULT_MAX_STALENESS_SECONDS = float(os.environ.get("CONFIG_MAX_STALENESS", "300"))
+LISTENER_ENABLED = os.environ.get("CONFIG_LISTENER", "1").strip().lower() not in ("0", "false", "no")
+
+
+def config_version(data, update_time=None) -> str:
+    """Version string of a config document: its update time, else a content hash."""
+    if isinstance(update_time, datetime.datetime):
+        return update_time.isoformat()
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return "sha256:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _config_ref():
+    from google.cloud import firestore
+
+    db_name = os.environ.get("FIRESTORE_DATABASE", "langbridge").strip() or "langbridge"
+    db = firestore.Client(database=db_name)
+    return db.collection(CONFIG_COLLECTION).document(CONFIG_DOCUMENT)
+
+
+class ConfigSnapshot:
+    """The config document held in memory, refreshed by listener or poll.
+
+    ``get()`` returns a shared dict; callers must treat it as read-only.
+    """
+
+    def __init__(
+        self,
+        default_factory,
+        ref_factory=_config_ref,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_staleness_seconds: float = DEFAULT_MAX_STALENESS_SECONDS,
+        use_listener: bool = LISTENER_ENABLED,
+        clock=time.monotonic,
+    ):
+        self.default_factory = default_factory
+        self.ref_factory = ref_factory
+        self.ttl_seconds = ttl_seconds
+        self.max_staleness_seconds = max_staleness_seconds
+        self.use_listener = use_listener
+        self.clock = clock
+        self._ref = None
+        self._watch = None
+        self._data = None
+        self._version = None
+        self._confirmed_at = None
+        self._retry_at = 0.0
+        self._listener_retry_at = 0.0
+        self._lock = threading.Lock()
+        self._metrics = {
+            "reads": 0,
+            "read_errors": 0,
+            "listener_events": 0,
+            "listener_restarts": 0,
+            "listener_lag_ms_last": None,
+            "listener_lag_ms_max": None,
+        }
+
+    def _listener_active(self) -> bool:
+        return self._watch is not None and getattr(self._watch, "is_active", True)
+
+    def _doc_ref(self):
+        if self._ref is None:
+            self._ref = self.ref_factory()
+        return self._ref
+
+    def _read(self, reason: str):
+        """Read the document now; keep serving the old data on failure."""
+        self._metrics["reads"] += 1
+        try:
+            doc = self._doc_ref().get()
+        except Exception as e:
+            self._metrics["read_errors"] += 1
+            self._retry_at = self.clock() + self.ttl_seconds
+            logger.error("Failed to load config from Firestore (%s): %s", reason, e)
+            if self._data is None:
+                self._set(self.default_factory())
+            return
+        if doc.exists:
+            self._set(doc.to_dict(), getattr(doc, "update_time", None))
+        else:
+            logger.warning("Config document not found, using default.")
+            self._set(self.default_factory())
+        self._confirmed_at = self.clock()
+        logger.debug("Config snapshot refreshed (%s)", reason)
+
+    def _set(self, data, update_time=None):
+        self._data = data
+        self._version = config_version(data, update_time)
+
+    def _start_listener(self):
+        if not self.use_listener or self._listener_active():
+            return
+        # A broken listener is retried at most once per TTL
+        if self.clock() < self._listener_retry_at:
+            return
+        self._listener_retry_at = self.clock() + self.ttl_seconds
+        if self._watch is not None:
+            self._metrics["listener_restarts"] += 1
+            try:
+                self._watch.unsubscribe()
+            except Exception:
+                pass
+        try:
+            self._watch = self._doc_ref().on_snapshot(self._on_snapshot)
+        except Exception as e:
+            self._watch = None
+            logger.warning("Config listener unavailable, polling instead: %s", e)
+
+    def _on_snapshot(self, docs, changes, read_time):
+        received = time.time()
+        with self._lock:
+            for doc in docs:
+                update_time = getattr(doc, "update_time", None)
+                if doc.exists:
+                    self._set(doc.to_dict(), update_time)
+                else:
+                    self._set(self.default_factory())
+                if update_time is not None:
+                    self._record_lag((received - update_time.timestamp()) * 1000)
+            self._metrics["listener_events"] += 1
+            self._confirmed_at = self.clock()
+
+    def _record_lag(self, lag_ms: float):
+        lag_ms = round(max(lag_ms, 0.0), 1)
+        self._metrics["listener_lag_ms_last"] = lag_ms
+        previous = self._metrics["listener_lag_ms_max"]
+        self._metrics["listener_lag_ms_max"] = lag_ms if previous is None else max(previous, lag_ms)
+        logger.info(json.dumps({"metric": "config_listener_lag_ms", "value": lag_ms}))
+
+    def get(self) -> dict:
+        return self.get_versioned()[0]
+
+    def get_versioned(self):
+        """Return ``(data, version)`` from the same snapshot."""
+        with self._lock:
+            now = self.clock()
+            if self._data is None or self._confirmed_at is None:
+                if self._data is None or now >= self._retry_at:
+                    self._read("initial")
+            else:
+                age = now - self._confirmed_at
+                listening = self._listener_active()
+                if (age > self.max_staleness_seconds or (not listening and age > self.ttl_seconds)) \
+                        and now >= self._retry_at:
+                    self._read("staleness bound" if listening else "poll")
+            self._start_listener()
+            return self._data, self._version
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["listener_active"] = self._listener_active()
+            metrics["age_seconds"] = (
+                round(self.clock() - self._confirmed_at, 3) if self._confirmed_at is not None else None
+            )
+            return metrics
+
+    def close(self):
+        with self._lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+                self._watch = None
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot(default_factory) -> ConfigSnapshot:
+    """Process-wide snapshot (created on first use)."""
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = ConfigSnapshot(default_factory)
+        return _snapshot
+
+
+def get_metrics() -> dict:
+    return _snapshot.get_metrics() if _snapshot is not None else {}
@@ -1,17 +1,20 @@
-import json
 import uuid
 import logging
 import os
 import sys
-from datetime import datetime
 import asyncio
+import threading
 import functions_framework
+import usage_counters
 from flask import Response
-from auth_utils import validate_authentication
+from auth_utils import validate_authentication, get_key_context
 from firestore_utils import get_config
-from google.adk.agents import config_agent_utils
-from google.adk.runners import InMemoryRunner
-from google.genai import types
+from sse_protocol import (
+    make_framer,
+    negotiate_heartbeat,
+    negotiate_protocol,
+    iter_with_heartbeat,
+)
 
 
 # Robust logging setup that works on Cloud Functions/Cloud Run
@@ -31,9 +34,17 @@ logger = logging.getLogger(__name__)
 logger.setLevel(_level)
 
 
-# Initialize the ADK agent from YAML configuration
+# The ADK agent is built from YAML on first use, not at import: the ADK
+# import and agent construction dominate the cold start and are not needed
+# to reject unauthenticated requests or to serve the config fallback.
+_runner = None
+_runner_lock = threading.Lock()
+
+
 def create_agent():
     """Create and return an ADK agent from YAML config."""
+    from google.adk.agents import config_agent_utils
+
     # Get the directory where this script is located
     current_dir = os.path.dirname(os.path.abspath(__file__))
     config_file_path = os.path.join(
@@ -44,18 +55,26 @@ def create_agent():
     return config_agent_utils.from_config(config_file_path)
 
 
-# Create runner (reusable across requests)
-agent = create_agent()
-runner = InMemoryRunner(
-    agent=agent,
-    app_name='langbridge_classroom_assistant',
-)
+def get_runner():
+    """Return the runner (reusable across requests), creating it once."""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                from google.adk.runners import InMemoryRunner
+
+                _runner = InMemoryRunner(
+                    agent=create_agent(),
+                    app_name='langbridge_classroom_assistant',
+                )
+    return _runner
 
 
 @functions_framework.http
 def talk_stream(request):
     """Streaming SSE response that mirrors the reference pattern.
     Yields incremental chunks followed by a final summary chunk.
+    Clients may negotiate the compact v2 framing (see sse_protocol).
     """
     logger.debug("talk_stream invoked")
     auth_error = validate_authentication(request)
@@ -73,17 +92,29 @@ def talk_stream(request):
     trace_id = request_json.get("traceId", str(uuid.uuid4()))
     language_code = request_json.get("languageCode", "en")
     extra = request_json.get("extra", {})
+    # A registered API key pins the course it serves; the body cannot override it
+    course_id = get_key_context(request).get("course_id") or request_json.get("courseId")
+    usage_counters.increment(course_id, "requests")
 
-    def sse_format(obj: dict) -> str:
-        return f"data: {json.dumps(obj, ensure_ascii=False)}\n\n"
+    protocol = negotiate_protocol(request.headers, request_json)
+    heartbeat = negotiate_heartbeat(request.headers, request_json)
+    framer = make_framer(protocol, ask_text, extra, trace_id, session_id)
+    logger.debug("SSE protocol: %s (heartbeat=%s)", protocol, heartbeat)
 
     def stream_response():
+        header = framer.header()
+        if header:
+            yield header
+
         # Prepare the prompt with language context
         prompt = ask_text
         if language_code and language_code != "en":
             prompt = f"Please respond in {language_code}: {ask_text}"
 
         try:
+            from google.genai import types
+
+            runner = get_runner()
             # Reuse an existing session if present; otherwise create one
             # with the given session_id
             session = asyncio.run(
@@ -117,11 +148,19 @@ def talk_stream(request):
             )
 
             accumulated_text = ""
-            for event in runner.run(
+            usage_counters.increment(course_id, "llm_calls")
+            events = runner.run(
                 user_id=user_id,
                 session_id=session_id,
                 new_message=content,
-            ):
+            )
+            for event in iter_with_heartbeat(events, heartbeat):
+                if event is None:
+                    # Idle interval elapsed without agent output
+                    beat = framer.heartbeat()
+                    if beat:
+                        yield beat
+                    continue
                 try:
                     text = ""
                     if getattr(event, "content", None) and event.content.parts:
@@ -130,37 +169,13 @@ def talk_stream(request):
                     if not text:
                         continue
                     accumulated_text += text
-                    chunk = {
-                        "askText": ask_text,
-                        "extra": extra,
-                        "id": trace_id,
-                        "replyPayload": None,
-                        "replyText": text,  # incremental piece
-                        "replyType": "Llm",
-                        "sessionId": session_id,
-                        "timestamp": int(datetime.now().timestamp() * 1000),
-                        "traceId": trace_id,
-                        "isFinal": False,
-                    }
                     logger.debug("Streaming chunk (%s chars)", len(text))
-                    yield sse_format(chunk)
+                    yield framer.delta(text)  # incremental piece
                 except Exception:
                     logger.exception("Error while streaming a chunk")
             # Final chunk
-            final_chunk = {
-                "askText": ask_text,
-                "extra": extra,
-                "id": trace_id,
-                "replyPayload": None,
-                "replyText": accumulated_text,
-                "replyType": "Llm",
-                "sessionId": session_id,
-                "timestamp": int(datetime.now().timestamp() * 1000),
-                "traceId": trace_id,
-                "isFinal": True,
-            }
             logger.debug("Final chunk length: %s", len(accumulated_text))
-            yield sse_format(final_chunk)
+            yield framer.final(accumulated_text)
         except Exception:
             logger.exception("Error generating agent response; using fallback")
             # Fallback to config-based response on error
@@ -170,19 +185,7 @@ def talk_stream(request):
             response_text = talk_responses.get(
                 language_code, talk_responses.get("en", default_response)
             )
-            err_chunk = {
-                "askText": ask_text,
-                "extra": extra,
-                "id": trace_id,
-                "replyPayload": None,
-                "replyText": response_text,
-                "replyType": "Llm",
-                "sessionId": session_id,
-                "timestamp": int(datetime.now().timestamp() * 1000),
-                "traceId": trace_id,
-                "isFinal": True,
-            }
-            yield sse_format(err_chunk)
+            yield framer.final(response_text)
 
     headers = {
         "Cache-Control": "no-cache",
@@ -0,0 +1,220 @@
+"""SSE framing for talk_stream.
+
+Two wire formats are supported:
+
+* ``v1`` (legacy, default): every chunk is a full reply object that repeats
+  ``askText``, ``extra``, ``traceId``, ``sessionId`` and ``replyType``. This
+  is what XiaoIce expects, so it stays the default.
+* ``v2`` (compact): one ``header`` event carries the static fields, each
+  piece of text is sent as a minimal ``delta`` event, an optional
+  ``heartbeat`` event keeps idle connections alive, and a ``final`` event
+  carries the full text.
+
+Clients opt in with the ``X-SSE-Protocol: v2`` header or ``"sseProtocol":
+"v2"`` in the request body.
+"""
+import json
+import queue
+import threading
+from datetime import datetime
+
+LEGACY = "v1"
+COMPACT = "v2"
+
+# Bounds for the optional v2 heartbeat interval (seconds)
+MIN_HEARTBEAT_SECONDS = 1.0
+MAX_HEARTBEAT_SECONDS = 60.0
+
+
+def _now_ms() -> int:
+    return int(datetime.now().timestamp() * 1000)
+
+
+def negotiate_protocol(headers, request_json: dict) -> str:
+    """Return the SSE protocol requested by the client (``v1`` if unknown)."""
+    value = headers.get("X-SSE-Protocol") or request_json.get("sseProtocol")
+    value = str(value or "").strip().lower()
+    if value in ("2", "v2", "compact"):
+        return COMPACT
+    return LEGACY
+
+
+def negotiate_heartbeat(headers, request_json: dict):
+    """Return the requested heartbeat interval in seconds, or None."""
+    value = headers.get("X-SSE-Heartbeat") or request_json.get("heartbeatSeconds")
+    if value in (None, ""):
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    if seconds <= 0:
+        return None
+    return min(max(seconds, MIN_HEARTBEAT_SECONDS), MAX_HEARTBEAT_SECONDS)
+
+
+def sse_format(obj: dict) -> str:
+    """Legacy frame: a single ``data:`` line with the full object."""
+    return f"data: {json.dumps(obj, ensure_ascii=False)}\n\n"
+
+
+def sse_event(event: str, obj: dict, event_id=None) -> str:
+    """Compact frame: named event with minified JSON data."""
+    data = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    frame = f"event: {event}\n"
+    if event_id is not None:
+        frame += f"id: {event_id}\n"
+    return frame + f"data: {data}\n\n"
+
+
+class LegacyFramer:
+    """Produces the original one-object-per-chunk stream."""
+
+    protocol = LEGACY
+
+    def __init__(self, ask_text, extra, trace_id, session_id, reply_type="Llm"):
+        self.ask_text = ask_text
+        self.extra = extra
+        self.trace_id = trace_id
+        self.session_id = session_id
+        self.reply_type = reply_type
+
+    def _chunk(self, text, is_final):
+        return {
+            "askText": self.ask_text,
+            "extra": self.extra,
+            "id": self.trace_id,
+            "replyPayload": None,
+            "replyText": text,
+            "replyType": self.reply_type,
+            "sessionId": self.session_id,
+            "timestamp": _now_ms(),
+            "traceId": self.trace_id,
+            "isFinal": is_final,
+        }
+
+    def header(self):
+        return ""
+
+    def delta(self, text):
+        return sse_format(self._chunk(text, False))
+
+    def heartbeat(self):
+        # XiaoIce parses every frame as a reply, so legacy never heartbeats
+        return ""
+
+    def final(self, full_text):
+        return sse_format(self._chunk(full_text, True))
+
+
+class CompactFramer:
+    """Header once, then minimal deltas, then a final event."""
+
+    protocol = COMPACT
+
+    def __init__(self, ask_text, extra, trace_id, session_id, reply_type="Llm"):
+        self.ask_text = ask_text
+        self.extra = extra
+        self.trace_id = trace_id
+        self.session_id = session_id
+        self.reply_type = reply_type
+        self.seq = 0
+
+    def header(self):
+        return sse_event("header", {
+            "protocol": COMPACT,
+            "askText": self.ask_text,
+            "extra": self.extra,
+            "id": self.trace_id,
+            "replyPayload": None,
+            "replyType": self.reply_type,
+            "sessionId": self.session_id,
+            "traceId": self.trace_id,
+            "timestamp": _now_ms(),
+        })
+
+    def delta(self, text):
+        self.seq += 1
+        return sse_event("delta", {"t": text}, event_id=self.seq)
+
+    def heartbeat(self):
+        return sse_event("heartbeat", {"ts": _now_ms()})
+
+    def final(self, full_text):
+        return sse_event("final", {
+            "replyText": full_text,
+            "isFinal": True,
+            "deltas": self.seq,
+            "timestamp": _now_ms(),
+        }, event_id=self.seq + 1)
+
+
+def make_framer(protocol, ask_text, extra, trace_id, session_id, reply_type="Llm"):
+    """Return the framer for the negotiated protocol."""
+    cls = CompactFramer if protocol == COMPACT else LegacyFramer
+    return cls(ask_text, extra, trace_id, session_id, reply_type)
+
+
+_DONE = object()
+
+# Items the pump may read ahead of a slow client, and how often a pump
+# blocked on a full queue checks whether the consumer went away
+HEARTBEAT_QUEUE_SIZE = 64
+_PUT_POLL_SECONDS = 0.5
+
+
+def iter_with_heartbeat(iterable, interval):
+    """Yield items from ``iterable``, yielding ``None`` after each idle interval.
+
+    The iterable is consumed on a worker thread so that a slow producer (the
+    agent thinking before its first token) does not block heartbeats. With
+    ``interval`` of None this is a plain pass-through. Exceptions raised by
+    the producer are re-raised in the caller. When the caller stops early
+    (the client disconnected) the worker stops reading and closes the
+    producer; it never reads more than ``HEARTBEAT_QUEUE_SIZE`` items ahead.
+    """
+    if not interval:
+        yield from iterable
+        return
+
+    source = iter(iterable)
+    items = queue.Queue(maxsize=HEARTBEAT_QUEUE_SIZE)
+    stop = threading.Event()
+
+    def _put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=_PUT_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _pump():
+        try:
+            for item in source:
+                if not _put((item, None)):
+                    return
+            _put((_DONE, None))
+        except Exception as e:
+            _put((_DONE, e))
+        finally:
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+
+    threading.Thread(target=_pump, daemon=True).start()
+    try:
+        while True:
+            try:
+                item, error = items.get(timeout=interval)
+            except queue.Empty:
+                yield None
+                continue
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
@@ -0,0 +1,284 @@
+"""Course configuration (languages, voices) and presentation event logging.
+
+Course documents are served from an in-memory cache: a course is read at
+most once per ``COURSE_CONFIG_TTL`` seconds, and its voice table (the
+``VoiceSelectionParams`` for every language it configures, including the
+``cmn-CN`` remap) is built once per document version, so resolving a voice
+is a dictionary lookup. When an entry expires and the document's update
+time has not changed, the existing voice table is kept. Course IDs come
+from request bodies, so the cache is an LRU of at most
+``COURSE_CONFIG_CACHE_MAX`` courses.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import event_log
+
+# google.cloud.firestore and google.cloud.texttospeech are imported where
+# they are used: most requests that import this module never build a voice
+# or read a course, and both imports are expensive at cold start.
+
+logger = logging.getLogger(__name__)
+
+# Default configuration if no course is specified or found
+DEFAULT_LANGUAGES = ["en-US", "zh-CN"]
+DEFAULT_VOICES = {
+    "en-US": {"name": "en-US-Neural2-F", "gender": "FEMALE"},
+    "zh-CN": {"name": "cmn-CN-Chirp3-HD-Achernar", "gender": "FEMALE"},
+    "yue-HK": {"name": "yue-HK-Standard-A", "gender": "FEMALE"},
+    "zh-TW": {"name": "zh-TW-Standard-A", "gender": "FEMALE"}
+}
+COURSE_CONFIG_TTL_SECONDS = float(os.environ.get("COURSE_CONFIG_TTL", "60"))
+COURSE_CONFIG_MAX_ENTRIES = int(os.environ.get("COURSE_CONFIG_CACHE_MAX", "1000"))
+
+_db = None
+_db_lock = threading.Lock()
+
+
+def _get_db():
+    """Return the shared Firestore client."""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                from google.cloud import firestore
+
+                db_name = os.environ.get("FIRESTORE_DATABASE", "langbridge").strip()
+                _db = firestore.Client(database=db_name or "langbridge")
+    return _db
+
+
+def _texttospeech():
+    from google.cloud import texttospeech
+
+    return texttospeech
+
+
+def _resolve_voice(config, language_code: str):
+    """Build the VoiceSelectionParams for ``language_code`` under a course config."""
+    texttospeech = _texttospeech()
+
+    # Defaults
+    voice_name = None
+    ssml_gender = texttospeech.SsmlVoiceGender.FEMALE
+
+    # Try to find in Course Config
+    if config and "voice_configs" in config:
+        voice_cfg = config["voice_configs"].get(language_code)
+        if voice_cfg:
+            voice_name = voice_cfg.get("name")
+            gender_str = voice_cfg.get("gender", "FEMALE").upper()
+            ssml_gender = getattr(texttospeech.SsmlVoiceGender, gender_str, texttospeech.SsmlVoiceGender.FEMALE)
+
+    # Fallback to defaults if not found in course config
+    if not voice_name:
+        default_cfg = DEFAULT_VOICES.get(language_code)
+        if default_cfg:
+            voice_name = default_cfg["name"]
+            ssml_gender = getattr(texttospeech.SsmlVoiceGender, default_cfg["gender"])
+        else:
+            # Ultimate fallback
+            logger.warning(f"No voice configuration found for {language_code}. Using system default.")
+            return texttospeech.VoiceSelectionParams(
+                language_code=language_code,
+                ssml_gender=texttospeech.SsmlVoiceGender.FEMALE
+            )
+
+    # Adjust language_code if voice name implies a specific one (e.g. cmn-CN for zh-CN)
+    if voice_name and voice_name.startswith("cmn-CN") and language_code == "zh-CN":
+        language_code = "cmn-CN"
+
+    return texttospeech.VoiceSelectionParams(
+        language_code=language_code,
+        name=voice_name,
+        ssml_gender=ssml_gender
+    )
+
+
+class _CourseEntry:
+    __slots__ = ("config", "version", "voices", "expires_at")
+
+    def __init__(self, config, version, expires_at):
+        self.config = config
+        self.version = version
+        self.voices = None
+        self.expires_at = expires_at
+
+
+class CourseConfigCache:
+    """``courses/{id}`` documents and their voice tables, cached per instance."""
+
+    def __init__(self, db_factory=_get_db, ttl_seconds: float = COURSE_CONFIG_TTL_SECONDS,
+                 clock=time.monotonic, max_entries: int = COURSE_CONFIG_MAX_ENTRIES):
+        self.db_factory = db_factory
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.max_entries = max_entries
+        # course_id -> _CourseEntry, least recently used first
+        self._entries = OrderedDict()
+        # Per-course read locks, dropped along with their entries
+        self._locks = {}
+        self._default = _CourseEntry(None, None, float("inf"))
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "reads": 0, "read_errors": 0, "voice_tables": 0}
+
+    def _course_lock(self, course_id):
+        with self._lock:
+            lock = self._locks.get(course_id)
+            if lock is None:
+                lock = self._locks[course_id] = threading.Lock()
+                if len(self._locks) > self.max_entries:
+                    # Courses whose reads failed have a lock but no entry
+                    for stale in [c for c in self._locks
+                                  if c != course_id and c not in self._entries]:
+                        del self._locks[stale]
+            return lock
+
+    def _count(self, name):
+        with self._lock:
+            self._metrics[name] += 1
+
+    def _read(self, course_id, cached):
+        self._count("reads")
+        try:
+            doc = self.db_factory().collection('courses').document(course_id).get()
+        except Exception as e:
+            self._count("read_errors")
+            logger.error(f"Error fetching course {course_id}: {e}")
+            # Keep serving the last known config rather than the defaults
+            return cached
+        if not doc.exists:
+            logger.warning(f"Course {course_id} not found. Using defaults.")
+            return _CourseEntry(None, None, self.clock() + self.ttl_seconds)
+        version = getattr(doc, "update_time", None)
+        if cached is not None and version is not None and cached.version == version:
+            # Same document version: keep the config and its voice table
+            cached.expires_at = self.clock() + self.ttl_seconds
+            return cached
+        return _CourseEntry(doc.to_dict(), version, self.clock() + self.ttl_seconds)
+
+    def _fresh(self, course_id):
+        """(entry, fresh) from the cache; a fresh hit moves to the LRU's end."""
+        with self._lock:
+            entry = self._entries.get(course_id)
+            if entry is not None and self.clock() < entry.expires_at:
+                self._entries.move_to_end(course_id)
+                self._metrics["hits"] += 1
+                return entry, True
+            return entry, False
+
+    def _store(self, course_id, entry):
+        with self._lock:
+            self._entries[course_id] = entry
+            self._entries.move_to_end(course_id)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._locks.pop(evicted, None)
+
+    def _entry(self, course_id):
+        if not course_id:
+            return self._default
+        entry, fresh = self._fresh(course_id)
+        if fresh:
+            return entry
+        with self._course_lock(course_id):
+            entry, fresh = self._fresh(course_id)
+            if fresh:
+                return entry
+            entry = self._read(course_id, entry)
+            if entry is not None:
+                self._store(course_id, entry)
+            return entry
+
+    def get_config(self, course_id):
+        entry = self._entry(course_id)
+        return entry.config if entry is not None else None
+
+    def get_voice_params(self, course_id, language_code: str):
+        entry = self._entry(course_id)
+        if entry is None:
+            return _resolve_voice(None, language_code)
+        voices = entry.voices
+        if voices is None:
+            # Precompute the table for every language this course configures
+            config = entry.config or {}
+            languages = set(DEFAULT_VOICES) | set(config.get("languages") or []) \
+                | set(config.get("voice_configs") or {})
+            voices = {lang: _resolve_voice(entry.config, lang) for lang in languages}
+            entry.voices = voices
+            self._count("voice_tables")
+        voice = voices.get(language_code)
+        if voice is None:
+            voice = voices[language_code] = _resolve_voice(entry.config, language_code)
+        return voice
+
+    def invalidate(self, course_id=None):
+        """Drop one course (or every course) so the next lookup re-reads it."""
+        with self._lock:
+            if course_id is None:
+                self._entries.clear()
+                self._locks.clear()
+            else:
+                self._entries.pop(course_id, None)
+                self._locks.pop(course_id, None)
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["courses"] = len(self._entries)
+            return metrics
+
+
+_cache = CourseConfigCache()
+
+
+def get_course_config(course_id: str):
+    """Fetch course configuration (cached; see module docstring)."""
+    if not course_id:
+        return None
+    return _cache.get_config(course_id)
+
+
+def get_course_languages(course_id: str):
+    """Get list of supported languages for a course."""
+    config = get_course_config(course_id)
+    if config and "languages" in config:
+        return config["languages"]
+    return DEFAULT_LANGUAGES
+
+
+def get_voice_params(course_id: str, language_code: str):
+    """Resolve Google TTS VoiceSelectionParams for a given course and language.
+
+    A lookup in the course's precomputed voice table; the returned object is
+    shared and must not be modified.
+    """
+    return _cache.get_voice_params(course_id, language_code)
+
+
+def invalidate_course(course_id: str = None):
+    """Forget the cached config of ``course_id`` (or of every course)."""
+    _cache.invalidate(course_id)
+
+
+def log_presentation_event(course_id: str, event_data: dict):
+    """Log a presentation event to the course's history.
+
+    Buffered: the event is written with the course's next batch (see
+    event_log). Returns False if it was dropped because the buffer is full.
+    """
+    if not course_id:
+        logger.warning("No course_id provided for logging.")
+        return False
+
+    # Stored in the subcollection 'logs' under the course document, which
+    # allows easy querying of logs for a specific course
+    return event_log.get_logger(_get_db).log(course_id, event_data)
+
+
+def flush_presentation_events() -> int:
+    """Write buffered presentation events now (e.g. before a CLI exits)."""
+    return event_log.get_logger(_get_db).flush()
@@ -0,0 +1,202 @@
+"""Buffered presentation event log (``courses/{id}/logs``).
+
+``log()`` only appends to an in-memory per-course buffer; a background
+thread writes the buffers with one ``WriteBatch`` per course when a course
+has ``EVENT_LOG_BATCH_SIZE`` events, when the oldest buffered event is
+``EVENT_LOG_FLUSH_SECONDS`` old, and at interpreter exit.
+
+Every event gets a ``client_timestamp`` and a per-process ``client_seq``
+when it is logged, so readers can order events regardless of when their
+batch was committed. The buffer never blocks the caller: once
+``EVENT_LOG_MAX_BUFFER`` events are waiting (the backend is slow or down),
+new events are dropped and counted in ``get_metrics()``. Course IDs come
+from request bodies, so an ID that cannot name a document (empty or with
+a "/") is rejected and counted as ``invalid`` instead of failing a flush.
+
+This module is shared by the config, speech, welcome, goodbye and dialog
+functions (the copies must stay identical).
+"""
+import atexit
+import datetime
+import itertools
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Firestore caps a WriteBatch at 500 writes
+MAX_WRITES_PER_BATCH = 500
+DEFAULT_BATCH_SIZE = min(int(os.environ.get("EVENT_LOG_BATCH_SIZE", "100")), MAX_WRITES_PER_BATCH)
+DEFAULT_FLUSH_SECONDS = float(os.environ.get("EVENT_LOG_FLUSH_SECONDS", "2"))
+DEFAULT_MAX_BUFFER = int(os.environ.get("EVENT_LOG_MAX_BUFFER", "5000"))
+
+
+class EventLogger:
+    """Per-course event buffers flushed in batches by a background thread."""
+
+    def __init__(self, db_factory, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_seconds: float = DEFAULT_FLUSH_SECONDS, max_buffer: int = DEFAULT_MAX_BUFFER,
+                 clock=time.monotonic, background: bool = True):
+        self.db_factory = db_factory
+        self.batch_size = min(batch_size, MAX_WRITES_PER_BATCH)
+        self.flush_seconds = flush_seconds
+        self.max_buffer = max_buffer
+        self.clock = clock
+        self.background = background
+        self._buffers = {}
+        self._buffered = 0
+        self._oldest = None
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        # Serializes flushes (background thread, explicit flush, exit)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._closed = False
+        self._metrics = {"logged": 0, "written": 0, "batches": 0, "dropped": 0, "invalid": 0, "flush_errors": 0}
+
+    def log(self, course_id: str, event: dict) -> bool:
+        """Buffer ``event`` for ``course_id``; return False if it was dropped."""
+        if not valid_course_id(course_id):
+            with self._lock:
+                self._metrics["invalid"] += 1
+            logger.warning("Dropping event for invalid course id %r", course_id)
+            return False
+        event = dict(event)
+        event.setdefault("client_timestamp", datetime.datetime.now(datetime.timezone.utc))
+        with self._lock:
+            if self._buffered >= self.max_buffer or self._closed:
+                self._metrics["dropped"] += 1
+                if self._metrics["dropped"] in (1, 10, 100) or self._metrics["dropped"] % 1000 == 0:
+                    logger.warning("Event log buffer full, %d events dropped so far", self._metrics["dropped"])
+                return False
+            event["client_seq"] = next(self._seq)
+            buffer = self._buffers.setdefault(course_id, [])
+            buffer.append(event)
+            self._buffered += 1
+            self._metrics["logged"] += 1
+            now = self.clock()
+            if self._oldest is None:
+                self._oldest = now
+            # Also checked here: an idle instance's thread may get no CPU
+            due = len(buffer) >= self.batch_size or now - self._oldest >= self.flush_seconds
+        if self.background:
+            self._ensure_thread()
+            if due:
+                self._wake.set()
+        return True
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # Keep the flusher alive; the next pass retries what was requeued
+                with self._lock:
+                    self._metrics["flush_errors"] += 1
+                logger.error(f"Event log flush failed: {e}")
+
+    def _take(self):
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+            self._buffered = 0
+            self._oldest = None
+        return buffers
+
+    def _requeue(self, course_id, events):
+        with self._lock:
+            room = max(self.max_buffer - self._buffered, 0)
+            kept = events[:room]
+            self._metrics["dropped"] += len(events) - len(kept)
+            if kept:
+                self._buffers[course_id] = kept + self._buffers.get(course_id, [])
+                self._buffered += len(kept)
+                if self._oldest is None:
+                    self._oldest = self.clock()
+
+    def flush(self) -> int:
+        """Write everything buffered now; return the number of events written."""
+        written = 0
+        with self._flush_lock:
+            for course_id, events in self._take().items():
+                try:
+                    logs = self.db_factory().collection('courses').document(course_id).collection('logs')
+                except ValueError as e:
+                    # Not a valid document path: retrying cannot help
+                    with self._lock:
+                        self._metrics["invalid"] += len(events)
+                    logger.error(f"Dropping {len(events)} events for invalid course id {course_id!r}: {e}")
+                    continue
+                except Exception as e:
+                    with self._lock:
+                        self._metrics["flush_errors"] += 1
+                    logger.error(f"Failed to write {len(events)} events for course {course_id}: {e}")
+                    self._requeue(course_id, events)
+                    continue
+                for start in range(0, len(events), self.batch_size):
+                    chunk = events[start:start + self.batch_size]
+                    try:
+                        batch = self.db_factory().batch()
+                        for event in chunk:
+                            batch.set(logs.document(), event)
+                        batch.commit()
+                    except Exception as e:
+                        with self._lock:
+                            self._metrics["flush_errors"] += 1
+                        logger.error(f"Failed to write {len(chunk)} events for course {course_id}: {e}")
+                        self._requeue(course_id, events[start:])
+                        break
+                    written += len(chunk)
+                    with self._lock:
+                        self._metrics["written"] += len(chunk)
+                        self._metrics["batches"] += 1
+        if written:
+            logger.debug("Flushed %d presentation events", written)
+        return written
+
+    def close(self):
+        """Flush what is buffered and stop accepting events."""
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["buffered"] = self._buffered
+            return metrics
+
+
+def valid_course_id(course_id) -> bool:
+    """Whether ``course_id`` can name a Firestore document."""
+    return (isinstance(course_id, str) and bool(course_id.strip()) and "/" not in course_id
+            and course_id not in (".", ".."))
+
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def get_logger(db_factory) -> EventLogger:
+    """Process-wide logger (created on first use, flushed at exit)."""
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            _logger = EventLogger(db_factory)
+            atexit.register(_logger.close)
+        return _logger
+
+
+def get_metrics() -> dict:
+    return _logger.get_metrics() if _logger is not None else {}
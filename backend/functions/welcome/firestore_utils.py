@@ -1,23 +1,15 @@
-from google.cloud import firestore
-import logging
-import os
-
-logger = logging.getLogger(__name__)
+import config_snapshot
 
 def get_config():
-    try:
-        db = firestore.Client(database="langbridge")
-        doc_ref = db.collection('langbridge_config').document('messages')
-        doc = doc_ref.get()
-        
-        if doc.exists:
-            return doc.to_dict()
-        else:
-            logger.warning("Config document not found, using default.")
-            return get_default_config()
-    except Exception as e:
-        logger.error(f"Failed to load config from Firestore: {e}")
-        return get_default_config()
+    """Return the messages config from this instance's live snapshot.
+
+    Served from memory; see config_snapshot for how it is kept fresh.
+    """
+    return config_snapshot.get_snapshot(get_default_config).get()
+
+def get_versioned_config():
+    """Return ``(config, version)`` from the same snapshot (see get_config)."""
+    return config_snapshot.get_snapshot(get_default_config).get_versioned()
 
 def get_default_config():
     return {
@@ -51,18 +43,3 @@ def get_default_config():
             "yue-HK": "大家好！我係今日嘅演讲者。让我哋开始啦。"
         }
     }
-
-def _get_db():
-    # Assuming the database name is consistent across the project or set via env var
-    db_name = os.environ.get("FIRESTORE_DATABASE", "langbridge").strip()
-    if db_name:
-        return firestore.Client(database=db_name)
-    return firestore.Client(database="langbridge")
-
-def get_document(collection_name, document_id):
-    db = _get_db()
-    doc_ref = db.collection(collection_name).document(document_id)
-    doc = doc_ref.get()
-    if doc.exists:
-        return doc.to_dict()
-    return None
@@ -0,0 +1,157 @@
+"""Instance-local index of the ``presenters`` collection.
+
+Presenters are a small set synced from admin_tools/presenters/*.yaml, so
+the whole collection is loaded once (in the background at cold start) and
+kept current by a collection listener. If the listener is down the
+collection is reloaded at most every ``PRESENTER_DIRECTORY_TTL`` seconds.
+
+Because the full set is in memory, an unknown presenter ID is answered from
+the index as well: bogus IDs cost no Firestore read. A failed load keeps the
+previous index and is retried after ``PRESENTER_DIRECTORY_RETRY`` seconds;
+until the first load succeeds, lookups fall back to reading the document.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PRESENTERS_COLLECTION = "presenters"
+DEFAULT_TTL_SECONDS = float(os.environ.get("PRESENTER_DIRECTORY_TTL", "300"))
+DEFAULT_RETRY_SECONDS = float(os.environ.get("PRESENTER_DIRECTORY_RETRY", "10"))
+
+
+def _presenters_ref():
+    from google.cloud import firestore
+
+    db_name = os.environ.get("FIRESTORE_DATABASE", "langbridge").strip() or "langbridge"
+    return firestore.Client(database=db_name).collection(PRESENTERS_COLLECTION)
+
+
+class PresenterDirectory:
+    """All presenter documents keyed by ID."""
+
+    def __init__(self, ref_factory=_presenters_ref, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 use_listener: bool = True, clock=time.monotonic,
+                 retry_seconds: float = DEFAULT_RETRY_SECONDS):
+        self.ref_factory = ref_factory
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        self.use_listener = use_listener
+        self.clock = clock
+        self._ref = None
+        self._watch = None
+        self._presenters = None
+        self._loaded_at = None
+        self._retry_at = 0.0
+        self._listener_retry_at = 0.0
+        self._lock = threading.Lock()
+        self._metrics = {"loads": 0, "load_errors": 0, "listener_events": 0, "hits": 0, "misses": 0,
+                         "fallback_reads": 0}
+
+    def _collection(self):
+        if self._ref is None:
+            self._ref = self.ref_factory()
+        return self._ref
+
+    def _listener_active(self) -> bool:
+        return self._watch is not None and getattr(self._watch, "is_active", True)
+
+    def _load(self):
+        self._metrics["loads"] += 1
+        try:
+            presenters = {doc.id: doc.to_dict() for doc in self._collection().stream()}
+        except Exception as e:
+            self._metrics["load_errors"] += 1
+            # Keep whatever index we have and retry soon rather than a TTL later
+            self._retry_at = self.clock() + self.retry_seconds
+            logger.error("Failed to load presenters: %s", e)
+            return
+        self._presenters = presenters
+        self._loaded_at = self.clock()
+        logger.info("Loaded %d presenters", len(presenters))
+
+    def _start_listener(self):
+        if not self.use_listener or self._listener_active() or self.clock() < self._listener_retry_at:
+            return
+        # A broken listener is retried at most once per TTL
+        self._listener_retry_at = self.clock() + self.ttl_seconds
+        if self._watch is not None:
+            try:
+                self._watch.unsubscribe()
+            except Exception:
+                pass
+        try:
+            self._watch = self._collection().on_snapshot(self._on_snapshot)
+        except Exception as e:
+            self._watch = None
+            logger.warning("Presenter listener unavailable, reloading on TTL: %s", e)
+
+    def _on_snapshot(self, docs, changes, read_time):
+        # Collection snapshots always carry the full result set
+        with self._lock:
+            self._presenters = {doc.id: doc.to_dict() for doc in docs}
+            self._loaded_at = self.clock()
+            self._metrics["listener_events"] += 1
+
+    def _ensure_fresh(self):
+        now = self.clock()
+        if self._loaded_at is None:
+            if now >= self._retry_at:
+                self._load()
+        elif not self._listener_active() and now - self._loaded_at > self.ttl_seconds \
+                and now >= self._retry_at:
+            self._load()
+        self._start_listener()
+
+    def preload(self):
+        with self._lock:
+            self._ensure_fresh()
+
+    def _read_one(self, presenter_id: str):
+        try:
+            doc = self._collection().document(presenter_id).get()
+        except Exception as e:
+            logger.error("Failed to read presenter %s: %s", presenter_id, e)
+            return None
+        return doc.to_dict() if doc.exists else None
+
+    def get(self, presenter_id: str):
+        """Return the presenter document, or None for unknown IDs."""
+        with self._lock:
+            self._ensure_fresh()
+            loaded = self._presenters is not None
+            presenter = self._presenters.get(presenter_id) if loaded else None
+            if loaded:
+                self._metrics["hits" if presenter else "misses"] += 1
+                return presenter
+            self._metrics["fallback_reads"] += 1
+        # No index yet: answer this ID directly, outside the lock
+        presenter = self._read_one(presenter_id)
+        with self._lock:
+            self._metrics["hits" if presenter else "misses"] += 1
+        return presenter
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["presenters"] = len(self._presenters or {})
+            metrics["listener_active"] = self._listener_active()
+            return metrics
+
+
+_directory = PresenterDirectory()
+
+
+def preload_async():
+    """Start loading the directory without blocking the caller (cold start)."""
+    threading.Thread(target=_directory.preload, daemon=True).start()
+
+
+def get_presenter(presenter_id: str):
+    return _directory.get(presenter_id)
+
+
+def get_metrics() -> dict:
+    return _directory.get_metrics()
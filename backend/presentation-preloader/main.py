@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Preload a presentation: warm the message cache and the speech audio.
+
+Speaker notes are streamed straight out of .pptx/.pptm files (see
+pptx_notes.py) and normalized with the config function's own
+firestore_utils._normalize_context, so the cache keys are the ones looked
+up when the lecturer reaches each slide. For every distinct notes text and
+course language the preloader:
+
+  1. reads the presentation cache (langbridge_presentation_cache) and
+     generates the message on a miss (message_generator caches it),
+  2. makes sure the MP3/Opus variants exist through the shared audio
+     index (clips already synthesized for any course cost no TTS call),
+  3. records the audio URLs in the cache entry.
+
+Slides with the same notes share one cache entry and are processed once.
+The work runs on the seeder's bounded stage pools (seeds/seed_pipeline.py),
+so generation and synthesis of many slides overlap without exceeding the
+services' quotas, and processing starts while later slides are still read.
+
+Usage:
+  python main.py --pptx deck.pptx --course-id course_101
+  python main.py --pptx deck.pptx --languages en-US,zh-CN,yue-HK
+  python main.py --pptx a.pptx b.pptm --course-id course_101 --dry-run
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BACKEND_DIR, "functions", "config"))
+sys.path.append(os.path.join(BACKEND_DIR, "seeds"))
+
+import pptx_notes
+import seed_pipeline
+
+try:
+    import config
+except ImportError:
+    # Written by backend/sync_config.py
+    config = None
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(levelname)s:%(message)s',
+    stream=sys.stdout
+)
+logger = logging.getLogger(__name__)
+
+# message generation (cache lookups included), TTS, cache writes
+DEFAULT_WORKERS = {"llm": 4, "tts": 8, "firestore": 4}
+DEFAULT_MAX_IN_FLIGHT = 8
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _shared_client(key, factory):
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = factory()
+        return _clients[key]
+
+
+def _get_bucket(bucket_name):
+    from google.cloud import storage
+
+    return _shared_client(("bucket", bucket_name), lambda: storage.Client().bucket(bucket_name))
+
+
+def _get_tts_client():
+    from google.cloud import texttospeech
+
+    return _shared_client(("tts",), texttospeech.TextToSpeechClient)
+
+
+def _set_env(project_id):
+    """google.genai reads these when message_generator first builds the agent."""
+    if project_id:
+        os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
+    os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "us-east1")
+    os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "true")
+
+
+def distinct_notes(paths):
+    """Yield (label, context) once per distinct normalized notes text, in deck order."""
+    from firestore_utils import _normalize_context
+
+    seen = set()
+    for path in paths:
+        deck = os.path.basename(path)
+        for slide_number, notes in pptx_notes.iter_notes(path):
+            context = _normalize_context(notes)
+            if not context:
+                logger.info(f"{deck} slide {slide_number}: no speaker notes, skipped")
+                continue
+            if context in seen:
+                logger.info(f"{deck} slide {slide_number}: same notes as an earlier slide")
+                continue
+            seen.add(context)
+            yield f"{deck} slide {slide_number}", context
+
+
+def preload_context(pools, context, languages, course_id, bucket_name):
+    """Warm one notes text in every language; return a seed_pipeline.SlideResult."""
+    import audio_index
+    import course_utils
+    import firestore_utils
+    import message_generator
+    import utils
+
+    cached = {}
+
+    def generate(lang):
+        entry = firestore_utils.get_cached_presentation_entry(lang, context)
+        if entry:
+            cached[lang] = entry
+            return entry["message"]
+        message, _ = message_generator.generate_presentation_message(lang, context, course_id=course_id)
+        return message
+
+    def synthesize(lang, message):
+        if not bucket_name:
+            return {"text": message}
+        variants = audio_index.ensure_audio_variants(
+            utils.sanitize_text_for_tts(message),
+            course_utils.get_voice_params(course_id, lang),
+            _get_bucket(bucket_name),
+            _get_tts_client(),
+            lang,
+        )
+        urls = {fmt: audio_index.public_url(bucket_name, name) for fmt, name in variants.items()}
+        return {"text": message, "audio_url": urls.get("mp3"), "audio_variants": urls}
+
+    def write(payloads):
+        for lang, payload in payloads.items():
+            variants = payload.get("audio_variants")
+            if variants and cached.get(lang, {}).get("audio_variants") != variants:
+                firestore_utils.cache_presentation_message(
+                    lang, payload["text"], context, course_id=course_id,
+                    audio_url=payload["audio_url"], audio_variants=variants,
+                )
+
+    return seed_pipeline.run_slide(pools, languages, {}, generate, synthesize, write)
+
+
+def parse_languages(values):
+    """Accept 'en-US,zh-CN' as well as 'en-US zh-CN'."""
+    return [lang.strip() for value in values for lang in value.split(",") if lang.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preload presentation messages and speech from PowerPoint files.")
+    parser.add_argument("--pptx", nargs="+", required=True, help="One or more .pptx/.pptm files")
+    parser.add_argument("--course-id", help="Course whose languages and voices to use (and to tag cache entries with)")
+    parser.add_argument("--languages", nargs="+", help="Languages, e.g. en-US,zh-CN (default: the course's languages)")
+    parser.add_argument("--bucket", default=getattr(config, "speech_file_bucket", None),
+                        help="Speech bucket (default: speech_file_bucket from config.py)")
+    parser.add_argument("--no-tts", action="store_true", help="Only warm the message cache")
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT, help="Notes texts processed at once")
+    parser.add_argument("--llm-workers", type=int, default=DEFAULT_WORKERS["llm"], help="Concurrent cache lookups / generations")
+    parser.add_argument("--tts-workers", type=int, default=DEFAULT_WORKERS["tts"], help="Concurrent syntheses")
+    parser.add_argument("--dry-run", action="store_true", help="List the slides and cache keys without calling any service")
+    args = parser.parse_args()
+
+    for path in args.pptx:
+        if not os.path.exists(path):
+            logger.error(f"File not found: {path}")
+            sys.exit(1)
+
+    if args.dry_run:
+        from firestore_utils import _cache_key
+
+        # Without --languages the course's languages are not read; "*" stands for them
+        languages = parse_languages(args.languages or ["*"])
+        for label, context in distinct_notes(args.pptx):
+            keys = ", ".join(_cache_key(lang, context) for lang in languages)
+            print(f"{label}: {len(context)} chars -> {keys}")
+        return
+
+    _set_env(getattr(config, "project_id", None))
+    import course_utils
+
+    languages = parse_languages(args.languages) if args.languages else course_utils.get_course_languages(args.course_id)
+    bucket_name = None if args.no_tts else args.bucket
+    if not args.no_tts and not bucket_name:
+        logger.error("No speech bucket: pass --bucket, run backend/sync_config.py, or use --no-tts")
+        sys.exit(1)
+    logger.info(f"Languages: {languages}; course: {args.course_id or '(none)'}; bucket: {bucket_name or '(no TTS)'}")
+
+    workers = {"llm": args.llm_workers, "tts": args.tts_workers, "firestore": DEFAULT_WORKERS["firestore"]}
+    with seed_pipeline.StagePools(workers) as pools:
+        def work(payload):
+            label, context = payload
+            result = preload_context(pools, context, languages, args.course_id, bucket_name)
+            if result.ok:
+                logger.info(f"✅ {label}: {', '.join(result.languages)}")
+            else:
+                logger.warning(f"❌ {label}: {result.errors}")
+            return result
+
+        summary = seed_pipeline.run_tasks(
+            ((label, context, (label, context)) for label, context in distinct_notes(args.pptx)),
+            work,
+            max_in_flight=args.max_in_flight,
+        )
+    logger.info(f"Notes texts: {summary['done']} preloaded, {summary['failed']} incomplete")
+    logger.info(f"Stage metrics: {pools.get_metrics()}")
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
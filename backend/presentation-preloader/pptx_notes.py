@@ -0,0 +1,103 @@
+"""Speaker notes read straight from a .pptx/.pptm package.
+
+A presentation is a zip of XML parts, so the notes of each slide are
+streamed out of its notes part with ``iterparse`` instead of loading the
+whole deck with python-pptx. The text is taken the way the VBA add-in
+(client/vba/modHttpNotes.bas, ``GetNotesText``) sends it at runtime: the
+notes body placeholder if it has text, otherwise the text of every shape
+on the notes page. The preloader normalizes it with the config function's
+``_normalize_context``, so preloaded cache keys match the keys looked up
+during the lecture.
+"""
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+NS = {
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+NOTES_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide"
+
+_A = "{%s}" % NS["a"]
+_P = "{%s}" % NS["p"]
+
+
+def _rels(package, part_name):
+    """{rId: (type, target part name)} of a part."""
+    folder, name = posixpath.split(part_name)
+    rels_name = posixpath.join(folder, "_rels", name + ".rels")
+    try:
+        root = ET.fromstring(package.read(rels_name))
+    except KeyError:
+        return {}
+    rels = {}
+    for rel in root.iter(f"{{{NS['rel']}}}Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = posixpath.normpath(posixpath.join(folder, rel.get("Target")))
+        rels[rel.get("Id")] = (rel.get("Type"), target.lstrip("/"))
+    return rels
+
+
+def slide_parts(package):
+    """Slide part names in presentation order."""
+    rels = _rels(package, "ppt/presentation.xml")
+    root = ET.fromstring(package.read("ppt/presentation.xml"))
+    parts = []
+    for slide_id in root.iterfind("p:sldIdLst/p:sldId", NS):
+        rel = rels.get(slide_id.get(f"{{{NS['r']}}}id"))
+        if rel:
+            parts.append(rel[1])
+    return parts
+
+
+def _paragraph_text(paragraph):
+    text = []
+    for node in paragraph.iter():
+        if node.tag == _A + "t":
+            text.append(node.text or "")
+        elif node.tag == _A + "br":
+            # PowerPoint reports a line break inside a paragraph as a vertical tab
+            text.append("\v")
+    return "".join(text)
+
+
+def read_notes_part(stream) -> str:
+    """Text of a notes slide part (a file object), as ``GetNotesText`` returns it."""
+    body = None
+    shapes = []
+    for _, element in ET.iterparse(stream, events=("end",)):
+        if element.tag != _P + "sp":
+            continue
+        text_body = element.find("p:txBody", NS)
+        text = "\r".join(_paragraph_text(p) for p in text_body.iterfind("a:p", NS)) if text_body is not None else ""
+        placeholder = element.find("p:nvSpPr/p:nvPr/p:ph", NS)
+        if body is None and text and placeholder is not None and placeholder.get("type") == "body":
+            body = text
+        if text:
+            shapes.append(text)
+        element.clear()
+    if body is not None:
+        return body
+    return "\r\n".join(shapes)
+
+
+def iter_notes(path):
+    """Yield (slide_number, notes) for every slide, in order, one notes part at a time.
+
+    Slides without a notes page yield an empty string.
+    """
+    with zipfile.ZipFile(path) as package:
+        for number, slide_part in enumerate(slide_parts(package), start=1):
+            notes_part = next(
+                (target for rel_type, target in _rels(package, slide_part).values() if rel_type == NOTES_REL_TYPE),
+                None,
+            )
+            if notes_part is None:
+                yield number, ""
+                continue
+            with package.open(notes_part) as stream:
+                yield number, read_notes_part(stream)
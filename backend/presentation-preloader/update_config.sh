@@ -0,0 +1,5 @@
+#!/bin/bash
+# Writes config.py (project_id, speech_file_bucket) from the CDKTF outputs
+set -e
+cd "$(dirname "$0")/.."
+python sync_config.py
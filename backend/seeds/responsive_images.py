@@ -0,0 +1,249 @@
+"""Responsive variants of slide visuals for seed_course_content.
+
+The generated ``slide_N_reimagined.png`` files are full-size PNGs, and
+every student's phone used to download them on each slide change. This
+module converts each distinct image into WebP (and optionally AVIF) at a
+few widths plus a tiny blurred placeholder that is inlined as a data URI,
+so clients pick the smallest adequate file from a ``srcset`` and paint
+the placeholder while it loads. The original PNG stays the ``slide_link``
+for clients that do not read ``slide_images``.
+
+Conversion is CPU-bound, so ``ensure_variants()`` runs it in a process
+pool. Results are cached next to the data (``<cache_dir>/<md5>/``) with a
+``meta.json``, so reruns only convert new images.
+
+Pillow is optional: without it (or without a format's codec) the seeder
+logs a warning and keeps uploading the PNGs only.
+
+Usage (report of the bytes saved, no uploads):
+  python responsive_images.py --data-dir generate [--formats webp avif]
+"""
+import argparse
+import base64
+import glob
+import hashlib
+import io
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (480, 960, 1440)
+DEFAULT_FORMATS = ("webp",)
+CONTENT_TYPES = {"png": "image/png", "webp": "image/webp", "avif": "image/avif"}
+QUALITY = {"webp": 80, "avif": 60}
+PLACEHOLDER_WIDTH = 32
+PLACEHOLDER_QUALITY = 40
+# Bump when the encoding settings change, so cached variants are rebuilt
+VARIANTS_VERSION = 1
+
+
+def available_formats(formats):
+    """The subset of ``formats`` Pillow can encode here (empty without Pillow)."""
+    try:
+        from PIL import features
+    except ImportError:
+        if formats:
+            logger.warning("Pillow is not installed; uploading PNG visuals only (pip install Pillow)")
+        return []
+    usable = []
+    for fmt in formats:
+        if features.check(fmt):
+            usable.append(fmt)
+        else:
+            logger.warning(f"This Pillow build cannot encode {fmt}; skipping {fmt} variants")
+    return usable
+
+
+def variant_widths(width, widths=DEFAULT_WIDTHS):
+    """Target widths for an image ``width`` pixels wide; never upscaled."""
+    return sorted({min(w, width) for w in widths})
+
+
+def settings_digest(widths, formats) -> str:
+    return f"v{VARIANTS_VERSION}:" + ",".join(map(str, sorted(widths))) + ":" + ",".join(sorted(formats))
+
+
+def convert(source_path, out_dir, widths=DEFAULT_WIDTHS, formats=DEFAULT_FORMATS) -> dict:
+    """Write the variants of one image into ``out_dir`` and return its meta.
+
+    The meta (also saved as ``meta.json``) holds the source size, the
+    placeholder data URI and ``variants``: {format: {width: file name}},
+    widths as strings, plus ``bytes`` per file for reporting.
+    Runs in a worker process, so it only takes and returns plain data.
+    """
+    from PIL import Image, ImageFilter
+
+    os.makedirs(out_dir, exist_ok=True)
+    with Image.open(source_path) as source:
+        source.load()
+        image = source.convert("RGBA" if "A" in source.getbands() else "RGB")
+    width, height = image.size
+
+    meta = {
+        "settings": settings_digest(widths, formats),
+        "width": width,
+        "height": height,
+        "source_bytes": os.path.getsize(source_path),
+        "variants": {},
+        "bytes": {},
+    }
+    for target in variant_widths(width, widths):
+        resized = image if target == width else image.resize(
+            (target, max(1, round(height * target / width))), Image.LANCZOS
+        )
+        for fmt in formats:
+            name = f"{target}w.{fmt}"
+            resized.save(os.path.join(out_dir, name), fmt.upper(), quality=QUALITY[fmt])
+            meta["variants"].setdefault(fmt, {})[str(target)] = name
+            meta["bytes"][name] = os.path.getsize(os.path.join(out_dir, name))
+
+    tiny = image.resize((PLACEHOLDER_WIDTH, max(1, round(height * PLACEHOLDER_WIDTH / width))), Image.BILINEAR)
+    buffer = io.BytesIO()
+    tiny.filter(ImageFilter.GaussianBlur(1)).save(buffer, "WEBP", quality=PLACEHOLDER_QUALITY)
+    meta["placeholder"] = "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    tmp_path = os.path.join(out_dir, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp_path, os.path.join(out_dir, "meta.json"))
+    return meta
+
+
+def load_meta(out_dir, widths, formats):
+    """The cached meta in ``out_dir`` if it was built with these settings and its files exist."""
+    try:
+        with open(os.path.join(out_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("settings") != settings_digest(widths, formats):
+        return None
+    if not all(os.path.exists(os.path.join(out_dir, name)) for name in meta["bytes"]):
+        return None
+    return meta
+
+
+def ensure_variants(sources, cache_dir, widths=DEFAULT_WIDTHS, formats=DEFAULT_FORMATS, max_workers=None):
+    """Convert the images in ``sources`` ({key: path}, key an MD5 hex) in a process pool.
+
+    Returns {key: meta} with ``dir`` added (where the variant files are).
+    Cached variants are reused; an image that fails to convert is logged
+    and left out, so its slide falls back to the PNG alone.
+    """
+    metas = {}
+    if not formats:
+        return metas
+    todo = {}
+    for key, path in sources.items():
+        out_dir = os.path.join(cache_dir, key)
+        meta = load_meta(out_dir, widths, formats)
+        if meta:
+            metas[key] = dict(meta, dir=out_dir)
+        else:
+            todo[key] = (path, out_dir)
+    if not todo:
+        return metas
+
+    logger.info(f"Converting {len(todo)} visuals to {'/'.join(formats)} ({len(metas)} cached)")
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            key: executor.submit(convert, path, out_dir, tuple(widths), tuple(formats))
+            for key, (path, out_dir) in todo.items()
+        }
+        for key, future in futures.items():
+            try:
+                metas[key] = dict(future.result(), dir=todo[key][1])
+            except Exception as e:
+                logger.error(f"❌ Failed to convert {todo[key][0]}: {e}")
+    return metas
+
+
+def slide_images(meta, url_for) -> dict:
+    """The ``slide_images`` field of a slide payload.
+
+    ``url_for(file_name)`` returns a variant's public URL. ``srcset`` maps
+    each format to a ready-made srcset string ("url 480w, url 960w").
+    """
+    return {
+        "width": meta["width"],
+        "height": meta["height"],
+        "placeholder": meta["placeholder"],
+        "srcset": {
+            fmt: ", ".join(f"{url_for(name)} {width}w" for width, name in
+                           sorted(files.items(), key=lambda item: int(item[0])))
+            for fmt, files in meta["variants"].items()
+        },
+    }
+
+
+def bytes_report(metas) -> dict:
+    """Totals over ``metas``: {"images", "png", format: {"smallest", "largest", "all"}}.
+
+    ``smallest``/``largest`` sum the narrowest and widest variant of each
+    image, i.e. what a phone and a full-screen desktop download.
+    """
+    report = {"images": len(metas), "png": 0}
+    for meta in metas.values():
+        report["png"] += meta["source_bytes"]
+        for fmt, files in meta["variants"].items():
+            sizes = [meta["bytes"][name] for _, name in sorted(files.items(), key=lambda item: int(item[0]))]
+            totals = report.setdefault(fmt, {"smallest": 0, "largest": 0, "all": 0})
+            totals["smallest"] += sizes[0]
+            totals["largest"] += sizes[-1]
+            totals["all"] += sum(sizes)
+    return report
+
+
+def _file_md5_hex(path):
+    with open(path, "rb") as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the bytes saved by responsive slide visuals.")
+    parser.add_argument("--data-dir", default="generate", help="Directory with the *_visuals folders")
+    parser.add_argument("--formats", nargs="+", default=list(DEFAULT_FORMATS), choices=sorted(QUALITY))
+    parser.add_argument("--widths", nargs="+", type=int, default=list(DEFAULT_WIDTHS))
+    parser.add_argument("--workers", type=int, default=None, help="Conversion processes (default: CPU count)")
+    parser.add_argument("--cache-dir", help="Default: <data-dir>/.image_variants")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(message)s')
+
+    data_dir = args.data_dir
+    if not os.path.isabs(data_dir):
+        data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), data_dir)
+    formats = available_formats(args.formats)
+    if not formats:
+        return
+    cache_dir = args.cache_dir or os.path.join(data_dir, ".image_variants")
+
+    decks = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, "*_visuals", "*.png"))):
+        deck = os.path.basename(os.path.dirname(path))
+        decks.setdefault(deck, {})[_file_md5_hex(path)] = path
+    sources = {key: path for images in decks.values() for key, path in images.items()}
+    metas = ensure_variants(sources, cache_dir, args.widths, formats, args.workers)
+
+    def mb(n):
+        return f"{n / 1e6:.2f} MB"
+
+    print(f"{'deck':<38} {'images':>6} {'png':>9}" + "".join(
+        f" {fmt + ' small':>11} {fmt + ' large':>11}" for fmt in formats))
+    rows = [(deck, {key: metas[key] for key in images if key in metas}) for deck, images in decks.items()]
+    rows.append(("total (distinct images)", metas))
+    for label, deck_metas in rows:
+        report = bytes_report(deck_metas)
+        print(f"{label:<38} {report['images']:>6} {mb(report['png']):>9}" + "".join(
+            f" {mb(report[fmt]['smallest']):>11} {mb(report[fmt]['largest']):>11}" for fmt in formats))
+    report = bytes_report(metas)
+    for fmt in formats:
+        for size in ("smallest", "largest"):
+            saved = 1 - report[fmt][size] / report["png"] if report["png"] else 0
+            print(f"{fmt} {size} variant saves {saved:.0%} of the PNG bytes per slide change")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,16 @@ import json
 import logging
 import os
 import sys
-import time
+import base64
 import glob
 import hashlib
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from google.api_core.exceptions import PreconditionFailed
 from google.cloud import storage, firestore, texttospeech
+from google.cloud.storage import transfer_manager
+
+import responsive_images
+import seed_pipeline
 
 # Add backend root to sys.path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -62,6 +67,7 @@ try:
     import course_utils
     import firestore_utils
     import utils
+    import audio_index
 except ImportError as e:
     logging.error(f"Failed to import function modules: {e}", exc_info=True)
     sys.exit(1)
@@ -94,24 +100,107 @@ def load_cdktf_outputs():
         logger.warning(f"Failed to read cdktf_outputs.json: {e}")
         return {}
 
-def upload_to_bucket(bucket_name, source_file_path, destination_blob_name):
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def shared_client(key, factory):
     """
-    Uploads a file to the bucket and returns the public URL.
+    Returns the client stored under `key`, creating it with `factory` once.
+    Google clients are thread-safe, so every stage worker shares them.
     """
-    try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(destination_blob_name)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = factory()
+        return _clients[key]
 
-        blob.upload_from_filename(source_file_path)
-        
-        # Construct public URL (assuming the bucket allows public access or we use the media link)
-        url = blob.public_url
-        logger.info(f"✅ Uploaded {source_file_path} to {destination_blob_name}. URL: {url}")
-        return url
-    except Exception as e:
-        logger.error(f"❌ Failed to upload {source_file_path} to bucket: {e}")
-        return None
+def get_storage_client(project=None):
+    return shared_client(("storage", project), lambda: storage.Client(project=project))
+
+def get_tts_client():
+    return shared_client(("tts",), texttospeech.TextToSpeechClient)
+
+def get_broadcast_db(client_project_id):
+    return shared_client(
+        ("firestore", client_project_id),
+        lambda: firestore.Client(project=client_project_id, database="(default)")
+    )
+
+def get_registry_writes(client_project_id):
+    """Registry writes, batched on the client project's BulkWriter (see seed_pipeline.BulkWrites)."""
+    return shared_client(
+        ("registry_writes", client_project_id),
+        lambda: seed_pipeline.BulkWrites(lambda: get_broadcast_db(client_project_id).bulk_writer())
+    )
+
+def get_cache_writes():
+    """Presentation cache writes, batched on the backend database's BulkWriter."""
+    return shared_client(
+        ("cache_writes",),
+        lambda: seed_pipeline.BulkWrites(lambda: firestore_utils._get_db().bulk_writer())
+    )
+
+def presentation_ref(client_project_id, course_id, ppt_filename):
+    """The registry document of a deck: presentation_broadcast/{course}/presentations/{normalized name}."""
+    safe_ppt_id = normalize_ppt_filename(ppt_filename).replace('/', '_').replace('\\', '_')
+    broadcast_ref = get_broadcast_db(client_project_id).collection('presentation_broadcast').document(course_id or 'current')
+    return broadcast_ref.collection('presentations').document(safe_ppt_id)
+
+def visual_blob_name(base_name, md5_base64):
+    """
+    Content-addressed name of a deck's visual: identical images in several
+    language folders (or slides) share one object.
+    """
+    return f"generated_visuals/{base_name}/{base64.b64decode(md5_base64).hex()}.png"
+
+def variant_blob_name(base_name, md5_hex, file_name):
+    """Name of a responsive variant of the visual with MD5 `md5_hex`, e.g. '.../<md5>/480w.webp'."""
+    return f"generated_visuals/{base_name}/{md5_hex}/{file_name}"
+
+def plan_visual_images(bucket_name, base_name, md5_hex, meta):
+    """
+    Returns ({blob_name: local_path} of the variants, the `slide_images`
+    field linking them) for a visual converted by responsive_images.
+    """
+    bucket = get_storage_client().bucket(bucket_name)
+    blobs = {
+        variant_blob_name(base_name, md5_hex, name): os.path.join(meta["dir"], name)
+        for name in meta["bytes"]
+    }
+    images = responsive_images.slide_images(
+        meta, lambda name: bucket.blob(variant_blob_name(base_name, md5_hex, name)).public_url
+    )
+    return blobs, images
+
+def upload_visuals(bucket_name, uploads, max_workers=seed_pipeline.DEFAULT_UPLOAD_WORKERS):
+    """
+    Uploads a deck's visuals and their variants ({blob_name: local_path})
+    concurrently with the transfer manager and the shared client. Returns
+    the blob names that failed.
+    """
+    bucket = get_storage_client().bucket(bucket_name)
+    pairs = []
+    for blob_name, source_file_path in uploads.items():
+        blob = bucket.blob(blob_name)
+        # Content-addressed objects never change
+        blob.cache_control = "public, max-age=31536000, immutable"
+        blob.content_type = responsive_images.CONTENT_TYPES[blob_name.rsplit(".", 1)[-1]]
+        pairs.append((source_file_path, blob))
+
+    results = transfer_manager.upload_many(
+        pairs,
+        # An existing object already has this content (412 is returned, not raised)
+        skip_if_exists=True,
+        max_workers=max_workers,
+        worker_type=transfer_manager.THREAD,
+    )
+    failed = set()
+    for (source_file_path, blob), result in zip(pairs, results):
+        if isinstance(result, Exception) and not isinstance(result, PreconditionFailed):
+            logger.error(f"❌ Failed to upload {source_file_path} to bucket: {result}")
+            failed.add(blob.name)
+    logger.info(f"✅ Uploaded {len(pairs) - len(failed)}/{len(pairs)} visuals to {bucket_name}")
+    return failed
 
 def load_notes_for_language(json_path, lang_code):
     """
@@ -169,6 +258,14 @@ def load_slides_structure(json_path):
 
 # --- LOGIC MIGRATION ---
 
+def normalize_ppt_filename(ppt_filename):
+    """Strips the extension and variant suffixes: 'lecture1_en_with_visuals.pptm' -> 'lecture1'."""
+    _ppt_norm = os.path.splitext(ppt_filename.lower())[0]
+    for _s in ("_with_visuals", "_with_notes", "_visuals", "_en", "_zh-cn", "_yue-hk"):
+        if _ppt_norm.endswith(_s):
+            _ppt_norm = _ppt_norm[: -len(_s)]
+    return _ppt_norm
+
 def process_slide_locally(
     slide_number, 
     context, 
@@ -178,26 +275,32 @@ def process_slide_locally(
     bucket_name, 
     backend_project_id, 
     client_project_id, 
-    visual_links,
-    pre_generated_messages=None
+    visual_files,
+    pools,
+    pre_generated_messages=None,
+    process_languages=None,
+    removed_languages=None,
+    visual_upload=None,
+    visual_images=None
 ):
     """
-    Replicates logic to generate/broadcast. 
-    Now accepts `pre_generated_messages`: { 'zh-CN': '...', 'yue-HK': '...' }
+    Replicates logic to generate/broadcast for one slide and returns a
+    seed_pipeline.SlideResult.
+    Accepts `pre_generated_messages`: { 'zh-CN': '...', 'yue-HK': '...' }
+    and `visual_files`: { 'zh-CN': (local_path, blob_name) }, uploaded by
+    the deck's bulk upload: `visual_upload` is its future (the set of blob
+    names that failed), or None when nothing needed uploading.
+    `visual_images`: { 'zh-CN': (variant_blob_names, slide_images) } adds
+    the responsive variants (see responsive_images) next to `slide_link`.
+    Incremental runs pass the plan: only `process_languages` are generated
+    and synthesized and `removed_languages` are deleted from the registry.
+    Every remote call runs on its stage pool in `pools` (see seed_pipeline);
+    Firestore writes are queued on the shared BulkWriters. The deck's own
+    registry document and seed event are written once per deck by main().
     """
     logger.info(f"--- Processing Slide {slide_number} ---")
     pre_generated_messages = pre_generated_messages or {}
-    
-    os.environ["GOOGLE_CLOUD_PROJECT"] = backend_project_id
-
-    # Log the event 
-    _preview = context[:50] + ("..." if len(context) > 50 else "")
-    course_utils.log_presentation_event(course_id, {
-        "type": "slide_change",
-        "context_snippet": _preview,
-        "languages": languages,
-        "timestamp": firestore.SERVER_TIMESTAMP
-    })
+    removed_languages = removed_languages or []
 
     # Prepare broadcast payload
     broadcast_payload = {
@@ -212,12 +315,8 @@ def process_slide_locally(
     # Normalize ppt filename
     if ppt_filename:
         try:
-            _ppt_norm = os.path.splitext(ppt_filename.lower())[0]
-            for _s in ("_with_visuals", "_with_notes", "_visuals", "_en", "_zh-cn", "_yue-hk"):
-                if _ppt_norm.endswith(_s):
-                    _ppt_norm = _ppt_norm[: -len(_s)]
             broadcast_payload["ppt_filename"] = ppt_filename
-            broadcast_payload["ppt_filename_norm"] = _ppt_norm
+            broadcast_payload["ppt_filename_norm"] = normalize_ppt_filename(ppt_filename)
         except Exception:
             broadcast_payload["ppt_filename"] = ppt_filename
     
@@ -229,161 +328,99 @@ def process_slide_locally(
     except Exception:
         pass
 
-    # Step 1: Generate/Retrieve Messages
-    logger.info("Preparing messages for %d languages...", len(languages))
-    message_results = {}
-
+    # Step 1: Generate messages (llm stage) for languages without pre-generated text
     def generate_for_language(lang):
-        # OPTIMIZATION: Check if we already have the text
-        if lang in pre_generated_messages:
-            existing_text = pre_generated_messages[lang]
-            if existing_text:
-                logger.info(f"[{lang}] ✅ Found pre-generated text.")
-                return (lang, existing_text, None, None)
-        
-        # Fallback to Agent Generation
         logger.info(f"[{lang}] ⚠️  No pre-generated text found. Calling Agent...")
+        result = message_generator.generate_presentation_message(lang, context, course_id=course_id)
+        generated = result[0] if isinstance(result, tuple) else result
+        if not generated:
+            logger.warning(f"[{lang}] Failed: Generation failed")
+        return generated
+
+    # Step 2: Generate MP3s (tts stage) as soon as a language's text is ready
+    def generate_mp3_for_language(lang, generated):
+        lang_data = {"text": generated}
+        if not bucket_name:
+            return lang_data
         try:
-            result = message_generator.generate_presentation_message(lang, context, course_id=course_id)
-            if isinstance(result, tuple):
-                generated, audio_url = result
-            else:
-                generated = result
-                audio_url = None
-            
-            if generated:
-                return (lang, generated, audio_url, None)
-            else:
-                return (lang, None, None, "Generation failed")
-        except Exception as e:
-            return (lang, None, None, str(e))
-
-    with ThreadPoolExecutor(max_workers=min(len(languages), 5)) as executor:
-        future_to_lang = {executor.submit(generate_for_language, lang): lang for lang in languages}
-        for future in as_completed(future_to_lang):
-            lang, generated, audio_url, error = future.result()
-            if generated:
-                message_results[lang] = {
-                    "text": generated,
-                    "audio_url": audio_url
-                }
-                # logger.info(f"[{lang}] Text ready.")
-            elif error:
-                logger.warning(f"[{lang}] Failed: {error}")
-
-    # Step 2: Generate MP3s
-    if not bucket_name:
-        logger.warning("SPEECH_FILE_BUCKET not provided - skipping audio.")
-        for lang, data in message_results.items():
-             broadcast_payload["languages"][lang] = {"text": data["text"]}
-             if lang in visual_links:
-                 broadcast_payload["languages"][lang]["slide_link"] = visual_links[lang]
-    else:
-        logger.info("Generating/checking MP3s...")
-        
-        def generate_mp3_for_language(lang, data):
-            generated = data["text"]
-            cached_audio_url = data.get("audio_url")
-            
-            if cached_audio_url:
-                logger.info(f"[{lang}] Using cached audio: {cached_audio_url}")
-                return (lang, {"text": generated, "audio_url": cached_audio_url}, None)
-            
-            lang_data = {"text": generated}
-            try:
-                norm_ctx = utils.normalize_context(context)
-                content_hash = hashlib.sha256(norm_ctx.encode("utf-8")).hexdigest()[:12]
-                filename = f"speech_{lang}_{content_hash}.mp3"
-                
-                storage_client = storage.Client(project=backend_project_id)
-                bucket = storage_client.bucket(bucket_name)
-                blob = bucket.blob(filename)
-                
-                if not blob.exists():
-                    logger.info(f"[{lang}] Generating TTS...")
-                    tts_client = texttospeech.TextToSpeechClient()
-                    voice = course_utils.get_voice_params(course_id, lang)
-                    
-                    clean_text = utils.sanitize_text_for_tts(generated)
-                    synthesis_input = texttospeech.SynthesisInput(text=clean_text)
-                    audio_config = texttospeech.AudioConfig(
-                        audio_encoding=texttospeech.AudioEncoding.MP3,
-                        speaking_rate=1.0
-                    )
-                    
-                    tts_response = tts_client.synthesize_speech(
-                        input=synthesis_input,
-                        voice=voice,
-                        audio_config=audio_config
-                    )
-                    
-                    blob.upload_from_string(
-                        tts_response.audio_content,
-                        content_type="audio/mpeg"
-                    )
-                    logger.info(f"[{lang}] Uploaded {filename}")
-                
-                speech_url = f"https://storage.googleapis.com/{bucket_name}/{filename}"
-                lang_data["audio_url"] = speech_url
-                
-                # Update cache
-                firestore_utils.cache_presentation_message(
-                    lang, generated, context, course_id=course_id, audio_url=speech_url
-                )
-                return (lang, lang_data, None)
-                
-            except Exception as tts_e:
-                logger.error(f"[{lang}] TTS Failed: {tts_e}")
-                return (lang, lang_data, str(tts_e))
-
-        if message_results:
-            with ThreadPoolExecutor(max_workers=min(len(message_results), 5)) as executor:
-                future_to_lang = {
-                    executor.submit(generate_mp3_for_language, lang, data): lang 
-                    for lang, data in message_results.items()
-                }
-                for future in as_completed(future_to_lang):
-                    lang, lang_data, error = future.result()
-                    
-                    if lang in visual_links:
-                        lang_data["slide_link"] = visual_links[lang]
-                    
-                    broadcast_payload["languages"][lang] = lang_data
-        else:
-            logger.warning("No messages generated, skipping MP3 generation.")
-
-    # Step 3: Broadcast to Client Firestore
-    if broadcast_payload.get("languages") and client_project_id:
-        logger.info(f"Broadcasting to Client Project: {client_project_id}")
-        try:
-            broadcast_db = firestore.Client(
-                project=client_project_id,
-                database="(default)"
+            # Shared content addressing: identical audio (same voice,
+            # rate, encoding and text) is synthesized once across courses.
+            # Clips already in the index resolve without synthesis, so only
+            # missing variants such as a new Opus rendition cost a TTS call.
+            bucket = get_storage_client(backend_project_id).bucket(bucket_name)
+            voice = course_utils.get_voice_params(course_id, lang)
+            clean_text = utils.sanitize_text_for_tts(generated)
+
+            variants = audio_index.ensure_audio_variants(
+                clean_text,
+                voice,
+                bucket,
+                get_tts_client(),
+                lang,
             )
-            
-            doc_id = course_id if course_id else 'current'
-            broadcast_ref = broadcast_db.collection('presentation_broadcast').document(doc_id)
-            
-            ppt_fname = broadcast_payload.get('ppt_filename_norm') or broadcast_payload.get('ppt_filename')
-
-            # Registry Update (Always happens for seeding)
-            if ppt_fname and slide_number is not None:
-                safe_ppt_id = ppt_fname.replace('/', '_').replace('\\', '_')
-
-                ppt_ref = broadcast_ref.collection('presentations').document(safe_ppt_id)
-                ppt_ref.set({"updated_at": firestore.SERVER_TIMESTAMP}, merge=True)
-
-                slide_ref = broadcast_ref.collection('presentations').document(safe_ppt_id).collection('slides').document(str(slide_number))
-                slide_ref.set(broadcast_payload, merge=True)
-                logger.info(f"Updated registry: {safe_ppt_id} / {slide_number}")
-
-            logger.info("✅ Registry population complete.")
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to broadcast: {e}")
-    else:
-        logger.warning("Skipping broadcast (no languages or no client_project_id)")
-
+            logger.info(f"[{lang}] Audio variants: {variants}")
+        except Exception as tts_e:
+            logger.error(f"[{lang}] TTS Failed: {tts_e}")
+            raise
+
+        variant_urls = {
+            fmt: audio_index.public_url(bucket_name, name)
+            for fmt, name in variants.items()
+        }
+        lang_data["audio_url"] = variant_urls.get("mp3")
+        lang_data["audio_variants"] = variant_urls
+
+        # Update cache (queued; nothing downstream waits for it)
+        cache_ref, cache_data = firestore_utils.presentation_cache_write(
+            lang, generated, context, course_id=course_id,
+            audio_url=lang_data["audio_url"], audio_variants=variant_urls,
+        )
+        get_cache_writes().set(cache_ref, cache_data, merge=True)
+        return lang_data
+
+    def link_visual(lang, visual):
+        _, blob_name = visual
+        variant_blobs, images = (visual_images or {}).get(lang, ((), None))
+        if visual_upload is not None:
+            failed = visual_upload.result() & ({blob_name} | set(variant_blobs))
+            if failed:
+                raise RuntimeError(f"Upload of {', '.join(sorted(failed))} failed")
+        fields = {"slide_link": get_storage_client().bucket(bucket_name).blob(blob_name).public_url}
+        if images:
+            fields["slide_images"] = images
+        return fields
+
+    # Step 3: Broadcast to Client Firestore (queued on the firestore stage; the slide waits for the write)
+    def write_registry(payloads):
+        # Merged into the slide document: languages not in the payload keep their data
+        broadcast_payload["languages"] = dict(payloads, **{lang: firestore.DELETE_FIELD for lang in removed_languages})
+        if not client_project_id:
+            logger.warning("Skipping broadcast (no client_project_id)")
+            return None
+        # Registry Update (Always happens for seeding)
+        if not ppt_filename or slide_number is None:
+            return None
+        slide_ref = presentation_ref(client_project_id, course_id, ppt_filename).collection('slides').document(str(slide_number))
+        return get_registry_writes(client_project_id).set(slide_ref, broadcast_payload, merge=True)
+
+    result = seed_pipeline.run_slide(
+        pools,
+        languages if process_languages is None else process_languages,
+        pre_generated_messages,
+        generate_for_language,
+        generate_mp3_for_language,
+        write_registry,
+        visuals=visual_files if bucket_name else None,
+        link=link_visual,
+        always_write=bool(removed_languages),
+    )
+    if not result.languages and not removed_languages:
+        logger.warning(f"No messages generated for slide {slide_number}, skipping broadcast.")
+    elif result.errors:
+        logger.warning(f"Slide {slide_number} incomplete (will be retried on rerun): {result.errors}")
+    elif client_project_id and ppt_filename:
+        logger.info(f"✅ Updated registry: {normalize_ppt_filename(ppt_filename)} / {slide_number}")
+    return result
 
 # --- DEFAULT DATA ---
 
@@ -415,6 +452,74 @@ DEFAULT_VOICE_CONFIGS = {
 
 # -----------------
 
+def find_visual_files(generate_dir, base_name, slide_num, languages):
+    """
+    Finds slide_{N}_reimagined.png for each language.
+    Returns {lang_code: local_path}.
+    """
+    visual_files = {}
+    # e.g. "cloudtech_en_with_visuals" -> "cloudtech"
+    base_search_name = base_name
+    image_filename = f"slide_{slide_num}_reimagined.png"
+
+    for lang_code in languages:
+        suffix = LANG_VISUAL_SUFFIX_MAP.get(lang_code, lang_code)
+        visuals_dir_candidates = [
+            os.path.join(generate_dir, f"{base_search_name}_{suffix}_visuals"),
+            os.path.join(generate_dir, f"{base_search_name}_visuals"),
+            # Try common variations
+            os.path.join(generate_dir, f"{base_search_name}_en_visuals"), 
+        ]
+
+        for v_dir in visuals_dir_candidates:
+            cand_p = os.path.join(v_dir, image_filename)
+            if os.path.exists(cand_p):
+                visual_files[lang_code] = cand_p
+                break
+    return visual_files
+
+def list_remote_visuals(bucket_name, base_name):
+    """
+    Lists a deck's uploaded visuals in one call.
+    Returns {blob_name: {"md5_hash": ..., "crc32c": ...}}.
+    """
+    prefix = f"generated_visuals/{base_name}/"
+    try:
+        return {
+            blob.name: {"md5_hash": blob.md5_hash, "crc32c": blob.crc32c}
+            for blob in get_storage_client().list_blobs(bucket_name, prefix=prefix)
+        }
+    except Exception as e:
+        logger.warning(f"Could not list {prefix} in {bucket_name}, uploading every visual: {e}")
+        return {}
+
+def print_plan(planned, manifest_path):
+    """Prints the per-deck diff against the manifest before anything is written."""
+    print(f"\nSeeding plan (manifest: {manifest_path})")
+    totals = {"new": 0, "changed": 0, "unchanged": 0, "uploads": 0}
+    decks = {}
+    for deck, slide_num, _, _, _, plan, _ in planned:
+        decks.setdefault(deck["ppt_filename"], (deck, []))[1].append((slide_num, plan))
+    for ppt_filename, (deck, slides) in decks.items():
+        counts = {"new": 0, "changed": 0, "unchanged": 0, "uploads": len(deck["uploads"])}
+        lines = []
+        for slide_num, plan in slides:
+            if plan.empty:
+                counts["unchanged"] += 1
+            elif plan.new:
+                counts["new"] += 1
+            else:
+                counts["changed"] += 1
+                lines.append(f"    slide {slide_num}: {plan.describe()}")
+        print(f"  {ppt_filename}: {counts['new']} new, {counts['changed']} changed, "
+              f"{counts['unchanged']} unchanged, {counts['uploads']} visuals to upload")
+        for line in lines:
+            print(line)
+        for name in totals:
+            totals[name] += counts[name]
+    print(f"Total: {totals['new']} new, {totals['changed']} changed, {totals['unchanged']} unchanged slides, "
+          f"{totals['uploads']} visuals to upload\n")
+
 def ensure_course_exists(course_id, course_title, languages):
     """Creates or updates the course in Firestore using admin tools."""
     logger.info(f"Ensuring course exists: {course_id} ({course_title})...")
@@ -447,6 +552,19 @@ def main():
     parser.add_argument("--course-title", default=DEFAULT_COURSE_TITLE, help=f"Course Title (default: {DEFAULT_COURSE_TITLE})")
     parser.add_argument("--data-dir", default="generate", help="Directory containing generated content (relative to script or absolute)")
     parser.add_argument("--languages", nargs="+", default=DEFAULT_LANGUAGES, help=f"List of languages (default: {' '.join(DEFAULT_LANGUAGES)})")
+    parser.add_argument("--max-in-flight", type=int, default=seed_pipeline.DEFAULT_MAX_IN_FLIGHT, help="Slides processed concurrently across all decks")
+    parser.add_argument("--llm-workers", type=int, default=seed_pipeline.DEFAULT_STAGE_WORKERS["llm"], help="Concurrent message generation calls")
+    parser.add_argument("--tts-workers", type=int, default=seed_pipeline.DEFAULT_STAGE_WORKERS["tts"], help="Concurrent TTS syntheses")
+    parser.add_argument("--upload-workers", type=int, default=seed_pipeline.DEFAULT_STAGE_WORKERS["upload"], help="Decks uploading visuals at once")
+    parser.add_argument("--upload-files", type=int, default=seed_pipeline.DEFAULT_UPLOAD_WORKERS, help="Concurrent file uploads per deck")
+    parser.add_argument("--firestore-workers", type=int, default=seed_pipeline.DEFAULT_STAGE_WORKERS["firestore"], help="Concurrent Firestore writes")
+    parser.add_argument("--checkpoint", help="Manifest path (default: <data-dir>/.seed_checkpoint_<course-id>.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and process every slide")
+    parser.add_argument("--plan-only", action="store_true", help="Print what would change and exit without writing")
+    parser.add_argument("--image-formats", nargs="*", default=list(responsive_images.DEFAULT_FORMATS), choices=sorted(responsive_images.QUALITY), help="Responsive variants of each visual (none: PNG only)")
+    parser.add_argument("--image-widths", nargs="+", type=int, default=list(responsive_images.DEFAULT_WIDTHS), help="Variant widths in pixels")
+    parser.add_argument("--image-workers", type=int, help="Conversion processes (default: CPU count)")
+    parser.add_argument("--image-cache", help="Converted variants (default: <data-dir>/.image_variants)")
     
     args = parser.parse_args()
     
@@ -471,7 +589,7 @@ def main():
     # Ensure we use backend project for initial setup
     os.environ["GOOGLE_CLOUD_PROJECT"] = backend_project_id
 
-    if not args.skip_create:
+    if not args.skip_create and not args.plan_only:
         ensure_course_exists(args.course_id, args.course_title, args.languages)
     else:
         logger.info("Skipping course creation.")
@@ -495,6 +613,8 @@ def main():
         logger.warning(f"No *_en_progress.json files found in {generate_dir}")
         return
 
+    # Load every deck up front so slides of all decks share the stage pools
+    decks = []
     for original_json_path in progress_files:
         # Determine Base Name (always from the original standard file)
         filename = os.path.basename(original_json_path)
@@ -567,87 +687,184 @@ def main():
                 else:
                     logger.info(f"No progress file found for {lang} ({original_lang_path})")
 
-        # Process slides
-        for slide in slides_structure:
+        decks.append({
+            "base_name": base_name,
+            "ppt_filename": ppt_filename,
+            "slides_structure": slides_structure,
+            "slide_notes_map": slide_notes_map,
+        })
+
+    checkpoint_path = args.checkpoint or os.path.join(generate_dir, f".seed_checkpoint_{args.course_id}.json")
+    checkpoint = seed_pipeline.Checkpoint(checkpoint_path)
+    if args.restart:
+        checkpoint.clear()
+
+    # Find every deck's visuals and convert each distinct image once (process pool)
+    file_hashes = {}
+    for deck in decks:
+        deck["visuals"] = {}
+        if not bucket_name:
+            continue
+        for slide in deck["slides_structure"]:
+            found = find_visual_files(generate_dir, deck["base_name"], slide["slide_number"], args.languages)
+            for path in found.values():
+                if path not in file_hashes:
+                    file_hashes[path] = seed_pipeline.file_md5_base64(path)
+            deck["visuals"][slide["slide_number"]] = found
+    image_variants = responsive_images.ensure_variants(
+        {base64.b64decode(md5).hex(): path for path, md5 in file_hashes.items()},
+        args.image_cache or os.path.join(generate_dir, ".image_variants"),
+        args.image_widths,
+        responsive_images.available_formats(args.image_formats) if file_hashes else [],
+        args.image_workers,
+    )
+
+    # Diff every slide against the manifest (and its visuals against the bucket)
+    planned = []
+    for deck in decks:
+        remote_visuals = list_remote_visuals(bucket_name, deck["base_name"]) if bucket_name else {}
+        # {blob_name: local_path} of this deck's missing files, one per distinct image or variant
+        deck["uploads"] = {}
+        for slide in deck["slides_structure"]:
             slide_num = slide["slide_number"]
-            context = slide["context"] # Original EN notes
-            
             # Get pre-generated messages for this slide
-            pre_gen = slide_notes_map.get(slide_num, {})
-            
-            # Prepare visual links
-            visual_links = {}
-            if bucket_name:
-                # Clean up basename for visual folder search
-                # e.g. "cloudtech_en_with_visuals" -> "cloudtech"
-                base_search_name = base_name
-                image_filename = f"slide_{slide_num}_reimagined.png"
-                
-                for lang_code in args.languages:
-                    suffix = LANG_VISUAL_SUFFIX_MAP.get(lang_code, lang_code)
-                    visuals_dir_candidates = [
-                        os.path.join(generate_dir, f"{base_search_name}_{suffix}_visuals"),
-                        os.path.join(generate_dir, f"{base_search_name}_visuals"),
-                        # Try common variations
-                        os.path.join(generate_dir, f"{base_search_name}_en_visuals"), 
-                    ]
-                    
-                    found_image = None
-                    for v_dir in visuals_dir_candidates:
-                        cand_p = os.path.join(v_dir, image_filename)
-                        if os.path.exists(cand_p):
-                            found_image = cand_p
-                            break
-                    
-                    if found_image:
-                        blob_name = f"generated_visuals/{base_search_name}/{lang_code}/{image_filename}"
-                        url = upload_to_bucket(bucket_name, found_image, blob_name)
-                        if url:
-                            visual_links[lang_code] = url
-
-            # Call logic locally
-            process_slide_locally(
+            pre_gen = deck["slide_notes_map"].get(slide_num, {})
+            visual_files, visual_images, visual_hashes = {}, {}, {}
+            stale_visuals, stale_pngs = [], []
+            for lang, path in deck["visuals"].get(slide_num, {}).items():
+                md5 = file_hashes[path]
+                blob_name = visual_blob_name(deck["base_name"], md5)
+                visual_files[lang] = (path, blob_name)
+                visual_hashes[lang] = md5
+                stale = not seed_pipeline.matches_remote(path, md5, remote_visuals.get(blob_name))
+                if stale:
+                    stale_pngs.append(lang)
+                meta = image_variants.get(base64.b64decode(md5).hex())
+                if meta:
+                    variant_blobs, images = plan_visual_images(
+                        bucket_name, deck["base_name"], base64.b64decode(md5).hex(), meta
+                    )
+                    visual_images[lang] = (sorted(variant_blobs), images)
+                    # Other variant settings change the entry, so the slide is relinked
+                    visual_hashes[lang] = f"{md5}:{meta['settings']}"
+                    missing = {name: p for name, p in variant_blobs.items() if name not in remote_visuals}
+                    deck["uploads"].update(missing)
+                    stale = stale or bool(missing)
+                if stale:
+                    stale_visuals.append(lang)
+            deck["uploads"].update(seed_pipeline.dedupe_uploads(
+                {lang: visual_files[lang] for lang in stale_pngs}
+            ))
+            key = f"{deck['ppt_filename']}/{slide_num}"
+            entry = seed_pipeline.slide_entry(slide["context"], pre_gen, args.languages, visual_hashes)
+            previous = checkpoint.done.get(key)
+            plan = seed_pipeline.plan_slide(previous, entry, stale_visuals)
+            linked = set(plan.languages) | set(plan.visuals)
+            planned.append((deck, slide_num, key, previous, entry, plan, dict(
                 slide_number=slide_num,
-                context=context,
-                ppt_filename=ppt_filename,
+                context=slide["context"],  # Original EN notes
+                ppt_filename=deck["ppt_filename"],
                 course_id=args.course_id,
                 languages=args.languages,
                 bucket_name=bucket_name,
                 backend_project_id=backend_project_id,
                 client_project_id=client_project_id,
-                visual_links=visual_links,
-                pre_generated_messages=pre_gen
+                visual_files={lang: visual_files[lang] for lang in linked if lang in visual_files},
+                visual_images={lang: visual_images[lang] for lang in linked if lang in visual_images},
+                pre_generated_messages=pre_gen,
+                process_languages=plan.languages,
+                removed_languages=plan.removed,
+            )))
+
+    print_plan(planned, checkpoint_path)
+    if args.plan_only:
+        return
+
+    workers = {
+        "llm": args.llm_workers,
+        "tts": args.tts_workers,
+        "upload": args.upload_workers,
+        "firestore": args.firestore_workers,
+    }
+    # The deck's registry document and seed event: once per deck with changes, not per slide
+    changed_slides = {}
+    for deck, _, _, _, _, plan, _ in planned:
+        if not plan.empty:
+            changed_slides[deck["ppt_filename"]] = changed_slides.get(deck["ppt_filename"], 0) + 1
+    for ppt_filename, count in changed_slides.items():
+        if client_project_id:
+            get_registry_writes(client_project_id).set(
+                presentation_ref(client_project_id, args.course_id, ppt_filename),
+                {"updated_at": firestore.SERVER_TIMESTAMP}, merge=True
             )
-            
-            logger.info("Waiting 1s...")
-            time.sleep(1)
+        course_utils.log_presentation_event(args.course_id, {
+            "type": "seed",
+            "ppt_filename": ppt_filename,
+            "slides": count,
+            "languages": args.languages,
+            "timestamp": firestore.SERVER_TIMESTAMP
+        })
+
+    with seed_pipeline.StagePools(workers) as pools:
+        # Each deck's missing visuals go up in one bulk upload, started before its slides
+        visual_uploads = {
+            deck["ppt_filename"]: pools.submit(
+                "upload", upload_visuals, bucket_name, deck["uploads"], args.upload_files
+            )
+            for deck in decks if deck["uploads"]
+        }
+
+        def work(task):
+            previous, entry, kwargs = task
+            result = process_slide_locally(
+                pools=pools, visual_upload=visual_uploads.get(kwargs["ppt_filename"]), **kwargs
+            )
+            if not result.ok:
+                # Record what did succeed; the next plan retries the rest
+                result.record = seed_pipeline.partial_entry(previous, entry, result.errors)
+            return result
+
+        summary = seed_pipeline.run_tasks(
+            ((key, entry, (previous, entry, kwargs))
+             for _, _, key, previous, entry, plan, kwargs in planned if not plan.empty),
+            work,
+            max_in_flight=args.max_in_flight,
+            checkpoint=checkpoint,
+            resume=False,
+        )
+    unchanged = sum(1 for item in planned if item[5].empty)
+    logger.info(f"Slides: {summary['done']} processed, {unchanged} unchanged, {summary['failed']} incomplete")
+    logger.info(f"Stage metrics: {pools.get_metrics()}")
+    # Send what is still queued (deck documents, cache entries) before reading the registry back
+    get_cache_writes().close()
+    logger.info(f"Cache write metrics: {get_cache_writes().get_metrics()}")
+    if client_project_id:
+        get_registry_writes(client_project_id).close()
+        logger.info(f"Registry write metrics: {get_registry_writes(client_project_id).get_metrics()}")
+
+    # The live pointer targets the last presentation
+    ppt_filename = decks[-1]["ppt_filename"] if decks else None
+    slides_structure = decks[-1]["slides_structure"] if decks else None
 
     # Final Step: Set Live Pointer to the first slide of the last processed presentation
     # to ensure the client app shows something immediately.
     if client_project_id and ppt_filename:
         logger.info(f"Setting live pointer to {ppt_filename} ...")
         try:
-            broadcast_db = firestore.Client(
-                project=client_project_id,
-                database="(default)"
-            )
+            broadcast_db = get_broadcast_db(client_project_id)
             doc_id = args.course_id
             broadcast_ref = broadcast_db.collection('presentation_broadcast').document(doc_id)
             
             # Normalize for ID (Consistency with process_slide_locally)
             safe_ppt_id = ppt_filename
             try:
-                _ppt_norm = os.path.splitext(ppt_filename.lower())[0]
-                for _s in ("_with_visuals", "_with_notes", "_visuals", "_en", "_zh-cn", "_yue-hk"):
-                    if _ppt_norm.endswith(_s):
-                        _ppt_norm = _ppt_norm[: -len(_s)]
-                safe_ppt_id = _ppt_norm.replace('/', '_').replace('\\', '_')
+                safe_ppt_id = normalize_ppt_filename(ppt_filename).replace('/', '_').replace('\\', '_')
             except:
                 safe_ppt_id = ppt_filename.replace('/', '_').replace('\\', '_')
 
             # Find first slide number
             first_slide = "0"
-            if 'slides_structure' in locals() and slides_structure:
+            if slides_structure:
                 first_slide = str(slides_structure[0]["slide_number"])
 
             logger.info(f"Targeting Slide {first_slide} of {safe_ppt_id}")
@@ -672,5 +889,8 @@ def main():
         except Exception as e:
             logger.error(f"Failed to set live pointer: {e}")
 
+    course_utils.flush_presentation_events()
+    logger.info(f"Audio metrics: {audio_index.get_metrics()}")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,563 @@
+"""Pipeline engine for seed_course_content.
+
+Seeding a course is mostly waiting on remote services, so slides are not
+processed one after another. Each kind of call gets its own bounded pool
+(``StagePools``), sized to what that service tolerates:
+
+  llm        message generation for languages without pre-generated text
+  tts        synthesis and upload of the audio variants
+  upload     bulk uploads of a deck's slide visuals
+  firestore  registry and cache writes
+
+Firestore writes are not sent one RPC at a time: ``BulkWrites`` queues
+them on a ``BulkWriter``, which batches them, throttles to what the
+database accepts and retries transient failures.
+
+``run_slide()`` is the flow of one slide: each language's audio is
+synthesized as soon as its text is ready, and the registry write follows
+once every language is done and the slide's visuals are linked. Visuals
+are uploaded per deck, deduplicated by content (``dedupe_uploads()``), so
+a slide only waits for its deck's upload, which started before it.
+``run_tasks()`` feeds slides of every deck through that flow with at most
+``max_in_flight`` slides in progress at once, so every stage stays busy
+across deck boundaries while memory stays bounded.
+
+``Checkpoint`` is the resume manifest: a slide is recorded with a digest
+of its inputs once its registry write succeeds, and a rerun skips slides
+whose digest is unchanged, so a crashed run resumes where it stopped.
+The seeder records a per-slide entry instead of a single digest (hashes
+of the notes, of each language's inputs and of each visual), and
+``plan_slide()`` diffs it against the current inputs so only the changed
+languages and assets of a slide are processed again.
+
+This module has no Google Cloud imports; the seeder passes in the calls.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+# "upload" runs whole-deck bulk uploads: decks uploading at once
+DEFAULT_STAGE_WORKERS = {"llm": 4, "tts": 8, "upload": 2, "firestore": 8}
+# Files uploaded concurrently within one deck's bulk upload
+DEFAULT_UPLOAD_WORKERS = 16
+DEFAULT_MAX_IN_FLIGHT = 16
+CHECKPOINT_VERSION = 2
+# Read size for file hashes
+HASH_CHUNK_BYTES = 1 << 20
+# Queued writes wait at most this long for their batch to be sent
+DEFAULT_FLUSH_SECONDS = 0.5
+DEFAULT_WRITE_ATTEMPTS = 5
+# gRPC codes worth retrying: DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED, ABORTED, INTERNAL, UNAVAILABLE
+RETRYABLE_WRITE_CODES = frozenset({4, 8, 10, 13, 14})
+
+
+def digest(*parts) -> str:
+    """Stable short hash of JSON-serializable inputs."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def file_md5_base64(path) -> str:
+    """MD5 of a file, base64-encoded like a GCS object's ``md5_hash``."""
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            md5.update(chunk)
+    return base64.b64encode(md5.digest()).decode("ascii")
+
+
+def file_crc32c_base64(path) -> str:
+    """CRC32C of a file, base64-encoded like a GCS object's ``crc32c``."""
+    import google_crc32c  # installed with google-cloud-storage
+
+    crc = google_crc32c.Checksum()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            crc.update(chunk)
+    return base64.b64encode(crc.digest()).decode("ascii")
+
+
+def matches_remote(path, local_md5, remote) -> bool:
+    """Whether the local file equals a remote object ({"md5_hash", "crc32c"} or None).
+
+    Composite objects have no MD5, so their CRC32C is compared instead.
+    """
+    if not remote:
+        return False
+    if remote.get("md5_hash"):
+        return remote["md5_hash"] == local_md5
+    if remote.get("crc32c"):
+        return remote["crc32c"] == file_crc32c_base64(path)
+    return False
+
+
+def dedupe_uploads(visual_files):
+    """Collapse {key: (path, blob_name)} to the distinct uploads {blob_name: path}.
+
+    Blob names are content-addressed, so the same image found in several
+    language folders (or slides) is uploaded once and linked from each.
+    """
+    uploads = {}
+    for path, blob_name in visual_files.values():
+        uploads.setdefault(blob_name, path)
+    return uploads
+
+
+class StagePools:
+    """One bounded thread pool per stage, with per-stage counters."""
+
+    def __init__(self, workers=None):
+        self.workers = dict(DEFAULT_STAGE_WORKERS, **(workers or {}))
+        self._pools = {
+            stage: ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"seed-{stage}")
+            for stage, size in self.workers.items()
+        }
+        self._lock = threading.Lock()
+        self._metrics = {stage: {"calls": 0, "errors": 0, "seconds": 0.0} for stage in self.workers}
+
+    def _timed(self, stage, fn, args, kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._metrics[stage]["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._metrics[stage]["calls"] += 1
+                self._metrics[stage]["seconds"] += time.perf_counter() - start
+
+    def submit(self, stage, fn, *args, **kwargs):
+        return self._pools[stage].submit(self._timed, stage, fn, args, kwargs)
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=True)
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {stage: dict(values) for stage, values in self._metrics.items()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+class BulkWrites:
+    """Document writes queued on Firestore ``BulkWriter``s, one Future per write.
+
+    A ``BulkWriter`` sends full batches of 20 as they fill, ramps its rate
+    up gradually (the 500/50/5 rule) and retries failed writes with
+    backoff, but it is not thread-safe and only sends a partial batch when
+    flushed. Writes from any thread are therefore serialized here, and a
+    background thread flushes ``flush_seconds`` after the first queued
+    write, so a slide waits at most that long for a partial batch.
+    ``new_writer()`` (e.g. ``db.bulk_writer``) is called once per flush
+    window because a flushed ``BulkWriter`` does not send partial batches
+    again. Transient errors are retried up to ``max_attempts`` times.
+    """
+
+    def __init__(self, new_writer, flush_seconds: float = DEFAULT_FLUSH_SECONDS,
+                 max_attempts: int = DEFAULT_WRITE_ATTEMPTS):
+        self.new_writer = new_writer
+        self.flush_seconds = flush_seconds
+        self.max_attempts = max_attempts
+        # Guards the current writer and wakes the flusher
+        self._cond = threading.Condition()
+        self._writer = None
+        self._pending = None
+        self._due = None
+        self._closed = False
+        # Guards the futures and the counters (callbacks run on writer threads)
+        self._lock = threading.Lock()
+        self._metrics = {"writes": 0, "retries": 0, "errors": 0, "flushes": 0}
+        self._flusher = threading.Thread(target=self._flush_loop, name="seed-bulk-flush", daemon=True)
+        self._flusher.start()
+
+    def _open_writer(self):
+        writer = self.new_writer()
+        # {document path: futures in write order}
+        pending = {}
+
+        def on_result(reference, result, _writer):
+            self._resolve(pending, reference.path, result=result)
+
+        def on_error(failure, _writer):
+            if failure.code in RETRYABLE_WRITE_CODES and failure.attempts < self.max_attempts:
+                with self._lock:
+                    self._metrics["retries"] += 1
+                return True
+            path = failure.operation.reference.path
+            self._resolve(pending, path, error=RuntimeError(
+                f"Write to {path} failed (code {failure.code}): {failure.message}"))
+            return False
+
+        writer.on_write_result(on_result)
+        writer.on_write_error(on_error)
+        return writer, pending
+
+    def _resolve(self, pending, path, result=None, error=None):
+        with self._lock:
+            futures = pending.get(path)
+            future = futures.popleft() if futures else None
+            if error is not None:
+                self._metrics["errors"] += 1
+        if future is None:
+            return
+        if error is not None:
+            logger.error(f"❌ {error}")
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def set(self, reference, data, merge=False) -> Future:
+        """Queue ``reference.set(data, merge=merge)``; the Future resolves once it is written."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BulkWrites is closed")
+            if self._writer is None:
+                self._writer, self._pending = self._open_writer()
+                self._due = time.monotonic() + self.flush_seconds
+                self._cond.notify()
+            with self._lock:
+                self._pending.setdefault(reference.path, deque()).append(future)
+                self._metrics["writes"] += 1
+            try:
+                # May send a full batch (and wait for the rate limit) right here
+                self._writer.set(reference, data, merge=merge)
+            except Exception as e:
+                with self._lock:
+                    self._pending[reference.path].remove(future)
+                    self._metrics["errors"] += 1
+                future.set_exception(e)
+        return future
+
+    def flush(self):
+        """Send the queued writes and wait for their results, retries included."""
+        with self._cond:
+            writer, pending = self._writer, self._pending
+            self._writer = self._pending = self._due = None
+        if writer is None:
+            return
+        error = None
+        try:
+            writer.close()
+        except Exception as e:
+            error = e
+        with self._lock:
+            self._metrics["flushes"] += 1
+            # A batch that failed as a whole reports no result for its writes
+            unresolved = [future for futures in pending.values() for future in futures]
+            pending.clear()
+            self._metrics["errors"] += len(unresolved)
+        for future in unresolved:
+            future.set_exception(error or RuntimeError("Write was not acknowledged"))
+        if unresolved:
+            logger.error(f"❌ {len(unresolved)} queued writes failed: {error}")
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._closed and (self._due is None or time.monotonic() < self._due):
+                    self._cond.wait(None if self._due is None else self._due - time.monotonic())
+                if self._closed:
+                    return
+            self.flush()
+
+    def close(self):
+        """Flush what is queued and stop; later writes raise."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._flusher.join()
+        self.flush()
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return dict(self._metrics)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Checkpoint:
+    """JSON manifest of finished tasks ({key: digest}), saved atomically.
+
+    Saves are throttled to one per ``save_seconds``; ``save()`` forces one.
+    A task lost between saves is simply redone (every stage is idempotent).
+    """
+
+    def __init__(self, path=None, save_seconds: float = 2.0, clock=time.monotonic):
+        self.path = path
+        self.save_seconds = save_seconds
+        self.clock = clock
+        self.done = {}
+        self._dirty = False
+        self._last_save = clock()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == CHECKPOINT_VERSION:
+                    self.done = data.get("done", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+
+    def is_done(self, key, key_digest) -> bool:
+        with self._lock:
+            return self.done.get(key) == key_digest
+
+    def mark_done(self, key, key_digest):
+        with self._lock:
+            self.done[key] = key_digest
+            self._dirty = True
+            due = self.clock() - self._last_save >= self.save_seconds
+        if due:
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": CHECKPOINT_VERSION, "done": dict(self.done)}
+            self._dirty = False
+            self._last_save = self.clock()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    def clear(self):
+        with self._lock:
+            self.done = {}
+            self._dirty = True
+        self.save()
+
+
+class SlideResult:
+    __slots__ = ("languages", "errors", "record")
+
+    def __init__(self, languages, errors):
+        self.languages = languages
+        self.errors = errors
+        # What to record in the checkpoint when the slide is incomplete
+        self.record = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def run_slide(pools: StagePools, languages, texts, generate, synthesize, write, visuals=None, link=None,
+              always_write=False):
+    """Run one slide through the stages; return a SlideResult.
+
+    ``texts`` holds pre-generated messages; ``generate(lang)`` is called on
+    the llm stage for the other languages and returns the text or None.
+    ``synthesize(lang, text)`` (tts stage) returns the language's payload,
+    ``link(lang, visual)`` the visual's fields to merge into it, e.g.
+    {"slide_link": url} (called on the slide's own thread, so it may wait
+    for the deck's upload), and ``write(payloads)``
+    (firestore stage) stores the slide; if it returns a Future (a queued
+    ``BulkWrites.set``), the slide waits for it on its own thread. A language
+    whose synthesis fails is still written with its text; any failure
+    leaves the slide out of the checkpoint so a rerun retries it. Visuals
+    of languages not in ``languages`` are written as their link only;
+    ``always_write`` writes even when there is no payload (e.g. to remove
+    languages).
+    """
+    errors = {}
+    texts = {lang: texts[lang] for lang in languages if texts.get(lang)}
+    generated = {pools.submit("llm", generate, lang): lang for lang in languages if lang not in texts}
+
+    speech = {lang: pools.submit("tts", synthesize, lang, text) for lang, text in texts.items()}
+    for future in as_completed(generated):
+        lang = generated[future]
+        try:
+            text = future.result()
+        except Exception as e:
+            text, errors[lang] = None, str(e)
+        if text:
+            texts[lang] = text
+            speech[lang] = pools.submit("tts", synthesize, lang, text)
+        else:
+            errors.setdefault(lang, "Generation failed")
+
+    payloads = {}
+    for lang, future in speech.items():
+        try:
+            payloads[lang] = future.result()
+        except Exception as e:
+            errors[lang] = str(e)
+            payloads[lang] = {"text": texts[lang]}
+    for lang, visual in (visuals or {}).items():
+        try:
+            fields = link(lang, visual)
+        except Exception as e:
+            errors[f"{lang}:visual"] = str(e)
+            continue
+        if lang in payloads:
+            payloads[lang].update(fields)
+        elif lang not in languages:
+            payloads[lang] = dict(fields)
+
+    if payloads or always_write:
+        try:
+            written = pools.submit("firestore", write, payloads).result()
+            if isinstance(written, Future):
+                written.result()
+        except Exception as e:
+            errors["write"] = str(e)
+    return SlideResult(payloads, errors)
+
+
+class SlidePlan:
+    """What a rerun has to do for one slide (see ``plan_slide``)."""
+
+    __slots__ = ("new", "notes_changed", "languages", "removed", "visuals")
+
+    def __init__(self, new, notes_changed, languages, removed, visuals):
+        self.new = new
+        self.notes_changed = notes_changed
+        self.languages = languages
+        self.removed = removed
+        self.visuals = visuals
+
+    @property
+    def empty(self) -> bool:
+        return not (self.languages or self.removed or self.visuals)
+
+    def describe(self) -> str:
+        if self.new:
+            parts = ["new: " + " ".join(self.languages)]
+        else:
+            parts = ["notes changed"] if self.notes_changed else []
+            if self.languages:
+                parts.append("languages: " + " ".join(self.languages))
+        if self.removed:
+            parts.append("remove: " + " ".join(self.removed))
+        if self.visuals:
+            parts.append("visuals: " + " ".join(self.visuals))
+        return "; ".join(parts)
+
+
+def slide_entry(context, texts, languages, visual_hashes) -> dict:
+    """The manifest entry of a slide's inputs.
+
+    A language's hash covers the notes and its pre-generated text, so new
+    notes regenerate every language but a corrected translation only its
+    own. ``visual_hashes`` maps languages to their visual's MD5.
+    """
+    return {
+        "notes": digest(context),
+        "languages": {lang: digest(context, texts.get(lang)) for lang in languages},
+        "visuals": dict(visual_hashes),
+    }
+
+
+def plan_slide(previous, current, stale_visuals=()) -> SlidePlan:
+    """Diff a slide's manifest entry against the recorded one.
+
+    ``stale_visuals`` are languages whose visual is missing or different in
+    the bucket; they are uploaded again even if the manifest matches.
+    """
+    if not isinstance(previous, dict):
+        previous = None
+    old = previous or {"notes": None, "languages": {}, "visuals": {}}
+    languages = [lang for lang, h in current["languages"].items() if old["languages"].get(lang) != h]
+    removed = sorted(set(old["languages"]) - set(current["languages"]))
+    visuals = sorted(
+        set(stale_visuals)
+        | {lang for lang, h in current["visuals"].items() if old["visuals"].get(lang) != h}
+    )
+    return SlidePlan(previous is None, old["notes"] != current["notes"], languages, removed, visuals)
+
+
+def partial_entry(previous, current, errors) -> dict:
+    """The entry to record for an incomplete slide: only what succeeded.
+
+    Failed languages and visuals keep their previous hashes (or none), so
+    the next plan retries exactly those. A failed write records nothing new.
+    """
+    if not isinstance(previous, dict):
+        previous = {"notes": None, "languages": {}, "visuals": {}}
+    if "write" in errors:
+        return previous
+    return {
+        "notes": current["notes"],
+        "languages": {
+            lang: (previous["languages"].get(lang) if lang in errors else h)
+            for lang, h in current["languages"].items()
+            if lang not in errors or lang in previous["languages"]
+        },
+        "visuals": {
+            lang: (previous["visuals"].get(lang) if f"{lang}:visual" in errors else h)
+            for lang, h in current["visuals"].items()
+            if f"{lang}:visual" not in errors or lang in previous["visuals"]
+        },
+    }
+
+
+def run_tasks(tasks, work, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, checkpoint: Checkpoint = None,
+              resume: bool = True):
+    """Run ``work(payload)`` for each (key, digest, payload) in ``tasks``.
+
+    At most ``max_in_flight`` tasks run at once; ``tasks`` is consumed
+    lazily. With ``resume``, tasks already in ``checkpoint`` with the same
+    digest are skipped (pass False when the tasks are already planned).
+    A task is recorded when ``work`` returns a truthy result (or a result
+    whose ``ok`` is true); a failed result may carry a ``record`` to store
+    instead. Returns {"done", "skipped", "failed"}.
+    """
+    checkpoint = checkpoint or Checkpoint()
+    summary = {"done": 0, "skipped": 0, "failed": 0}
+    slots = threading.BoundedSemaphore(max_in_flight)
+    lock = threading.Lock()
+
+    def _run(key, key_digest, payload):
+        result = None
+        try:
+            result = work(payload)
+            ok = getattr(result, "ok", bool(result))
+        except Exception as e:
+            logger.error(f"❌ {key} failed: {e}")
+            ok = False
+        finally:
+            slots.release()
+        if ok:
+            checkpoint.mark_done(key, key_digest)
+        elif getattr(result, "record", None) is not None:
+            checkpoint.mark_done(key, result.record)
+        with lock:
+            summary["done" if ok else "failed"] += 1
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="seed-slide") as executor:
+            for key, key_digest, payload in tasks:
+                if resume and checkpoint.is_done(key, key_digest):
+                    summary["skipped"] += 1
+                    continue
+                slots.acquire()
+                executor.submit(_run, key, key_digest, payload)
+    finally:
+        # Also on Ctrl-C: whatever finished is not redone
+        checkpoint.save()
+    return summary
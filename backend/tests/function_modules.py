@@ -0,0 +1,31 @@
+"""Load modules from backend/functions/<name>/ without leaking them into sys.path.
+
+Every function directory ships its own main.py, firestore_utils.py, ... so
+putting more than one of them on sys.path makes imports collide. Modules are
+loaded under a unique alias and any sibling modules they import are dropped
+from sys.modules again afterwards.
+"""
+import importlib.util
+import os
+import sys
+
+FUNCTIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../functions'))
+
+
+def load_function_module(function_name: str, module_name: str):
+    func_path = os.path.join(FUNCTIONS_DIR, function_name)
+    alias = f"{function_name.replace('-', '_')}__{module_name}"
+    before = set(sys.modules)
+    sys.path.insert(0, func_path)
+    try:
+        spec = importlib.util.spec_from_file_location(alias, os.path.join(func_path, f"{module_name}.py"))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[alias] = module
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(func_path)
+        for name in set(sys.modules) - before - {alias}:
+            mod_file = getattr(sys.modules[name], "__file__", None) or ""
+            if os.path.dirname(os.path.abspath(mod_file)) == func_path:
+                del sys.modules[name]
+    return module
@@ -0,0 +1,188 @@
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from function_modules import load_function_module
+
+api_key_registry = load_function_module("welcome", "api_key_registry")
+auth_utils = load_function_module("welcome", "auth_utils")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def fake_doc(key, data):
+    doc = MagicMock()
+    doc.id = key
+    doc.exists = data is not None
+    doc.to_dict.return_value = data
+    return doc
+
+
+def change(kind, doc):
+    return SimpleNamespace(type=SimpleNamespace(name=kind), document=doc)
+
+
+class TestApiKeyRegistry(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.collection = MagicMock()
+        self.docs = {"k1": {"digital_human_id": "dh1", "course_id": "c1", "presenter_id": "p1"}}
+        self.collection.document.side_effect = lambda key: MagicMock(
+            get=MagicMock(return_value=fake_doc(key, self.docs.get(key)))
+        )
+        self.watch = MagicMock(is_active=True)
+        self.collection.on_snapshot.return_value = self.watch
+
+    def make(self, use_listener=True):
+        return api_key_registry.ApiKeyRegistry(
+            ref_factory=lambda: self.collection,
+            ttl_seconds=60,
+            negative_ttl_seconds=30,
+            use_listener=use_listener,
+            clock=self.clock,
+        )
+
+    def test_ttl_cache_and_negative_cache_without_listener(self):
+        registry = self.make(use_listener=False)
+        for _ in range(3):
+            self.assertEqual(registry.resolve("k1")["course_id"], "c1")
+            self.assertIsNone(registry.resolve("guess"))
+        self.assertEqual(self.collection.document.call_count, 2)
+
+        self.clock.now += 31
+        registry.resolve("k1")
+        registry.resolve("guess")
+        # Only the negative entry expired
+        self.assertEqual(self.collection.document.call_count, 3)
+
+        self.clock.now += 30
+        registry.resolve("k1")
+        self.assertEqual(self.collection.document.call_count, 4)
+
+    def test_listener_holds_registry_and_applies_revocations(self):
+        registry = self.make()
+        self.assertEqual(registry.resolve("k1")["presenter_id"], "p1")
+        callback = self.collection.on_snapshot.call_args[0][0]
+        callback([fake_doc("k1", self.docs["k1"]), fake_doc("k2", {"digital_human_id": "dh2"})], [], None)
+        reads = self.collection.document.call_count
+
+        self.assertEqual(registry.resolve("k2")["digital_human_id"], "dh2")
+        self.assertIsNone(registry.resolve("guess"))
+        self.clock.now += 3600
+        self.assertIsNotNone(registry.resolve("k1"))
+        self.assertEqual(self.collection.document.call_count, reads)
+
+        callback([], [change("MODIFIED", fake_doc("k1", {"revoked": True})),
+                      change("REMOVED", fake_doc("k2", {"digital_human_id": "dh2"}))], None)
+        self.assertIsNone(registry.resolve("k1"))
+        self.assertIsNone(registry.resolve("k2"))
+        self.assertEqual(registry.get_metrics()["revocations"], 2)
+
+    def test_falls_back_to_per_key_reads_when_listener_drops(self):
+        registry = self.make()
+        registry.resolve("k1")
+        self.collection.on_snapshot.call_args[0][0]([fake_doc("k1", self.docs["k1"])], [], None)
+        self.watch.is_active = False
+        self.collection.on_snapshot.side_effect = RuntimeError("unavailable")
+        reads = self.collection.document.call_count
+        registry.resolve("new-key")
+        self.assertEqual(self.collection.document.call_count, reads + 1)
+
+    def test_new_listener_rebuilds_the_registry(self):
+        registry = self.make()
+        registry.resolve("k1")
+        old_callback = self.collection.on_snapshot.call_args[0][0]
+        old_callback([fake_doc("k1", self.docs["k1"]), fake_doc("k2", {"digital_human_id": "dh2"})], [], None)
+        self.assertIsNotNone(registry.resolve("k2"))
+
+        # The listener dies; k2 is deleted during the outage
+        self.watch.is_active = False
+        self.clock.now += 61
+        self.collection.on_snapshot.return_value = MagicMock(is_active=True)
+        registry.resolve("k1")
+        new_callback = self.collection.on_snapshot.call_args[0][0]
+        new_callback([fake_doc("k1", self.docs["k1"])], [change("ADDED", fake_doc("k1", self.docs["k1"]))], None)
+        self.assertIsNone(registry.resolve("k2"))
+
+        # Late snapshots of the replaced listener are ignored
+        old_callback([], [change("ADDED", fake_doc("k3", {"digital_human_id": "dh3"}))], None)
+        self.assertIsNone(registry.resolve("k3"))
+
+    def test_point_reads_do_not_hold_the_lock(self):
+        registry = self.make(use_listener=False)
+        registry.resolve("k1")
+        started, release = threading.Event(), threading.Event()
+
+        def slow_get(key):
+            started.set()
+            release.wait(5)
+            return fake_doc(key, None)
+
+        self.collection.document.side_effect = lambda key: MagicMock(get=lambda: slow_get(key))
+        reader = threading.Thread(target=registry.resolve, args=("unknown",))
+        reader.start()
+        self.assertTrue(started.wait(5))
+        # A cached key resolves while the miss is still waiting on Firestore
+        self.assertEqual(registry.resolve("k1")["course_id"], "c1")
+        release.set()
+        reader.join(5)
+
+    def test_cache_is_bounded(self):
+        registry = self.make(use_listener=False)
+        registry.max_entries = 2
+        for key in ("a", "b", "c"):
+            registry.resolve(key)
+        self.assertEqual(registry.get_metrics()["entries"], 2)
+
+    def test_listener_registry_is_not_evicted(self):
+        registry = self.make()
+        registry.max_entries = 2
+        registry.resolve("k1")
+        keys = [f"key{i}" for i in range(5)]
+        callback = self.collection.on_snapshot.call_args[0][0]
+        callback([fake_doc(key, {"digital_human_id": key}) for key in keys], [], None)
+        callback([], [change("ADDED", fake_doc("key5", {"digital_human_id": "key5"}))], None)
+        reads = self.collection.document.call_count
+        for key in keys + ["key5"]:
+            self.assertEqual(registry.resolve(key)["digital_human_id"], key)
+        self.assertEqual(self.collection.document.call_count, reads)
+
+
+class TestAuthWithRegistry(unittest.TestCase):
+    def make_request(self, key):
+        import hashlib
+
+        body = '{"languageCode": "en"}'
+        params = {"bodyString": body, "secretKey": "secret", "timestamp": "1"}
+        sign = hashlib.sha512("&".join(f"{k}={v}" for k, v in sorted(params.items())).encode()).hexdigest().upper()
+        request = MagicMock()
+        request.headers = {"X-Timestamp": "1", "X-Sign": sign, "X-Key": key}
+        request.data = body.encode()
+        return request
+
+    def test_registered_keys_authenticate_and_carry_context(self):
+        context = {"course_id": "c1", "presenter_id": "p1"}
+        env = {"XIAOICE_CHAT_ACCESS_KEY": "shared", "XIAOICE_CHAT_SECRET_KEY": "secret"}
+        with patch.dict("os.environ", env), \
+                patch.object(auth_utils.api_key_registry, "resolve",
+                             side_effect=lambda key: context if key == "k1" else None) as resolve:
+            self.assertIsNone(auth_utils.validate_authentication(self.make_request("shared")))
+            resolve.assert_not_called()
+            self.assertEqual(auth_utils.get_key_context(self.make_request("shared")), {})
+
+            self.assertIsNone(auth_utils.validate_authentication(self.make_request("k1")))
+            self.assertEqual(auth_utils.get_key_context(self.make_request("k1")), context)
+
+            _, status = auth_utils.validate_authentication(self.make_request("revoked"))
+            self.assertEqual(status, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
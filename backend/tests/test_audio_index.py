@@ -0,0 +1,199 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from function_modules import load_function_module
+
+audio_index = load_function_module("speech", "audio_index")
+
+
+def fake_doc(data):
+    doc = MagicMock()
+    doc.exists = data is not None
+    doc.to_dict.return_value = data
+    return doc
+
+
+class TestAudioIndex(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.doc_ref = self.db.collection.return_value.document.return_value
+        self.index = audio_index.AudioIndex(db=self.db, max_entries=2)
+
+    def test_key_depends_on_voice_and_text(self):
+        a = audio_index.audio_key("en-US-Neural2-F", "Hello")
+        self.assertEqual(a, audio_index.audio_key("en-US-Neural2-F", "Hello"))
+        self.assertNotEqual(a, audio_index.audio_key("en-US-Neural2-C", "Hello"))
+        self.assertNotEqual(a, audio_index.audio_key("en-US-Neural2-F", "Hello."))
+
+    def test_lookup_falls_back_to_firestore_then_serves_from_memory(self):
+        self.doc_ref.get.return_value = fake_doc({"object_name": "speech_en_abc.mp3"})
+        self.assertEqual(self.index.lookup("k1"), "speech_en_abc.mp3")
+        self.assertEqual(self.index.lookup("k1"), "speech_en_abc.mp3")
+        self.assertEqual(self.doc_ref.get.call_count, 1)
+
+    def test_miss_is_not_cached(self):
+        self.doc_ref.get.return_value = fake_doc(None)
+        self.assertIsNone(self.index.lookup("k1"))
+        self.assertIsNone(self.index.lookup("k1"))
+        self.assertEqual(self.doc_ref.get.call_count, 2)
+
+    def test_lru_is_bounded(self):
+        for key in ("a", "b", "c"):
+            self.index.record(key, f"{key}.mp3")
+        self.assertIsNone(self.index.cached("a"))
+        self.assertEqual(self.index.cached("c"), "c.mp3")
+
+    def test_bootstrap_reads_key_metadata(self):
+        tagged = MagicMock(metadata={"audio_key": "k1"})
+        tagged.name = "speech_en_k1.mp3"
+        legacy = MagicMock(metadata=None)
+        legacy.name = "speech_en_old.mp3"
+        bucket = MagicMock()
+        bucket.list_blobs.return_value = [tagged, legacy]
+
+        self.assertEqual(self.index.bootstrap_from_bucket(bucket), (1, 1))
+        self.assertEqual(self.index.cached("k1"), "speech_en_k1.mp3")
+        self.db.batch.return_value.commit.assert_called_once()
+
+
+class TestEnsureAudio(unittest.TestCase):
+    def setUp(self):
+        self.index = audio_index.AudioIndex(db=MagicMock())
+        self.index.db.collection.return_value.document.return_value.get.return_value = fake_doc(None)
+        self.bucket = MagicMock()
+        self.tts = MagicMock()
+        self.tts.synthesize_speech.return_value.audio_content = b"mp3"
+        self.voice = MagicMock()
+        self.voice.name = "en-US-Neural2-F"
+
+    def test_miss_synthesizes_uploads_and_indexes(self):
+        name, created = audio_index.ensure_audio("Hello", self.voice, self.bucket, self.tts, "en-US", index=self.index)
+        self.assertTrue(created)
+        self.assertTrue(name.startswith("speech_en-US_") and name.endswith(".mp3"))
+        blob = self.bucket.blob.return_value
+        blob.upload_from_string.assert_called_once()
+        key = audio_index.audio_key("en-US-Neural2-F", "Hello")
+        self.assertEqual(blob.metadata, {"audio_key": key})
+        self.assertEqual(self.index.cached(key), name)
+
+    def test_hit_costs_no_tts_or_gcs_calls(self):
+        first, _ = audio_index.ensure_audio("Hello", self.voice, self.bucket, self.tts, "en-US", index=self.index)
+        self.bucket.reset_mock()
+        self.tts.reset_mock()
+        second, created = audio_index.ensure_audio("Hello", self.voice, self.bucket, self.tts, "en", index=self.index)
+        self.assertFalse(created)
+        self.assertEqual(first, second)
+        self.tts.synthesize_speech.assert_not_called()
+        self.bucket.blob.assert_not_called()
+
+    def test_rate_and_encoding_are_part_of_the_address(self):
+        base = audio_index.audio_key("v", "t")
+        self.assertNotEqual(base, audio_index.audio_key("v", "t", speaking_rate=1.25))
+        self.assertNotEqual(base, audio_index.audio_key("v", "t", encoding="OGG_OPUS"))
+        self.assertTrue(audio_index.object_name_for("en", base, "OGG_OPUS").endswith(".ogg"))
+
+    def test_sample_rate_changes_address_only_when_set(self):
+        base = audio_index.audio_key("v", "t", encoding="OGG_OPUS")
+        self.assertEqual(base, audio_index.audio_key("v", "t", encoding="OGG_OPUS", sample_rate_hertz=None))
+        self.assertNotEqual(base, audio_index.audio_key("v", "t", encoding="OGG_OPUS", sample_rate_hertz=16000))
+
+    def test_variants_are_indexed_separately(self):
+        variants = audio_index.ensure_audio_variants(
+            "Hello", self.voice, self.bucket, self.tts, "en-US", formats=["mp3", "opus"], index=self.index
+        )
+        self.assertEqual(set(variants), {"mp3", "opus"})
+        self.assertTrue(variants["mp3"].endswith(".mp3"))
+        self.assertTrue(variants["opus"].endswith(".ogg"))
+        self.assertEqual(self.tts.synthesize_speech.call_count, 2)
+
+        # The MP3 shares its address with plain ensure_audio
+        name, created = audio_index.ensure_audio("Hello", self.voice, self.bucket, self.tts, "en-US", index=self.index)
+        self.assertFalse(created)
+        self.assertEqual(name, variants["mp3"])
+
+    def test_on_audio_sees_bytes_before_upload_and_only_when_synthesized(self):
+        seen = []
+        upload = self.bucket.blob.return_value.upload_from_string
+        upload.side_effect = lambda *a, **k: seen.append("upload")
+
+        name, _ = audio_index.ensure_audio(
+            "Hello", self.voice, self.bucket, self.tts, "en-US", index=self.index,
+            on_audio=lambda content, object_name: seen.append((content, object_name)),
+        )
+        self.assertEqual(seen, [(b"mp3", name), "upload"])
+
+        audio_index.ensure_audio(
+            "Hello", self.voice, self.bucket, self.tts, "en-US", index=self.index,
+            on_audio=lambda *args: seen.append(args),
+        )
+        self.assertEqual(len(seen), 2)
+
+
+class PreconditionFailed(Exception):
+    code = 412
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.index = audio_index.AudioIndex(db=MagicMock())
+        self.index.db.collection.return_value.document.return_value.get.return_value = fake_doc(None)
+        self.bucket = MagicMock()
+        self.voice = MagicMock()
+        self.voice.name = "en-US-Neural2-F"
+
+    def test_concurrent_misses_synthesize_once(self):
+        calls = []
+
+        def slow_synthesize(input, voice, audio_config):
+            calls.append(1)
+            time.sleep(0.1)
+            return MagicMock(audio_content=b"mp3")
+
+        tts = MagicMock()
+        tts.synthesize_speech.side_effect = slow_synthesize
+        before = audio_index.get_metrics()
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                audio_index.ensure_audio("Same text", self.voice, self.bucket, tts, "en-US", index=self.index)
+            ))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({name for name, _ in results}), 1)
+        self.assertEqual(sum(created for _, created in results), 1)
+        after = audio_index.get_metrics()
+        self.assertEqual(after["deduplicated_in_process"] - before["deduplicated_in_process"], 4)
+        _, kwargs = self.bucket.blob.return_value.upload_from_string.call_args
+        self.assertEqual(kwargs["if_generation_match"], 0)
+
+    def test_losing_the_upload_race_reuses_the_object(self):
+        tts = MagicMock()
+        tts.synthesize_speech.return_value.audio_content = b"mp3"
+        self.bucket.blob.return_value.upload_from_string.side_effect = PreconditionFailed("exists")
+        before = audio_index.get_metrics()
+
+        name, created = audio_index.ensure_audio("Raced", self.voice, self.bucket, tts, "en-US", index=self.index)
+
+        self.assertFalse(created)
+        self.assertEqual(self.index.cached(audio_index.audio_key("en-US-Neural2-F", "Raced")), name)
+        after = audio_index.get_metrics()
+        self.assertEqual(after["deduplicated_across_instances"] - before["deduplicated_across_instances"], 1)
+
+    def test_leader_failure_propagates_and_clears(self):
+        tts = MagicMock()
+        tts.synthesize_speech.side_effect = RuntimeError("quota")
+        with self.assertRaises(RuntimeError):
+            audio_index.ensure_audio("Boom", self.voice, self.bucket, tts, "en-US", index=self.index)
+        tts.synthesize_speech.side_effect = None
+        tts.synthesize_speech.return_value.audio_content = b"mp3"
+        _, created = audio_index.ensure_audio("Boom", self.voice, self.bucket, tts, "en-US", index=self.index)
+        self.assertTrue(created)
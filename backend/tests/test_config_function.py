@@ -3,6 +3,8 @@ import os
 import unittest
 from unittest.mock import MagicMock, patch
 import json
+import threading
+import time
 
 # 1. Mock functions_framework before importing main
 mock_ff = MagicMock()
@@ -82,9 +84,9 @@ class TestConfigFunction(unittest.TestCase):
         }
         self.assertEqual(config_data['presentation_messages'], expected_messages)
 
-    @patch('main.get_cached_presentation_message')
+    @patch('main.get_cached_presentation_entry')
     @patch('main.firestore.Client')
-    def test_fallback_to_context(self, mock_firestore_client, mock_get_cached_presentation_message):
+    def test_fallback_to_context(self, mock_firestore_client, mock_get_cached_presentation_entry):
         # Setup
         request_json = {
             "presentation_messages": {},
@@ -93,7 +95,7 @@ class TestConfigFunction(unittest.TestCase):
         }
         self.mock_request.get_json.return_value = request_json
 
-        mock_get_cached_presentation_message.return_value = (None, None)
+        mock_get_cached_presentation_entry.return_value = None
 
         mock_db = MagicMock()
         mock_firestore_client.return_value = mock_db
@@ -135,3 +137,30 @@ class TestConfigFunction(unittest.TestCase):
         config_data = args[0]
         # Should stay as provided
         self.assertEqual(config_data['presentation_messages'], latest_languages)
+
+    @patch('main.firestore.Client')
+    def test_slow_presynthesis_does_not_delay_the_response(self, mock_firestore_client):
+        import main
+
+        self.mock_request.get_json.return_value = {
+            "courseId": "c1",
+            "ppt_filename": "lecture.pptx",
+            "page_number": 3,
+            "latest_languages": {"en-US": {"text": "Slide three"}},
+        }
+        started, release = threading.Event(), threading.Event()
+
+        def slow_presynthesis(config_data, course_id=None):
+            started.set()
+            release.wait(5)
+            return 0
+
+        with patch.object(main, "_presynthesize_clips", slow_presynthesis):
+            start = time.monotonic()
+            response = config(self.mock_request)
+            self.assertLess(time.monotonic() - start, 1)
+            self.assertEqual(response[1], 200)
+            # The clip synthesis is still running in the background
+            self.assertTrue(started.wait(5))
+            self.assertFalse(release.is_set())
+            release.set()
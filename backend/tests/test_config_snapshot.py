@@ -0,0 +1,112 @@
+import datetime
+import unittest
+from unittest.mock import MagicMock
+
+from function_modules import load_function_module
+
+config_snapshot = load_function_module("welcome", "config_snapshot")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def fake_doc(data, update_time=None):
+    doc = MagicMock()
+    doc.exists = data is not None
+    doc.to_dict.return_value = data
+    doc.update_time = update_time
+    return doc
+
+
+class TestConfigSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.ref = MagicMock()
+        self.ref.get.return_value = fake_doc({"welcome_messages": {"en": "v1"}})
+        self.watch = MagicMock(is_active=True)
+        self.ref.on_snapshot.return_value = self.watch
+
+    def make(self, use_listener=True):
+        return config_snapshot.ConfigSnapshot(
+            lambda: {"default": True},
+            ref_factory=lambda: self.ref,
+            ttl_seconds=10,
+            max_staleness_seconds=300,
+            use_listener=use_listener,
+            clock=self.clock,
+        )
+
+    def test_requests_are_served_from_memory(self):
+        snapshot = self.make()
+        for _ in range(5):
+            self.assertEqual(snapshot.get()["welcome_messages"]["en"], "v1")
+            self.clock.now += 5
+        self.assertEqual(self.ref.get.call_count, 1)
+        self.ref.on_snapshot.assert_called_once()
+
+    def test_listener_event_replaces_data_and_records_lag(self):
+        snapshot = self.make()
+        snapshot.get()
+        callback = self.ref.on_snapshot.call_args[0][0]
+        written = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=2)
+        callback([fake_doc({"welcome_messages": {"en": "v2"}}, written)], [], None)
+
+        self.assertEqual(snapshot.get()["welcome_messages"]["en"], "v2")
+        metrics = snapshot.get_metrics()
+        self.assertEqual(metrics["listener_events"], 1)
+        self.assertGreaterEqual(metrics["listener_lag_ms_last"], 2000)
+        self.assertEqual(self.ref.get.call_count, 1)
+
+    def test_staleness_bound_forces_a_read_even_with_listener(self):
+        snapshot = self.make()
+        snapshot.get()
+        self.clock.now += 301
+        snapshot.get()
+        self.assertEqual(self.ref.get.call_count, 2)
+
+    def test_polls_on_ttl_when_listener_is_down(self):
+        self.watch.is_active = False
+        snapshot = self.make()
+        snapshot.get()
+        self.clock.now += 5
+        snapshot.get()
+        self.assertEqual(self.ref.get.call_count, 1)
+        self.clock.now += 6
+        snapshot.get()
+        self.assertEqual(self.ref.get.call_count, 2)
+        self.assertGreaterEqual(snapshot.get_metrics()["listener_restarts"], 1)
+
+    def test_failed_refresh_keeps_serving_last_snapshot(self):
+        snapshot = self.make(use_listener=False)
+        snapshot.get()
+        self.ref.get.side_effect = RuntimeError("unavailable")
+        self.clock.now += 11
+        self.assertEqual(snapshot.get()["welcome_messages"]["en"], "v1")
+        # No retry storm: the next attempt waits another TTL
+        snapshot.get()
+        self.assertEqual(self.ref.get.call_count, 2)
+
+    def test_missing_document_uses_default(self):
+        self.ref.get.return_value = fake_doc(None)
+        self.assertEqual(self.make(use_listener=False).get(), {"default": True})
+
+    def test_version_follows_update_time_and_falls_back_to_content_hash(self):
+        snapshot = self.make()
+        _, unversioned = snapshot.get_versioned()
+        self.assertTrue(unversioned.startswith("sha256:"))
+
+        callback = self.ref.on_snapshot.call_args[0][0]
+        written = datetime.datetime(2026, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+        callback([fake_doc({"welcome_messages": {"en": "v2"}}, written)], [], None)
+        data, version = snapshot.get_versioned()
+        self.assertEqual(data["welcome_messages"]["en"], "v2")
+        self.assertEqual(version, written.isoformat())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import datetime
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from function_modules import load_function_module
+
+course_utils = load_function_module("config", "course_utils")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+V1 = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+V2 = datetime.datetime(2026, 1, 2, tzinfo=datetime.timezone.utc)
+
+# Stand-in for google.cloud.texttospeech (other tests mock the google package)
+FAKE_TTS = SimpleNamespace(
+    SsmlVoiceGender=SimpleNamespace(FEMALE="FEMALE", MALE="MALE"),
+    VoiceSelectionParams=lambda **fields: SimpleNamespace(**{"name": None, **fields}),
+)
+
+
+class TestCourseConfigCache(unittest.TestCase):
+    def setUp(self):
+        p = patch.object(course_utils, "_texttospeech", return_value=FAKE_TTS)
+        p.start()
+        self.addCleanup(p.stop)
+        self.clock = FakeClock()
+        self.db = MagicMock()
+        self.doc = MagicMock(exists=True, update_time=V1)
+        self.doc.to_dict.return_value = {
+            "languages": ["en-US", "zh-CN", "fr-FR"],
+            "voice_configs": {"en-US": {"name": "en-US-Custom-A", "gender": "MALE"}},
+        }
+        self.db.collection.return_value.document.return_value.get.return_value = self.doc
+        self.cache = course_utils.CourseConfigCache(db_factory=lambda: self.db, ttl_seconds=60, clock=self.clock)
+
+    def reads(self):
+        return self.db.collection.return_value.document.return_value.get.call_count
+
+    def test_one_read_and_one_voice_table_per_course(self):
+        for _ in range(50):
+            for lang in ("en-US", "zh-CN", "yue-HK"):
+                self.cache.get_voice_params("c1", lang)
+        self.assertEqual(self.reads(), 1)
+        self.assertEqual(self.cache.get_metrics()["voice_tables"], 1)
+
+        en = self.cache.get_voice_params("c1", "en-US")
+        self.assertEqual((en.name, en.ssml_gender), ("en-US-Custom-A", "MALE"))
+        # The zh-CN default voice is a cmn-CN voice
+        zh = self.cache.get_voice_params("c1", "zh-CN")
+        self.assertEqual((zh.language_code, zh.name), ("cmn-CN", "cmn-CN-Chirp3-HD-Achernar"))
+        self.assertIs(zh, self.cache.get_voice_params("c1", "zh-CN"))
+        self.assertEqual(self.cache.get_voice_params("c1", "fr-FR").language_code, "fr-FR")
+
+    def test_expiry_keeps_voice_table_while_version_is_unchanged(self):
+        voice = self.cache.get_voice_params("c1", "en-US")
+        self.clock.now += 61
+        self.assertIs(self.cache.get_voice_params("c1", "en-US"), voice)
+        self.assertEqual(self.reads(), 2)
+
+        self.doc.update_time = V2
+        self.doc.to_dict.return_value = {"voice_configs": {"en-US": {"name": "en-US-Custom-B"}}}
+        self.clock.now += 61
+        self.assertEqual(self.cache.get_voice_params("c1", "en-US").name, "en-US-Custom-B")
+
+    def test_invalidate_forces_a_read(self):
+        self.cache.get_config("c1")
+        self.cache.invalidate("c1")
+        self.cache.get_config("c1")
+        self.assertEqual(self.reads(), 2)
+
+    def test_read_error_serves_last_config(self):
+        self.assertIn("languages", self.cache.get_config("c1"))
+        self.db.collection.return_value.document.return_value.get.side_effect = RuntimeError("down")
+        self.clock.now += 61
+        self.assertIn("languages", self.cache.get_config("c1"))
+
+    def test_cache_is_bounded(self):
+        cache = course_utils.CourseConfigCache(db_factory=lambda: self.db, ttl_seconds=60,
+                                               clock=self.clock, max_entries=2)
+        for course_id in ("c1", "c2", "c1", "c3"):
+            cache.get_config(course_id)
+        self.assertEqual(list(cache._entries), ["c1", "c3"])
+        self.assertEqual(set(cache._locks), {"c1", "c3"})
+        self.assertEqual(cache.get_metrics()["courses"], 2)
+        cache.get_config("c2")
+        self.assertEqual(self.reads(), 4)
+
+    def test_no_course_uses_defaults_without_reads(self):
+        self.assertEqual(self.cache.get_voice_params(None, "yue-HK").name, "yue-HK-Standard-A")
+        self.assertEqual(self.reads(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from function_modules import load_function_module
+
+dialog_main = load_function_module("dialog", "main")
+
+
+def make_request(path):
+    request = MagicMock()
+    request.path = path
+    return request
+
+
+class TestDialogRouting(unittest.TestCase):
+    def test_routes_on_last_path_segment(self):
+        for path, route in [("/welcome", "welcome"), ("/api/speech", "speech"), ("/recquestions/", "recquestions")]:
+            handler = MagicMock(return_value="ok")
+            with self.subTest(path=path), patch.dict(dialog_main.ROUTES, {route: handler}):
+                request = make_request(path)
+                self.assertEqual(dialog_main.dialog(request), "ok")
+                handler.assert_called_once_with(request)
+
+    def test_unknown_route_is_404(self):
+        body, status, _ = dialog_main.dialog(make_request("/api/talk"))
+        self.assertEqual(status, 404)
+        self.assertEqual(json.loads(body)["error"], "Not found")
+
+    def test_per_function_entry_points_are_exported(self):
+        for name in ("welcome", "goodbye", "recquestions", "speech"):
+            self.assertTrue(callable(getattr(dialog_main, name)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+from unittest.mock import MagicMock
+
+from function_modules import load_function_module
+
+event_log = load_function_module("config", "event_log")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeDb:
+    """Records committed batches as lists of (course_id, event)."""
+
+    def __init__(self):
+        self.commits = []
+        self.fail = False
+        # Document IDs the client refuses, as Firestore does for "a/b"
+        self.invalid_ids = set()
+
+    def collection(self, name):
+        db = self
+
+        class Ref:
+            def __init__(self, path):
+                self.path = path
+
+            def document(self, doc_id=None):
+                if doc_id in db.invalid_ids:
+                    raise ValueError(f"invalid document id {doc_id!r}")
+                return Ref(self.path + [doc_id])
+
+            def collection(self, sub):
+                return Ref(self.path + [sub])
+
+        return Ref([name])
+
+    def batch(self):
+        writes = []
+        batch = MagicMock()
+        batch.set.side_effect = lambda ref, data: writes.append((ref.path[1], data))
+
+        def commit():
+            if self.fail:
+                raise RuntimeError("deadline exceeded")
+            self.commits.append(writes)
+
+        batch.commit.side_effect = commit
+        return batch
+
+
+class TestEventLogger(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeDb()
+        self.clock = FakeClock()
+
+    def make(self, **kwargs):
+        kwargs.setdefault("batch_size", 3)
+        kwargs.setdefault("max_buffer", 10)
+        return event_log.EventLogger(lambda: self.db, flush_seconds=2, clock=self.clock,
+                                     background=False, **kwargs)
+
+    def test_events_are_batched_per_course_in_order(self):
+        logger = self.make()
+        for i in range(4):
+            logger.log("c1", {"type": "slide_change", "page_number": i})
+        logger.log("c2", {"type": "slide_change", "page_number": 0})
+        self.assertEqual(self.db.commits, [])
+
+        self.assertEqual(logger.flush(), 5)
+        sizes = sorted(len(batch) for batch in self.db.commits)
+        self.assertEqual(sizes, [1, 1, 3])
+        c1 = [event for batch in self.db.commits for course, event in batch if course == "c1"]
+        self.assertEqual([e["page_number"] for e in c1], [0, 1, 2, 3])
+        self.assertEqual([e["client_seq"] for e in c1], sorted(e["client_seq"] for e in c1))
+        self.assertTrue(all("client_timestamp" in e for e in c1))
+
+    def test_full_buffer_drops_instead_of_blocking(self):
+        logger = self.make()
+        results = [logger.log("c1", {"n": i}) for i in range(12)]
+        self.assertEqual(results.count(False), 2)
+        self.assertEqual(logger.get_metrics()["dropped"], 2)
+        self.assertEqual(logger.get_metrics()["buffered"], 10)
+
+    def test_failed_flush_requeues_and_counts(self):
+        logger = self.make()
+        for i in range(4):
+            logger.log("c1", {"n": i})
+        self.db.fail = True
+        self.assertEqual(logger.flush(), 0)
+        metrics = logger.get_metrics()
+        self.assertEqual((metrics["flush_errors"], metrics["buffered"]), (1, 4))
+
+        self.db.fail = False
+        self.assertEqual(logger.flush(), 4)
+        self.assertEqual(logger.get_metrics()["written"], 4)
+
+    def test_invalid_course_ids_are_dropped_without_losing_other_courses(self):
+        logger = self.make()
+        self.assertFalse(logger.log("a/b", {"n": 0}))
+        self.assertFalse(logger.log("", {"n": 0}))
+        self.db.invalid_ids.add("bad")
+        logger.log("bad", {"n": 1})
+        logger.log("good", {"n": 2})
+        self.assertEqual(logger.flush(), 1)
+        metrics = logger.get_metrics()
+        self.assertEqual((metrics["invalid"], metrics["flush_errors"], metrics["buffered"]), (3, 0, 0))
+        self.assertEqual([course for batch in self.db.commits for course, _ in batch], ["good"])
+
+    def test_close_flushes_and_rejects_new_events(self):
+        logger = self.make()
+        logger.log("c1", {"n": 1})
+        logger.close()
+        self.assertEqual(logger.get_metrics()["written"], 1)
+        self.assertFalse(logger.log("c1", {"n": 2}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from function_modules import load_function_module
+
+http_cache = load_function_module("recquestions", "http_cache")
+recquestions_main = load_function_module("recquestions", "main")
+goodbye_main = load_function_module("goodbye", "main")
+
+CONFIG = {
+    "recommended_questions": {"en": ["Q1", "Q2"], "zh": ["问题"]},
+    "goodbye_messages": {"en": "Bye now"},
+}
+
+
+def make_request(body, if_none_match=None):
+    request = MagicMock()
+    request.get_json.return_value = body
+    request.headers = {"If-None-Match": if_none_match} if if_none_match else {}
+    return request
+
+
+class TestEtagMatching(unittest.TestCase):
+    def test_matches_listed_weak_and_wildcard_tags(self):
+        etag = http_cache.make_etag("v1", "recquestions", "en")
+        self.assertTrue(http_cache.etag_matches(make_request({}, etag), etag))
+        self.assertTrue(http_cache.etag_matches(make_request({}, f'"other", W/{etag}'), etag))
+        self.assertTrue(http_cache.etag_matches(make_request({}, "*"), etag))
+        self.assertFalse(http_cache.etag_matches(make_request({}, '"other"'), etag))
+        self.assertFalse(http_cache.etag_matches(make_request({}), etag))
+
+    def test_etag_changes_with_config_version_and_inputs(self):
+        etag = http_cache.make_etag("v1", "recquestions", "en")
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+        self.assertEqual(etag, http_cache.make_etag("v1", "recquestions", "en"))
+        self.assertNotEqual(etag, http_cache.make_etag("v2", "recquestions", "en"))
+        self.assertNotEqual(etag, http_cache.make_etag("v1", "recquestions", "zh"))
+
+
+class TestConditionalReads(unittest.TestCase):
+    def setUp(self):
+        self.version = "v1"
+        for module in (recquestions_main, goodbye_main):
+            for p in (
+                patch.object(module, "validate_authentication", return_value=None),
+                patch.object(module, "get_versioned_config", side_effect=lambda: (CONFIG, self.version)),
+            ):
+                p.start()
+                self.addCleanup(p.stop)
+
+    def test_recquestions_revalidates_until_config_changes(self):
+        body, status, headers = recquestions_main.recquestions(make_request({"languageCode": "en"}))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["data"], ["Q1", "Q2"])
+        self.assertEqual(headers["Cache-Control"], http_cache.CACHE_CONTROL)
+        etag = headers["ETag"]
+
+        body, status, headers = recquestions_main.recquestions(make_request({"languageCode": "en"}, etag))
+        self.assertEqual((body, status, headers["ETag"]), ("", 304, etag))
+
+        # Another language is other content
+        _, status, _ = recquestions_main.recquestions(make_request({"languageCode": "zh"}, etag))
+        self.assertEqual(status, 200)
+
+        self.version = "v2"
+        _, status, headers = recquestions_main.recquestions(make_request({"languageCode": "en"}, etag))
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers["ETag"], etag)
+
+    def test_goodbye_etag_covers_the_voice_clip(self):
+        request = {"languageCode": "en", "courseId": "c1"}
+        with patch.object(goodbye_main.voice_clips, "get_voice_url", return_value=None):
+            body, status, headers = goodbye_main.goodbye(make_request(request))
+        # The voice lookup failed: no validator, the next poll retries it
+        self.assertEqual(status, 200)
+        self.assertNotIn("voiceUrl", json.loads(body))
+        self.assertNotIn("ETag", headers)
+
+        with patch.object(goodbye_main.voice_clips, "get_voice_url", return_value="https://x/a.mp3"):
+            body, status, headers = goodbye_main.goodbye(make_request(request))
+            self.assertEqual(json.loads(body)["voiceUrl"], "https://x/a.mp3")
+            etag = headers["ETag"]
+            _, status, _ = goodbye_main.goodbye(make_request(request, etag))
+            self.assertEqual(status, 304)
+        with patch.object(goodbye_main.voice_clips, "get_voice_url", return_value="https://x/b.mp3"):
+            _, status, _ = goodbye_main.goodbye(make_request(request, etag))
+        self.assertEqual(status, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+"""Heavy clients and the ADK agent stay out of the import path of each function.
+
+Each deployable's main module is imported in a fresh interpreter (as the
+functions framework does at cold start) and must not have loaded any of
+the modules listed for it. Timing regressions are tracked separately by
+benchmarks/profile_cold_start.py.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from function_modules import FUNCTIONS_DIR
+
+TTS_AND_STORAGE = ["google.cloud.texttospeech", "google.cloud.storage"]
+
+LAZY_MODULES = {
+    ("config", "message_generator"): ["google.adk", "google.genai"],
+    ("talk-stream", "main"): ["google.adk", "google.genai"],
+    ("speech", "main"): TTS_AND_STORAGE,
+    ("welcome", "main"): TTS_AND_STORAGE,
+    ("goodbye", "main"): TTS_AND_STORAGE,
+    ("dialog", "main"): TTS_AND_STORAGE,
+    ("config", "course_utils"): TTS_AND_STORAGE + ["google.cloud.firestore"],
+    ("welcome", "firestore_utils"): ["google.cloud.firestore"],
+}
+
+SNIPPET = "import sys, {module}; print(','.join(m for m in {lazy!r} if m in sys.modules))"
+
+
+@pytest.mark.parametrize("function_name,module", sorted(LAZY_MODULES))
+def test_import_does_not_load_heavy_modules(function_name, module):
+    lazy = LAZY_MODULES[(function_name, module)]
+    env = dict(os.environ, CONFIG_LISTENER="0", GOOGLE_CLOUD_PROJECT="test", LOG_LEVEL="ERROR")
+    result = subprocess.run(
+        [sys.executable, "-c", SNIPPET.format(module=module, lazy=lazy)],
+        cwd=os.path.join(FUNCTIONS_DIR, function_name),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        pytest.skip(f"{function_name}/{module} not importable here: {result.stderr.strip()[-200:]}")
+    loaded = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+    assert loaded == "", f"{function_name}/{module} imported {loaded} at module load"
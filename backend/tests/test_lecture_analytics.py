@@ -0,0 +1,118 @@
+import copy
+import datetime
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from admin_tools import lecture_analytics
+
+T0 = datetime.datetime(2026, 3, 2, 9, 0, tzinfo=datetime.timezone.utc)
+
+
+def slide(seconds, page, presentation="lecture1", languages=("en-US", "zh-CN")):
+    return {
+        "type": "slide_change",
+        "presentation_id": presentation,
+        "page_number": page,
+        "languages": list(languages),
+        "client_timestamp": T0 + datetime.timedelta(seconds=seconds),
+    }
+
+
+class TestCourseRollup(unittest.TestCase):
+    def test_dwell_changes_and_language_usage(self):
+        rollup = lecture_analytics.CourseRollup(max_dwell_seconds=600)
+        events = [slide(0, 1), slide(60, 2), slide(90, 2), slide(150, 3, languages=["en-US"]),
+                  {"type": "slide_change", "context_snippet": "seeded"}, slide(4000, 1)]
+        for i, event in enumerate(events):
+            rollup.apply(f"e{i}", event)
+
+        slides = rollup.presentations["lecture1"]["slides"]
+        self.assertEqual(slides["1"], {"dwell_seconds": 60.0, "changes": 2})
+        # The re-broadcast at 90s is not a change but extends the dwell
+        self.assertEqual(slides["2"], {"dwell_seconds": 90.0, "changes": 1})
+        # The gap after slide 3 exceeds max dwell: the lecture had ended
+        self.assertEqual(slides["3"]["dwell_seconds"], 0.0)
+        self.assertEqual(rollup.summary["slide_changes"], 4)
+        self.assertEqual(rollup.summary["skipped_events"], 1)
+        self.assertEqual(rollup.summary["languages"], {"en-US": 5, "zh-CN": 4})
+        self.assertEqual(rollup.summary["open_slide"]["page"], "1")
+
+    def test_open_slide_is_closed_by_the_next_run(self):
+        first = lecture_analytics.CourseRollup()
+        first.apply("e0", slide(0, 1))
+        second = lecture_analytics.CourseRollup(first.summary, first.presentations)
+        second.apply("e1", slide(45, 2))
+        self.assertEqual(second.presentations["lecture1"]["slides"]["1"]["dwell_seconds"], 45.0)
+
+
+class TestUpdateCourse(unittest.TestCase):
+    def test_only_events_past_the_watermark_are_processed(self):
+        db = MagicMock()
+        summary_ref = db.collection.return_value.document.return_value.collection.return_value.document.return_value
+        summary_ref.get.return_value.exists = False
+        writes = []
+        db.batch.return_value.set.side_effect = lambda ref, data: writes.append(data)
+        log = [(f"e{i}", slide(i * 30, i)) for i in range(5)]
+        calls = []
+
+        def fetch(db, course_id, watermark, watermark_ids, settle_before):
+            calls.append((watermark, list(watermark_ids)))
+            return [(i, e) for i, e in log
+                    if e["client_timestamp"] < settle_before
+                    and (watermark is None or e["client_timestamp"] > watermark
+                         or (e["client_timestamp"] == watermark and i not in watermark_ids))]
+
+        now = T0 + datetime.timedelta(seconds=200)
+        self.assertEqual(lecture_analytics.update_course(db, "c1", settle_seconds=60, now=now, fetch=fetch), 5)
+        summary = writes[-1]
+        self.assertEqual(summary["watermark_ids"], ["e4"])
+
+        # Next run starts from the stored watermark
+        summary_ref.get.return_value.exists = True
+        summary_ref.get.return_value.to_dict.return_value = summary
+        summary_ref.collection.return_value.stream.return_value = []
+        log.append(("e5", slide(150, 5)))
+        self.assertEqual(lecture_analytics.update_course(db, "c1", settle_seconds=60, now=now, fetch=fetch), 0)
+        later = now + datetime.timedelta(seconds=60)
+        self.assertEqual(lecture_analytics.update_course(db, "c1", settle_seconds=60, now=later, fetch=fetch), 1)
+        self.assertEqual(calls[-1][0], slide(120, 4)["client_timestamp"])
+
+
+    @patch.object(lecture_analytics, "BATCH_SIZE", 2)
+    def test_partial_save_is_not_counted_twice(self):
+        events = [(f"e{i}", slide(i * 30, 1, presentation=f"p{i}")) for i in range(4)]
+        clean = lecture_analytics.CourseRollup()
+        for event_id, event in events:
+            clean.apply(event_id, event)
+
+        # Writes go p0, p1 | p2, p3 | summary; the second batch fails
+        db = MagicMock()
+        saved, pending = {}, []
+        db.batch.return_value.set.side_effect = lambda ref, data: pending.append(copy.deepcopy(data))
+
+        def commit():
+            if db.batch.return_value.commit.call_count > 1:
+                raise RuntimeError("deadline exceeded")
+            saved.update((data["presentation_id"], data) for data in pending)
+            pending.clear()
+
+        db.batch.return_value.commit.side_effect = commit
+        with self.assertRaises(RuntimeError):
+            lecture_analytics.save_rollup(db, "c1", clean)
+        self.assertEqual(sorted(saved), ["p0", "p1"])
+
+        # The re-run starts from the old (empty) summary with p0 and p1 saved
+        rerun = lecture_analytics.CourseRollup(presentations=saved)
+        for event_id, event in events:
+            rerun.apply(event_id, event)
+        for pid in ("p0", "p1", "p2"):
+            for field in ("slide_changes", "dwell_seconds", "slides"):
+                self.assertEqual(rerun.presentations[pid][field], clean.presentations[pid][field])
+        self.assertEqual(rerun.summary["slide_changes"], 4)
+        self.assertEqual(rerun.summary["dwell_seconds"], 90.0)
+
+if __name__ == "__main__":
+    unittest.main()
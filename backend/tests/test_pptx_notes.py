@@ -0,0 +1,100 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import zipfile
+
+PRELOADER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../presentation-preloader'))
+SEEDS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../seeds'))
+sys.path.append(PRELOADER_DIR)
+import pptx_notes
+
+from function_modules import load_function_module
+
+normalize_context = load_function_module("config", "firestore_utils")._normalize_context
+
+NS = (
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+)
+RELS_NS = 'xmlns="http://schemas.openxmlformats.org/package/2006/relationships"'
+REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+
+
+def shape(placeholder, paragraphs):
+    ph = f'<p:ph type="{placeholder}"/>' if placeholder else ''
+    body = "".join(f"<a:p>{p}</a:p>" for p in paragraphs)
+    return (f'<p:sp><p:nvSpPr><p:cNvPr id="2" name="s"/><p:cNvSpPr/><p:nvPr>{ph}</p:nvPr></p:nvSpPr>'
+            f'<p:spPr/><p:txBody><a:bodyPr/>{body}</p:txBody></p:sp>')
+
+
+def build_deck(path, notes_by_slide):
+    """A minimal package: slides listed in reverse file order, notes parts as given (None: no notes)."""
+    count = len(notes_by_slide)
+    with zipfile.ZipFile(path, "w") as package:
+        ids = "".join(f'<p:sldId id="{256 + i}" r:id="rId{i}"/>' for i in reversed(range(1, count + 1)))
+        package.writestr("ppt/presentation.xml", f'<p:presentation {NS}><p:sldIdLst>{ids}</p:sldIdLst></p:presentation>')
+        rels = "".join(f'<Relationship Id="rId{i}" Type="{REL}slide" Target="slides/slide{i}.xml"/>'
+                       for i in range(1, count + 1))
+        package.writestr("ppt/_rels/presentation.xml.rels", f'<Relationships {RELS_NS}>{rels}</Relationships>')
+        for i, shapes in enumerate(notes_by_slide, start=1):
+            package.writestr(f"ppt/slides/slide{i}.xml", f'<p:sld {NS}/>')
+            if shapes is None:
+                continue
+            package.writestr(f"ppt/slides/_rels/slide{i}.xml.rels", (
+                f'<Relationships {RELS_NS}><Relationship Id="rId2" Type="{REL}notesSlide" '
+                f'Target="../notesSlides/notesSlide{i}.xml"/></Relationships>'))
+            package.writestr(f"ppt/notesSlides/notesSlide{i}.xml",
+                             f'<p:notes {NS}><p:cSld><p:spTree>{"".join(shapes)}</p:spTree></p:cSld></p:notes>')
+
+
+class TestPptxNotes(unittest.TestCase):
+    def test_body_placeholder_in_presentation_order(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "deck.pptx")
+            build_deck(path, [
+                [shape("sldImg", []), shape("body", ["<a:r><a:t>First </a:t></a:r><a:r><a:t>line</a:t></a:r>",
+                                                      "<a:r><a:t>second</a:t></a:r><a:br/><a:r><a:t>third</a:t></a:r>"]),
+                 shape("sldNum", ['<a:fld type="slidenum"><a:t>1</a:t></a:fld>'])],
+                None,
+                # No body text: every shape's text, as the VBA fallback does
+                [shape("body", []), shape(None, ["<a:r><a:t>Text box</a:t></a:r>"]),
+                 shape("sldNum", ['<a:fld type="slidenum"><a:t>3</a:t></a:fld>'])],
+            ])
+            notes = list(pptx_notes.iter_notes(path))
+        # sldIdLst lists slide3 first
+        self.assertEqual(notes, [(1, "Text box\r\n3"), (2, ""), (3, "First line\rsecond\vthird")])
+        self.assertEqual(normalize_context(notes[2][1]), "First line second third")
+
+    def test_read_notes_part_streams_a_file_object(self):
+        part = f'<p:notes {NS}><p:cSld><p:spTree>{shape("body", ["<a:r><a:t>  Hello   world </a:t></a:r>"])}</p:spTree></p:cSld></p:notes>'
+        text = pptx_notes.read_notes_part(io.BytesIO(part.encode("utf-8")))
+        self.assertEqual(normalize_context(text), "Hello world")
+
+    def test_seed_decks_have_notes_on_every_slide(self):
+        notes = list(pptx_notes.iter_notes(os.path.join(SEEDS_DIR, "cloudtech.pptm")))
+        self.assertEqual([number for number, _ in notes], list(range(1, 10)))
+        self.assertEqual(normalize_context(notes[0][1]), "Let’s start learning Cloud Technologies")
+
+    def test_dry_run_lists_each_distinct_notes_text_once(self):
+        deck = os.path.join(SEEDS_DIR, "cloudtech.pptm")
+        copy = os.path.join(SEEDS_DIR, "generate", "cloudtech_en_with_notes.pptm")
+        result = subprocess.run(
+            [sys.executable, os.path.join(PRELOADER_DIR, "main.py"), "--pptx", deck, copy,
+             "--languages", "en-US,zh-CN", "--dry-run"],
+            capture_output=True, text=True, check=True,
+        )
+        lines = [line for line in result.stdout.splitlines() if " chars -> " in line]
+        # The copy repeats some of the deck's notes
+        self.assertEqual(len([line for line in lines if line.startswith("cloudtech.pptm ")]), 9)
+        self.assertLess(len(lines), 18)
+        self.assertFalse(any(line.startswith("cloudtech_en_with_notes.pptm slide 1:") for line in lines))
+        self.assertIn("cloudtech.pptm slide 1: 39 chars -> v1:en-us:", lines[0])
+        self.assertIn(", v1:zh-cn:", lines[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import MagicMock
+
+from function_modules import load_function_module
+
+presenter_directory = load_function_module("welcome", "presenter_directory")
+
+
+def fake_doc(doc_id, data):
+    doc = MagicMock()
+    doc.id = doc_id
+    doc.to_dict.return_value = data
+    return doc
+
+
+class FakeClock:
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPresenterDirectory(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.ref = MagicMock()
+        self.ref.stream.side_effect = lambda: iter([fake_doc("summer", {"language": "zh-CN"})])
+        self.watch = MagicMock(is_active=True)
+        self.ref.on_snapshot.return_value = self.watch
+
+    def make(self):
+        return presenter_directory.PresenterDirectory(
+            ref_factory=lambda: self.ref, ttl_seconds=300, clock=self.clock
+        )
+
+    def test_lookups_including_unknown_ids_cost_one_load(self):
+        directory = self.make()
+        self.assertEqual(directory.get("summer"), {"language": "zh-CN"})
+        for _ in range(10):
+            self.assertIsNone(directory.get("bogus"))
+        self.assertEqual(self.ref.stream.call_count, 1)
+        self.assertEqual(directory.get_metrics()["misses"], 10)
+
+    def test_listener_replaces_the_index(self):
+        directory = self.make()
+        directory.preload()
+        callback = self.ref.on_snapshot.call_args[0][0]
+        callback([fake_doc("winter", {"language": "en-US"})], [], None)
+        self.assertIsNone(directory.get("summer"))
+        self.assertEqual(directory.get("winter"), {"language": "en-US"})
+
+    def test_reloads_on_ttl_without_listener(self):
+        self.watch.is_active = False
+        directory = self.make()
+        directory.get("summer")
+        self.clock.now = 299
+        directory.get("summer")
+        self.assertEqual(self.ref.stream.call_count, 1)
+        self.clock.now = 301
+        directory.get("summer")
+        self.assertEqual(self.ref.stream.call_count, 2)
+        # The dead listener is retried once per TTL, not on every lookup
+        self.assertEqual(self.ref.on_snapshot.call_count, 2)
+
+
+    def test_failed_load_falls_back_to_reads_and_retries_soon(self):
+        self.ref.stream.side_effect = RuntimeError("down")
+        self.ref.document.return_value.get.return_value = MagicMock(
+            exists=True, to_dict=MagicMock(return_value={"language": "zh-CN"}))
+        directory = self.make()
+        self.assertEqual(directory.get("summer"), {"language": "zh-CN"})
+        self.assertEqual(directory.get_metrics()["fallback_reads"], 1)
+
+        self.ref.stream.side_effect = lambda: iter([fake_doc("summer", {"language": "en-US"})])
+        directory.get("summer")
+        self.assertEqual(self.ref.stream.call_count, 1)
+        self.clock.now = 11
+        self.assertEqual(directory.get("summer"), {"language": "en-US"})
+        self.assertEqual(self.ref.stream.call_count, 2)
+
+    def test_failed_reload_keeps_the_previous_index(self):
+        self.watch.is_active = False
+        directory = self.make()
+        directory.get("summer")
+        self.ref.stream.side_effect = RuntimeError("down")
+        self.clock.now = 301
+        self.assertEqual(directory.get("summer"), {"language": "zh-CN"})
+        self.clock.now = 312
+        directory.get("summer")
+        self.assertEqual(self.ref.stream.call_count, 3)
+        self.assertEqual(directory.get_metrics()["fallback_reads"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
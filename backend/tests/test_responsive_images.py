@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../seeds')))
+import responsive_images
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class TestVariantWidths(unittest.TestCase):
+    def test_images_are_never_upscaled(self):
+        self.assertEqual(responsive_images.variant_widths(1376, (480, 960, 1440)), [480, 960, 1376])
+        self.assertEqual(responsive_images.variant_widths(400, (480, 960)), [400])
+
+    def test_srcset_lists_widths_in_order(self):
+        meta = {
+            "width": 1376, "height": 768, "placeholder": "data:image/webp;base64,AA==",
+            "variants": {"webp": {"960": "960w.webp", "480": "480w.webp"}},
+        }
+        images = responsive_images.slide_images(meta, lambda name: f"https://bucket/abc/{name}")
+        self.assertEqual(images["srcset"], {
+            "webp": "https://bucket/abc/480w.webp 480w, https://bucket/abc/960w.webp 960w",
+        })
+        self.assertEqual((images["width"], images["height"]), (1376, 768))
+
+
+@unittest.skipIf(Image is None, "Pillow is not installed")
+class TestConvert(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "slide_1_reimagined.png")
+        Image.new("RGB", (1200, 675), (30, 90, 160)).save(self.source)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_variants_placeholder_and_cache(self):
+        cache_dir = os.path.join(self.tmp.name, "variants")
+        metas = responsive_images.ensure_variants({"abc": self.source}, cache_dir, (480, 1440), ("webp",),
+                                                  max_workers=1)
+        meta = metas["abc"]
+        self.assertEqual(meta["variants"], {"webp": {"480": "480w.webp", "1200": "1200w.webp"}})
+        with Image.open(os.path.join(meta["dir"], "480w.webp")) as variant:
+            self.assertEqual(variant.size, (480, 270))
+        self.assertTrue(meta["placeholder"].startswith("data:image/webp;base64,"))
+        self.assertLess(len(meta["placeholder"]), 1000)
+
+        report = responsive_images.bytes_report(metas)
+        self.assertEqual(report["images"], 1)
+        self.assertEqual(report["webp"]["all"], sum(meta["bytes"].values()))
+
+        # Cached: nothing is converted again, other settings rebuild
+        self.assertIsNotNone(responsive_images.load_meta(meta["dir"], (480, 1440), ("webp",)))
+        self.assertIsNone(responsive_images.load_meta(meta["dir"], (480, 960), ("webp",)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,271 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../seeds')))
+import seed_pipeline
+
+
+class TestRunSlide(unittest.TestCase):
+    def setUp(self):
+        self.pools = seed_pipeline.StagePools({"llm": 2, "tts": 2, "upload": 2, "firestore": 1})
+        self.written = []
+
+    def tearDown(self):
+        self.pools.shutdown()
+
+    def run_slide(self, texts, generate=None, synthesize=None, visuals=None, link=None):
+        return seed_pipeline.run_slide(
+            self.pools, ["en-US", "zh-CN", "yue-HK"], texts,
+            generate or (lambda lang: f"generated {lang}"),
+            synthesize or (lambda lang, text: {"text": text, "audio_url": f"{lang}.mp3"}),
+            self.written.append,
+            visuals=visuals,
+            link=link or (lambda lang, path: {"slide_link": f"https://bucket/{path}"}),
+        )
+
+    def test_generates_only_missing_languages_and_links_visuals(self):
+        generated = []
+
+        def generate(lang):
+            generated.append(lang)
+            return f"generated {lang}"
+
+        result = self.run_slide({"en-US": "hello", "zh-CN": "你好"}, generate=generate,
+                                visuals={"en-US": "en/slide_1.png"})
+        self.assertTrue(result.ok)
+        self.assertEqual(generated, ["yue-HK"])
+        self.assertEqual(result.languages["yue-HK"]["text"], "generated yue-HK")
+        self.assertEqual(result.languages["en-US"]["slide_link"], "https://bucket/en/slide_1.png")
+        self.assertEqual(self.written, [result.languages])
+        metrics = self.pools.get_metrics()
+        self.assertEqual(metrics["tts"]["calls"], 3)
+        self.assertEqual(metrics["firestore"]["calls"], 1)
+
+    def test_failed_synthesis_keeps_text_but_marks_slide_incomplete(self):
+        def synthesize(lang, text):
+            if lang == "zh-CN":
+                raise RuntimeError("quota")
+            return {"text": text}
+
+        result = self.run_slide({"en-US": "a", "zh-CN": "b", "yue-HK": "c"}, synthesize=synthesize)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.languages["zh-CN"], {"text": "b"})
+        self.assertIn("zh-CN", result.errors)
+        self.assertEqual(len(self.written), 1)
+
+    def test_failed_visual_is_reported_per_language(self):
+        def link(lang, path):
+            raise RuntimeError("upload failed")
+
+        result = self.run_slide({"en-US": "a", "zh-CN": "b", "yue-HK": "c"},
+                                visuals={"zh-CN": "zh/slide_1.png"}, link=link)
+        self.assertEqual(list(result.errors), ["zh-CN:visual"])
+        self.assertNotIn("slide_link", result.languages["zh-CN"])
+
+    def test_identical_visuals_are_uploaded_once(self):
+        uploads = seed_pipeline.dedupe_uploads({
+            "en-US": ("en/slide_1.png", "visuals/abc.png"),
+            "zh-CN": ("zh/slide_1.png", "visuals/abc.png"),
+            "yue-HK": ("yue/slide_1.png", "visuals/def.png"),
+        })
+        self.assertEqual(uploads, {"visuals/abc.png": "en/slide_1.png", "visuals/def.png": "yue/slide_1.png"})
+
+    def test_nothing_is_written_without_any_text(self):
+        result = self.run_slide({}, generate=lambda lang: None)
+        self.assertFalse(result.ok)
+        self.assertEqual(self.written, [])
+
+
+class TestRunTasks(unittest.TestCase):
+    def test_concurrency_is_bounded(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def work(payload):
+            with lock:
+                running.append(payload)
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(payload)
+            return True
+
+        tasks = ((f"slide/{i}", "d", i) for i in range(20))
+        summary = seed_pipeline.run_tasks(tasks, work, max_in_flight=3)
+        self.assertEqual(summary, {"done": 20, "skipped": 0, "failed": 0})
+        self.assertLessEqual(max(peak), 3)
+
+    def test_rerun_resumes_from_checkpoint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "checkpoint.json")
+            tasks = [(f"slide/{i}", f"digest-{i}", i) for i in range(6)]
+
+            # First run: slide 4 fails
+            summary = seed_pipeline.run_tasks(tasks, lambda i: i != 4, max_in_flight=2,
+                                              checkpoint=seed_pipeline.Checkpoint(path))
+            self.assertEqual(summary, {"done": 5, "skipped": 0, "failed": 1})
+
+            processed = []
+            tasks[2] = ("slide/2", "digest-2-changed", 2)
+            summary = seed_pipeline.run_tasks(tasks, lambda i: processed.append(i) or True,
+                                              checkpoint=seed_pipeline.Checkpoint(path))
+            self.assertEqual(sorted(processed), [2, 4])
+            self.assertEqual(summary, {"done": 2, "skipped": 4, "failed": 0})
+
+    def test_unreadable_checkpoint_starts_over(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "checkpoint.json")
+            with open(path, "w") as f:
+                f.write("{not json")
+            self.assertEqual(seed_pipeline.Checkpoint(path).done, {})
+
+
+class FakeBulkWriter:
+    """Sends everything on close(); ``codes`` lists the status of each attempt per document path."""
+
+    def __init__(self, codes=None, fail_batch=False):
+        self.codes = {path: list(statuses) for path, statuses in (codes or {}).items()}
+        self.fail_batch = fail_batch
+        self.operations = []
+        self.written = {}
+
+    def on_write_result(self, callback):
+        self._on_result = callback
+
+    def on_write_error(self, callback):
+        self._on_error = callback
+
+    def set(self, reference, data, merge=False):
+        self.operations.append([reference, data, 0])
+
+    def close(self):
+        if self.fail_batch:
+            raise RuntimeError("commit failed")
+        queue = list(self.operations)
+        while queue:
+            operation = queue.pop(0)
+            reference, data, attempts = operation
+            statuses = self.codes.get(reference.path)
+            code = statuses.pop(0) if statuses else 0
+            if code == 0:
+                self.written[reference.path] = data
+                self._on_result(reference, "write result", self)
+                continue
+            failure = SimpleNamespace(code=code, message="error", attempts=attempts,
+                                      operation=SimpleNamespace(reference=reference))
+            if self._on_error(failure, self):
+                operation[2] += 1
+                queue.append(operation)
+
+
+class TestBulkWrites(unittest.TestCase):
+    def writes(self, flush_seconds=60, **writer_options):
+        self.writers = []
+
+        def new_writer():
+            self.writers.append(FakeBulkWriter(**writer_options))
+            return self.writers[-1]
+
+        return seed_pipeline.BulkWrites(new_writer, flush_seconds=flush_seconds, max_attempts=3)
+
+    def test_transient_errors_are_retried_and_others_fail_their_write(self):
+        # 14 is UNAVAILABLE (retried), 3 is INVALID_ARGUMENT
+        with self.writes(codes={"a/1": [14, 14], "a/2": [3], "a/3": [14] * 4}) as writes:
+            futures = [writes.set(SimpleNamespace(path=f"a/{i}"), {"n": i}, merge=True) for i in range(4)]
+            writes.flush()
+            self.assertEqual(futures[0].result(), "write result")
+            self.assertEqual(futures[1].result(), "write result")
+            self.assertRaises(RuntimeError, futures[2].result)
+            # Out of attempts
+            self.assertRaises(RuntimeError, futures[3].result)
+            self.assertEqual(sorted(self.writers[0].written), ["a/0", "a/1"])
+            self.assertEqual(writes.get_metrics(), {"writes": 4, "retries": 5, "errors": 2, "flushes": 1})
+
+            # A flushed writer does not send partial batches again: the next write gets a new one
+            future = writes.set(SimpleNamespace(path="a/4"), {})
+            writes.flush()
+            self.assertEqual(future.result(timeout=0), "write result")
+            self.assertEqual(len(self.writers), 2)
+
+    def test_partial_batch_is_flushed_in_the_background(self):
+        with self.writes(flush_seconds=0.01) as writes:
+            future = writes.set(SimpleNamespace(path="a/1"), {})
+            self.assertEqual(future.result(timeout=5), "write result")
+
+    def test_failed_batch_fails_its_writes_and_the_slide(self):
+        pools = seed_pipeline.StagePools({"llm": 1, "tts": 1, "upload": 1, "firestore": 1})
+        with pools, self.writes(flush_seconds=0.01, fail_batch=True) as writes:
+            result = seed_pipeline.run_slide(
+                pools, ["en-US"], {"en-US": "hello"}, None, lambda lang, text: {"text": text},
+                lambda payloads: writes.set(SimpleNamespace(path="slides/1"), payloads, merge=True),
+            )
+        self.assertIn("commit failed", result.errors["write"])
+        self.assertEqual(writes.get_metrics()["errors"], 1)
+
+
+class TestPlan(unittest.TestCase):
+    LANGUAGES = ["en-US", "zh-CN"]
+
+    def entry(self, context="notes", texts=None, visuals=None, languages=None):
+        return seed_pipeline.slide_entry(context, texts or {"zh-CN": "你好"}, languages or self.LANGUAGES,
+                                         visuals or {"en-US": "md5-a"})
+
+    def test_unchanged_slide_has_empty_plan(self):
+        plan = seed_pipeline.plan_slide(self.entry(), self.entry())
+        self.assertTrue(plan.empty)
+
+    def test_new_slide_processes_everything(self):
+        plan = seed_pipeline.plan_slide(None, self.entry())
+        self.assertTrue(plan.new)
+        self.assertEqual(plan.languages, self.LANGUAGES)
+        self.assertEqual(plan.visuals, ["en-US"])
+
+    def test_translation_change_touches_only_its_language(self):
+        plan = seed_pipeline.plan_slide(self.entry(), self.entry(texts={"zh-CN": "您好"}))
+        self.assertEqual(plan.languages, ["zh-CN"])
+        self.assertFalse(plan.notes_changed)
+        self.assertEqual(plan.visuals, [])
+
+    def test_notes_change_touches_every_language(self):
+        plan = seed_pipeline.plan_slide(self.entry(), self.entry(context="new notes"))
+        self.assertTrue(plan.notes_changed)
+        self.assertEqual(plan.languages, self.LANGUAGES)
+
+    def test_language_set_and_visual_changes(self):
+        current = self.entry(languages=["en-US", "fr-FR"], visuals={"en-US": "md5-b"})
+        plan = seed_pipeline.plan_slide(self.entry(), current, stale_visuals=["fr-FR"])
+        self.assertEqual(plan.languages, ["fr-FR"])
+        self.assertEqual(plan.removed, ["zh-CN"])
+        self.assertEqual(plan.visuals, ["en-US", "fr-FR"])
+        self.assertIn("remove: zh-CN", plan.describe())
+
+    def test_partial_entry_retries_only_failures(self):
+        previous = self.entry()
+        current = self.entry(context="new notes", visuals={"en-US": "md5-b"})
+        record = seed_pipeline.partial_entry(previous, current, {"zh-CN": "quota", "en-US:visual": "403"})
+        plan = seed_pipeline.plan_slide(record, current)
+        self.assertEqual(plan.languages, ["zh-CN"])
+        self.assertEqual(plan.visuals, ["en-US"])
+        self.assertEqual(seed_pipeline.partial_entry(previous, current, {"write": "unavailable"}), previous)
+
+    def test_local_file_matches_remote_md5(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "slide_1_reimagined.png")
+            with open(path, "wb") as f:
+                f.write(b"png bytes")
+            md5 = seed_pipeline.file_md5_base64(path)
+            # GCS reports base64 of the raw digest
+            self.assertEqual(md5, "hHvuBc4iHuIFFvSFgeRDEw==")
+            self.assertTrue(seed_pipeline.matches_remote(path, md5, {"md5_hash": md5, "crc32c": None}))
+            self.assertFalse(seed_pipeline.matches_remote(path, md5, {"md5_hash": "other", "crc32c": None}))
+            self.assertFalse(seed_pipeline.matches_remote(path, md5, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
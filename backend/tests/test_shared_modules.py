@@ -0,0 +1,49 @@
+import filecmp
+import os
+import unittest
+
+FUNCTIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../functions'))
+
+# Each Cloud Function is deployed from its own directory, so shared modules
+# are copied into every function that needs them. The copies must not drift.
+SHARED_MODULES = {
+    "api_key_registry.py": ["goodbye", "recquestions", "speech", "talk-stream", "welcome", "dialog"],
+    "auth_utils.py": ["goodbye", "recquestions", "speech", "talk-stream", "welcome", "dialog"],
+    "audio_index.py": ["config", "speech", "welcome", "goodbye", "dialog"],
+    "config_snapshot.py": ["speech", "goodbye", "recquestions", "talk-stream", "welcome", "dialog"],
+    "course_utils.py": ["config", "speech", "welcome", "goodbye", "dialog"],
+    "event_log.py": ["config", "speech", "welcome", "goodbye", "dialog"],
+    "firestore_utils.py": ["welcome", "dialog"],
+    "http_cache.py": ["recquestions", "welcome", "goodbye", "dialog"],
+    "presenter_directory.py": ["welcome", "dialog"],
+    "tts_synth.py": ["config", "speech", "welcome", "goodbye", "dialog"],
+    "usage_counters.py": ["speech", "config", "talk-stream", "dialog"],
+    "utils.py": ["config", "speech", "welcome", "goodbye", "dialog"],
+    "voice_clips.py": ["config", "speech", "welcome", "goodbye", "dialog"],
+}
+
+# The consolidated dialog service ships the per-function handlers as copies
+DIALOG_HANDLERS = ["welcome", "goodbye", "recquestions", "speech"]
+
+
+class TestSharedModules(unittest.TestCase):
+    def test_copies_are_identical(self):
+        for module, functions in SHARED_MODULES.items():
+            reference = os.path.join(FUNCTIONS_DIR, functions[0], module)
+            for function_name in functions[1:]:
+                copy = os.path.join(FUNCTIONS_DIR, function_name, module)
+                with self.subTest(module=module, function=function_name):
+                    self.assertTrue(
+                        filecmp.cmp(reference, copy, shallow=False),
+                        f"{copy} differs from {reference}",
+                    )
+
+    def test_dialog_handlers_match_functions(self):
+        for function_name in DIALOG_HANDLERS:
+            reference = os.path.join(FUNCTIONS_DIR, function_name, "main.py")
+            copy = os.path.join(FUNCTIONS_DIR, "dialog", f"{function_name}_main.py")
+            with self.subTest(function=function_name):
+                self.assertTrue(
+                    filecmp.cmp(reference, copy, shallow=False),
+                    f"{copy} differs from {reference}",
+                )
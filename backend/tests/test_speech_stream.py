@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from function_modules import load_function_module
+
+speech_main = load_function_module("speech", "main")
+
+
+def make_request(body, headers=None):
+    request = MagicMock()
+    request.get_json.return_value = body
+    request.headers = headers or {}
+    return request
+
+
+class TestSpeechStream(unittest.TestCase):
+    def setUp(self):
+        self.bucket = MagicMock()
+        self.tts = MagicMock()
+        self.tts.synthesize_speech.return_value.audio_content = b"fresh-audio"
+        voice = MagicMock()
+        voice.name = "en-US-Neural2-F"
+        self.index = speech_main.audio_index.AudioIndex(db=MagicMock())
+        self.index.db.collection.return_value.document.return_value.get.return_value.exists = False
+
+        storage_client = MagicMock()
+        storage_client.bucket.return_value = self.bucket
+        patches = [
+            patch.object(speech_main, "validate_authentication", return_value=None),
+            patch.object(speech_main, "get_config", return_value={"welcome_messages": {"en": "Hi there"}}),
+            patch.object(speech_main.course_utils, "get_voice_params", return_value=voice),
+            patch.object(speech_main, "_get_storage_client", return_value=storage_client),
+            patch.object(speech_main, "_get_tts_client", return_value=self.tts),
+            patch.object(speech_main.audio_index, "get_index", return_value=self.index),
+            patch.dict("os.environ", {"SPEECH_FILE_BUCKET": "speech-bucket"}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_fresh_clip_streams_bytes_and_uploads_behind_them(self):
+        upload_started = threading.Event()
+        release_upload = threading.Event()
+
+        def slow_upload(*args, **kwargs):
+            upload_started.set()
+            release_upload.wait(5)
+
+        self.bucket.blob.return_value.upload_from_string.side_effect = slow_upload
+
+        response = speech_main.speech(make_request({"responseMode": "stream", "languageCode": "en"}))
+
+        # Headers and bytes are ready while the upload is still blocked
+        self.assertEqual(response.mimetype, "audio/mpeg")
+        self.assertIn("speech-bucket", response.headers["X-Voice-Url"])
+        body = iter(response.response)
+        self.assertEqual(next(body), b"fresh-audio")
+        self.assertTrue(upload_started.wait(5))
+        release_upload.set()
+        list(body)
+        self.assertEqual(self.index.cached(
+            speech_main.audio_index.audio_key("en-US-Neural2-F", "Hi there")
+        ), response.headers["X-Voice-Url"].rsplit("/", 1)[-1])
+
+    def test_cached_clip_returns_url(self):
+        speech_main.speech(make_request({"languageCode": "en"}))
+        self.tts.reset_mock()
+
+        body, status, _ = speech_main.speech(make_request({"responseMode": "stream", "languageCode": "en"}))
+
+        self.assertEqual(status, 200)
+        self.assertIn("speech-bucket", json.loads(body)["voiceUrl"])
+        self.tts.synthesize_speech.assert_not_called()
+
+
+    def test_cached_variant_does_not_wait_for_missing_ones(self):
+        audio_index = speech_main.audio_index
+        self.index._remember(audio_index.audio_key("en-US-Neural2-F", "Hi there"), "speech_en_cached.mp3")
+        started, release = threading.Event(), threading.Event()
+
+        def slow_synthesis(**kwargs):
+            started.set()
+            release.wait(5)
+            return MagicMock(audio_content=b"opus-audio")
+
+        self.tts.synthesize_speech.side_effect = slow_synthesis
+        try:
+            start = time.monotonic()
+            body, status, _ = speech_main.speech(make_request({"responseMode": "stream", "languageCode": "en"}))
+            self.assertLess(time.monotonic() - start, 1)
+        finally:
+            release.set()
+
+        self.assertEqual(status, 200)
+        response = json.loads(body)
+        self.assertTrue(response["voiceUrl"].endswith("speech_en_cached.mp3"))
+        self.assertEqual(list(response["voiceVariants"]), ["mp3"])
+        self.assertTrue(started.wait(5))
+
+if __name__ == "__main__":
+    unittest.main()
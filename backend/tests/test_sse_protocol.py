@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+import unittest
+
+from function_modules import load_function_module
+
+sse_protocol = load_function_module("talk-stream", "sse_protocol")
+
+
+def parse_frames(stream):
+    """Split an SSE stream into (event, id, data) tuples."""
+    frames = []
+    for raw in stream.split("\n\n"):
+        if not raw:
+            continue
+        event, event_id, data = "message", None, None
+        for line in raw.split("\n"):
+            field, _, value = line.partition(": ")
+            if field == "event":
+                event = value
+            elif field == "id":
+                event_id = value
+            elif field == "data":
+                data = json.loads(value)
+        frames.append((event, event_id, data))
+    return frames
+
+
+class TestSseProtocol(unittest.TestCase):
+    def test_negotiation_defaults_to_legacy(self):
+        self.assertEqual(sse_protocol.negotiate_protocol({}, {}), sse_protocol.LEGACY)
+        self.assertEqual(sse_protocol.negotiate_protocol({}, {"sseProtocol": "bogus"}), sse_protocol.LEGACY)
+        self.assertEqual(sse_protocol.negotiate_protocol({"X-SSE-Protocol": "v2"}, {}), sse_protocol.COMPACT)
+        self.assertEqual(sse_protocol.negotiate_protocol({}, {"sseProtocol": "2"}), sse_protocol.COMPACT)
+
+    def test_heartbeat_is_clamped(self):
+        self.assertIsNone(sse_protocol.negotiate_heartbeat({}, {}))
+        self.assertIsNone(sse_protocol.negotiate_heartbeat({}, {"heartbeatSeconds": "abc"}))
+        self.assertEqual(sse_protocol.negotiate_heartbeat({}, {"heartbeatSeconds": 0.1}), 1.0)
+        self.assertEqual(sse_protocol.negotiate_heartbeat({"X-SSE-Heartbeat": "600"}, {}), 60.0)
+
+    def test_legacy_frames_repeat_all_fields(self):
+        framer = sse_protocol.make_framer("v1", "q", {"k": "v"}, "t1", "s1")
+        self.assertEqual(framer.header(), "")
+        frames = parse_frames(framer.delta("Hel") + framer.final("Hello"))
+        self.assertEqual(len(frames), 2)
+        delta, final = frames[0][2], frames[1][2]
+        self.assertEqual(delta["askText"], "q")
+        self.assertEqual(delta["extra"], {"k": "v"})
+        self.assertEqual(delta["replyText"], "Hel")
+        self.assertFalse(delta["isFinal"])
+        self.assertEqual(final["replyText"], "Hello")
+        self.assertTrue(final["isFinal"])
+
+    def test_compact_frames(self):
+        framer = sse_protocol.make_framer("v2", "q", {"k": "v"}, "t1", "s1")
+        stream = framer.header() + framer.delta("Hel") + framer.heartbeat() + framer.delta("lo") + framer.final("Hello")
+        frames = parse_frames(stream)
+        self.assertEqual([f[0] for f in frames], ["header", "delta", "heartbeat", "delta", "final"])
+        header = frames[0][2]
+        self.assertEqual(header["extra"], {"k": "v"})
+        self.assertEqual(header["traceId"], "t1")
+        self.assertEqual(frames[1][2], {"t": "Hel"})
+        self.assertEqual([frames[1][1], frames[3][1]], ["1", "2"])
+        self.assertEqual(frames[4][2]["replyText"], "Hello")
+        self.assertEqual(frames[4][2]["deltas"], 2)
+
+    def test_iter_with_heartbeat_emits_on_idle(self):
+        def slow():
+            time.sleep(0.25)
+            yield "a"
+            yield "b"
+
+        items = list(sse_protocol.iter_with_heartbeat(slow(), 0.05))
+        self.assertIn(None, items)
+        self.assertEqual([i for i in items if i is not None], ["a", "b"])
+
+    def test_iter_with_heartbeat_propagates_errors(self):
+        def broken():
+            yield "a"
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            list(sse_protocol.iter_with_heartbeat(broken(), 0.05))
+
+    def test_iter_with_heartbeat_stops_the_producer_on_disconnect(self):
+        produced, closed = [], threading.Event()
+
+        def endless():
+            try:
+                while True:
+                    produced.append(len(produced))
+                    yield produced[-1]
+            finally:
+                closed.set()
+
+        stream = sse_protocol.iter_with_heartbeat(endless(), 0.05)
+        self.assertEqual([next(stream) for _ in range(3)], [0, 1, 2])
+        stream.close()
+        self.assertTrue(closed.wait(5))
+        # Read-ahead is bounded by the queue, not by the producer
+        self.assertLessEqual(len(produced), sse_protocol.HEARTBEAT_QUEUE_SIZE + 5)
@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from admin_tools import tts_utils
+
+
+class ResourceExhausted(Exception):
+    code = 429
+
+
+def make_job(i, text=None):
+    return tts_utils.TtsJob(
+        job_id=f"job-{i}",
+        text=text or f"Narration {i}.",
+        language_code="en-US",
+        voice=SimpleNamespace(name="en-US-Neural2-F", language_code="en-US"),
+    )
+
+
+class TestSynthesizeBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.journal = os.path.join(self.tmp.name, "journal.jsonl")
+        self.outcomes = {}
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        patcher = patch.object(tts_utils.audio_index, "ensure_audio_variants", side_effect=self.fake_ensure)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_ensure(self, text, voice, bucket, tts_client, language_code, formats=None, index=None):
+        with self.lock:
+            self.calls.append(text)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(0.01)
+            outcome = self.outcomes.get(text)
+            if isinstance(outcome, list):
+                outcome = outcome.pop(0) if outcome else None
+            if outcome:
+                raise outcome
+            return {"mp3": f"speech_{text}.mp3"}
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def run_batch(self, jobs, **kwargs):
+        kwargs.setdefault("base_delay", 0)
+        return tts_utils.synthesize_batch(
+            jobs, "bucket", journal_path=self.journal,
+            tts_client=MagicMock(), storage_client=MagicMock(), **kwargs
+        )
+
+    def test_concurrency_is_bounded(self):
+        results = self.run_batch([make_job(i) for i in range(20)], max_workers=3)
+        self.assertEqual(len(results), 20)
+        self.assertTrue(all(r["status"] == "done" for r in results.values()))
+        self.assertLessEqual(self.peak, 3)
+
+    def test_quota_errors_are_retried(self):
+        self.outcomes["Narration 1."] = [ResourceExhausted("quota"), ResourceExhausted("quota")]
+        results = self.run_batch([make_job(1)])
+        self.assertEqual(results["job-1"]["status"], "done")
+        self.assertEqual(self.calls.count("Narration 1."), 3)
+
+    def test_other_errors_fail_without_retry(self):
+        self.outcomes["Narration 1."] = ValueError("bad voice")
+        results = self.run_batch([make_job(1)])
+        self.assertEqual(results["job-1"]["status"], "failed")
+        self.assertEqual(self.calls.count("Narration 1."), 1)
+
+    def test_rerun_retries_only_failures_and_changed_jobs(self):
+        self.outcomes["Narration 2."] = ValueError("boom")
+        self.run_batch([make_job(i) for i in range(3)])
+        self.outcomes.clear()
+        self.calls.clear()
+
+        results = self.run_batch([make_job(0), make_job(1, "Edited text."), make_job(2)])
+
+        self.assertEqual(sorted(self.calls), ["Edited text.", "Narration 2."])
+        self.assertTrue(all(r["status"] == "done" for r in results.values()))
+        with open(self.journal, encoding="utf-8") as f:
+            self.assertEqual(len([json.loads(line) for line in f]), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import struct
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from function_modules import load_function_module
+
+tts_synth = load_function_module("config", "tts_synth")
+utils = load_function_module("config", "utils")
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, no padding -> 417-byte frames
+FRAME_HEADER = bytes([0xFF, 0xFB, 0x90, 0x00])
+FRAME_LENGTH = 417
+
+
+def silent_frames(count, marker=0):
+    frame = FRAME_HEADER + bytes([marker]) * (FRAME_LENGTH - 4)
+    return frame * count
+
+
+def count_frames(data):
+    frames, markers, pos = 0, [], 0
+    while pos < len(data):
+        length = tts_synth.mp3_frame_length(data[pos:pos + 4])
+        assert length, f"no frame header at offset {pos}"
+        markers.append(data[pos + 4])
+        frames += 1
+        pos += length
+    return frames, markers
+
+
+OPUS_HEAD = b"OpusHead\x01\x01\x38\x01\x80\xbb\x00\x00\x00\x00\x00"
+OPUS_FRAME = 960  # TOC config 19: CELT, 20 ms
+END_TRIM = 100
+
+
+def ogg_page(header_type, granule, serial, sequence, packet):
+    segments = [255] * (len(packet) // 255) + [len(packet) % 255]
+    return struct.pack("<4sBBqIIIB", b"OggS", 0, header_type, granule, serial, sequence, 0,
+                       len(segments)) + bytes(segments) + packet
+
+
+def opus_chunk(serial, marker, packets):
+    """An Ogg Opus file as TTS returns it: its own serial, one packet per page."""
+    pages = [ogg_page(0x02, 0, serial, 0, OPUS_HEAD), ogg_page(0, 0, serial, 1, b"OpusTags")]
+    for i in range(packets):
+        last = i == packets - 1
+        # The encoder trims the padding from the end of the final packet
+        granule = (i + 1) * OPUS_FRAME - (END_TRIM if last else 0)
+        pages.append(ogg_page(0x04 if last else 0, granule, serial, i + 2,
+                              bytes([19 << 3]) + bytes([marker]) * 300))
+    return b"".join(pages)
+
+
+class FakeTTS:
+    """Emits one silent frame per 10 characters, tagged with the chunk index."""
+
+    def __init__(self, chunks, delay=0.0):
+        self.chunks = chunks
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def synthesize_speech(self, input, voice, audio_config):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        text = input.text
+        marker = self.chunks.index(text)
+        # Google TTS may prepend an ID3 tag; stitching must drop it
+        id3 = b"ID3\x04\x00\x00\x00\x00\x00\x02ab"
+        return MagicMock(audio_content=id3 + silent_frames(len(text) // 10 + 1, marker))
+
+
+class TestSplitText(unittest.TestCase):
+    def test_short_text_is_one_chunk(self):
+        self.assertEqual(utils.split_text_for_tts("Hello there."), ["Hello there."])
+
+    def test_chunks_respect_byte_limit_and_cover_text(self):
+        text = " ".join(f"第{i}句话在这里。" for i in range(200))
+        chunks = utils.split_text_for_tts(text, max_bytes=300)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk.encode("utf-8")), 300)
+        self.assertEqual("".join(chunks).replace(" ", ""), text.replace(" ", ""))
+
+    def test_sanitize_keeps_long_text_by_default(self):
+        text = "One sentence. " * 1000
+        self.assertEqual(len(utils.sanitize_text_for_tts(text)), len(text.strip()))
+        self.assertLessEqual(len(utils.sanitize_text_for_tts(text, max_length=100)), 100)
+
+
+@patch.object(tts_synth, "_synthesis_input", lambda text: SimpleNamespace(text=text))
+class TestChunkedSynthesis(unittest.TestCase):
+    def test_long_text_is_stitched_in_order(self):
+        text = " ".join(f"Sentence number {i} of the lecture notes." for i in range(120))
+        chunks = utils.split_text_for_tts(text, max_bytes=400)
+        fake = FakeTTS(chunks, delay=0.01)
+
+        audio = tts_synth.synthesize_text(fake, text, voice=None, audio_config=None, chunk_bytes=400, max_workers=3)
+
+        frames, markers = count_frames(audio)
+        expected = sum(len(c) // 10 + 1 for c in chunks)
+        self.assertEqual(frames, expected)
+        self.assertEqual(markers, sorted(markers))
+        self.assertEqual(set(markers), set(range(len(chunks))))
+        self.assertLessEqual(fake.max_in_flight, 3)
+        self.assertGreater(fake.max_in_flight, 1)
+
+    def test_short_text_is_single_request(self):
+        fake = FakeTTS(["Hi."])
+        audio = tts_synth.synthesize_text(fake, "Hi.", voice=None, audio_config=None)
+        self.assertTrue(audio.startswith(b"ID3"))
+
+    def test_info_frame_is_dropped_when_stitching(self):
+        info = FRAME_HEADER + b"\x00" * 32 + b"Info" + b"\x00" * (FRAME_LENGTH - 40)
+        stitched = tts_synth.stitch_mp3([info + silent_frames(2, 1), info + silent_frames(3, 2)])
+        self.assertEqual(count_frames(stitched), (5, [1, 1, 2, 2, 2]))
+
+
+class TestOggOpusStitching(unittest.TestCase):
+    def test_chunks_become_one_logical_stream(self):
+        parts = [opus_chunk(serial, marker, packets)
+                 for serial, marker, packets in ((11, 1, 3), (22, 2, 40), (33, 3, 2))]
+        stitched = tts_synth.stitch_audio(parts, "OGG_OPUS")
+
+        pages = list(tts_synth.ogg_pages(stitched))
+        self.assertEqual({serial for _, _, serial, _, _ in pages}, {11})
+        flags = [header_type for header_type, _, _, _, _ in pages]
+        self.assertEqual([f & 0x02 for f in flags].count(0x02), 1)
+        self.assertTrue(flags[0] & 0x02)
+        self.assertEqual([bool(f & 0x04) for f in flags], [False] * (len(pages) - 1) + [True])
+
+        pos = 0
+        for sequence, (_, _, _, table, body) in enumerate(pages):
+            page = bytearray(stitched[pos:pos + 27 + len(table) + len(body)])
+            pos += len(page)
+            self.assertEqual(struct.unpack_from("<I", page, 18)[0], sequence)
+            crc = struct.unpack_from("<I", page, 22)[0]
+            struct.pack_into("<I", page, 22, 0)
+            self.assertEqual(tts_synth._ogg_crc(bytes(page)), crc)
+
+        packets, granule = tts_synth._ogg_packets(stitched)
+        self.assertEqual(packets[:2], [OPUS_HEAD, b"OpusTags"])
+        self.assertEqual([p[1] for p in packets[2:]], [1] * 3 + [2] * 40 + [3] * 2)
+        # Granules keep counting across chunks; only the last chunk is trimmed
+        self.assertEqual(granule, 45 * OPUS_FRAME - END_TRIM)
+        granules = [g for _, g, _, _, _ in pages if g != -1]
+        self.assertEqual(granules, sorted(granules))
+
+    def test_single_chunk_is_unchanged(self):
+        part = opus_chunk(7, 1, 2)
+        self.assertIs(tts_synth.stitch_audio([part], "OGG_OPUS"), part)
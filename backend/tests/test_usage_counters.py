@@ -0,0 +1,143 @@
+import unittest
+from unittest.mock import MagicMock
+
+from function_modules import load_function_module
+
+usage_counters = load_function_module("speech", "usage_counters")
+
+
+class FakeDb:
+    """Applies batch writes to a dict of path -> data, summing increments."""
+
+    def __init__(self):
+        self.docs = {}
+        self.commits = 0
+        self.fail = False
+        # Courses whose writes the backend rejects
+        self.rejected = set()
+
+    def collection(self, name):
+        db = self
+
+        class Ref:
+            def __init__(self, path):
+                self.path = tuple(path)
+
+            def document(self, doc_id):
+                return Ref(self.path + (doc_id,))
+
+            def collection(self, sub):
+                return Ref(self.path + (sub,))
+
+            def stream(self):
+                for path, data in list(db.docs.items()):
+                    if len(path) == len(self.path) + 1 and path[:-1] == self.path:
+                        yield MagicMock(id=path[-1], to_dict=MagicMock(return_value=dict(data)))
+
+        return Ref([name])
+
+    def batch(self):
+        writes = []
+        batch = MagicMock()
+        batch.set.side_effect = lambda ref, data, merge=False: writes.append((ref.path, data))
+
+        def commit():
+            if self.fail:
+                raise RuntimeError("deadline exceeded")
+            if any(path[1] in self.rejected for path, _ in writes):
+                raise RuntimeError("invalid argument")
+            self.commits += 1
+            for path, data in writes:
+                doc = self.docs.setdefault(path, {})
+                for field, value in data.items():
+                    doc[field] = doc.get(field, 0) + value if isinstance(value, int) else value
+
+        batch.commit.side_effect = commit
+        return batch
+
+
+class TestUsageCounters(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeDb()
+        self.day = "2026-03-02"
+
+    def make(self, **kwargs):
+        return usage_counters.UsageCounters(lambda: self.db, shards=4, increment=lambda v: v,
+                                            day=lambda: self.day, background=False, **kwargs)
+
+    def test_increments_are_aggregated_locally(self):
+        counters = self.make()
+        for _ in range(50):
+            counters.increment("c1", "requests")
+        counters.increment("c1", "tts_chars", 120)
+        self.assertEqual(self.db.commits, 0)
+
+        self.assertEqual(counters.flush(), 1)
+        self.assertEqual(self.db.commits, 1)
+        shards = [path for path in self.db.docs if "shards" in path]
+        self.assertEqual(len(shards), 1)
+        self.assertEqual(usage_counters.read_usage(self.db, "c1", self.day),
+                         {"requests": 50, "tts_chars": 120})
+        parent = self.db.docs[("courses", "c1", "usage", self.day)]
+        self.assertEqual(parent["shards"], 4)
+
+    def test_reader_sums_shards_across_flushes(self):
+        counters = self.make()
+        for _ in range(20):
+            counters.increment("c1", "llm_calls", 2)
+            counters.flush()
+        self.assertEqual(usage_counters.read_usage(self.db, "c1", self.day), {"llm_calls": 40})
+        shard_ids = {path[-1] for path in self.db.docs if "shards" in path}
+        self.assertTrue(shard_ids <= {"0", "1", "2", "3"})
+
+    def test_courses_and_days_are_kept_apart(self):
+        counters = self.make()
+        counters.increment("c1", "requests")
+        counters.increment(None, "requests")
+        self.day = "2026-03-03"
+        counters.increment("c1", "requests", 3)
+        counters.flush()
+        self.assertEqual(usage_counters.read_usage(self.db, "c1", "2026-03-02"), {"requests": 1})
+        self.assertEqual(usage_counters.read_usage(self.db, "c1", "2026-03-03"), {"requests": 3})
+        self.assertEqual(usage_counters.read_usage(self.db, usage_counters.UNASSIGNED_COURSE, "2026-03-02"),
+                         {"requests": 1})
+
+    def test_failed_flush_keeps_tallies(self):
+        counters = self.make()
+        counters.increment("c1", "requests", 5)
+        self.db.fail = True
+        self.assertEqual(counters.flush(), 0)
+        self.assertEqual(counters.get_metrics()["flush_errors"], 1)
+        counters.increment("c1", "requests", 2)
+        self.db.fail = False
+        counters.flush()
+        self.assertEqual(usage_counters.read_usage(self.db, "c1", self.day), {"requests": 7})
+        self.assertEqual(counters.get_metrics()["pending_keys"], 0)
+
+    def test_invalid_course_ids_are_not_counted(self):
+        counters = self.make()
+        counters.increment("a/b", "requests")
+        counters.increment(" ", "requests")
+        counters.increment("c1", "requests")
+        counters.flush()
+        self.assertEqual(counters.get_metrics()["invalid"], 2)
+        self.assertEqual(usage_counters.read_usage(self.db, "c1", self.day), {"requests": 1})
+
+    def test_failing_course_does_not_hold_back_the_others(self):
+        counters = self.make()
+        self.db.rejected.add("bad")
+        counters.increment("bad", "requests")
+        counters.increment("c1", "requests", 3)
+        self.assertEqual(counters.flush(), 1)
+        self.assertEqual(usage_counters.read_usage(self.db, "c1", self.day), {"requests": 3})
+        metrics = counters.get_metrics()
+        self.assertEqual((metrics["flush_errors"], metrics["pending_keys"]), (2, 1))
+
+        # Only the failing course is retried
+        counters.increment("c1", "requests")
+        self.assertEqual(counters.flush(), 1)
+        self.assertEqual(usage_counters.read_usage(self.db, "c1", self.day), {"requests": 4})
+
+
+if __name__ == "__main__":
+    unittest.main()
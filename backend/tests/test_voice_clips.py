@@ -0,0 +1,85 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from function_modules import load_function_module
+
+goodbye_main = load_function_module("goodbye", "main")
+config_main = load_function_module("config", "main")
+
+
+def make_request(body):
+    request = MagicMock()
+    request.get_json.return_value = body
+    request.headers = {}
+    return request
+
+
+class TestGoodbyeVoiceUrl(unittest.TestCase):
+    def setUp(self):
+        voice_clips = goodbye_main.voice_clips
+        self.tts = MagicMock()
+        self.tts.synthesize_speech.return_value.audio_content = b"audio"
+        voice = MagicMock()
+        voice.name = "en-US-Neural2-F"
+        index = voice_clips.audio_index.AudioIndex(db=MagicMock())
+        index.db.collection.return_value.document.return_value.get.return_value.exists = False
+        patches = [
+            patch.object(goodbye_main, "validate_authentication", return_value=None),
+            patch.object(goodbye_main, "get_versioned_config",
+                         return_value=({"goodbye_messages": {"en": "Bye now"}}, "v1")),
+            patch.object(voice_clips, "get_storage_client", return_value=MagicMock()),
+            patch.object(voice_clips, "get_tts_client", return_value=self.tts),
+            patch.object(voice_clips.course_utils, "get_voice_params", return_value=voice),
+            patch.object(voice_clips.audio_index, "get_index", return_value=index),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_reply_carries_voice_url_and_second_call_is_a_hit(self):
+        with patch.dict("os.environ", {"SPEECH_FILE_BUCKET": "speech-bucket"}):
+            first = json.loads(goodbye_main.goodbye(make_request({"languageCode": "fr"}))[0])
+            calls = self.tts.synthesize_speech.call_count
+            second = json.loads(goodbye_main.goodbye(make_request({"languageCode": "fr"}))[0])
+
+        self.assertEqual(first["replyText"], "Bye now")
+        self.assertTrue(first["voiceUrl"].startswith("https://storage.googleapis.com/speech-bucket/speech_en-US_"))
+        self.assertEqual(first["voiceUrl"], second["voiceUrl"])
+        self.assertEqual(self.tts.synthesize_speech.call_count, calls)
+
+    def test_presynthesis_skips_indexed_clips(self):
+        voice_clips = goodbye_main.voice_clips
+        with patch.dict("os.environ", {"SPEECH_FILE_BUCKET": "speech-bucket"}):
+            self.assertEqual(voice_clips.presynthesize({"en": "Hi", "zh": "你好"}), 2)
+            with patch.object(voice_clips, "get_voice_url", wraps=voice_clips.get_voice_url) as lookup:
+                self.assertEqual(voice_clips.presynthesize({"en": "Hi", "zh": "你好 again"}), 2)
+        # Only the changed message is looked up (and synthesized)
+        self.assertEqual([call.args[0] for call in lookup.call_args_list], ["你好 again"])
+
+    def test_no_bucket_means_text_only(self):
+        with patch.dict("os.environ", {}, clear=True):
+            body = json.loads(goodbye_main.goodbye(make_request({"languageCode": "en"}))[0])
+        self.assertNotIn("voiceUrl", body)
+        self.tts.synthesize_speech.assert_not_called()
+
+
+class TestConfigPresynthesis(unittest.TestCase):
+    def test_presynthesizes_messages_without_audio(self):
+        with patch.dict("os.environ", {"SPEECH_FILE_BUCKET": "speech-bucket"}), \
+                patch.object(config_main.voice_clips, "presynthesize", return_value=1) as presynthesize:
+            config_main._presynthesize_clips({
+                "welcome_messages": {"en": "Hi"},
+                "goodbye_messages": {"en": "Bye"},
+                "presentation_messages": {
+                    "en-US": {"text": "Slide", "audio_url": "https://x/a.mp3"},
+                    "zh-CN": {"text": "幻灯片"},
+                },
+            }, "course-1")
+
+        batches = [call.args[0] for call in presynthesize.call_args_list]
+        self.assertEqual(batches, [{"en": "Hi"}, {"en": "Bye"}, {"zh-CN": {"text": "幻灯片"}}])
+
+
+if __name__ == "__main__":
+    unittest.main()
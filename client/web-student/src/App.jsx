@@ -3,6 +3,10 @@ import { useSearchParams } from 'react-router-dom';
 import { doc, onSnapshot, collection, getDocs } from "firebase/firestore";
 import { db } from "./firebase";
 
+// Prefer the smaller Opus rendition of slide audio where the browser can play it
+const CAN_PLAY_OPUS = typeof Audio !== 'undefined' &&
+    !!new Audio().canPlayType('audio/ogg; codecs=opus');
+
 // --- Icons ---
 const PlayIcon = () => (
     <svg width="24" height="24" viewBox="0 0 24 24" fill="currentColor" xmlns="http://www.w3.org/2000/svg">
@@ -52,8 +56,39 @@ const LiveIcon = () => (
     </svg>
 );
 
+// --- Slide Image Component ---
+// Slide visual: the seeder's responsive variants (`slide_images.srcset`, one
+// srcset per format) when present, else the PNG `slide_link`. The inline
+// placeholder is painted until the chosen file has loaded.
+const SlideImage = ({ url, images, alt, className }) => {
+    const [isLoaded, setIsLoaded] = useState(false);
+    useEffect(() => setIsLoaded(false), [url]);
+
+    const srcset = images?.srcset || {};
+    const placeholderStyle = images?.placeholder && !isLoaded ? {
+        backgroundImage: `url(${images.placeholder})`,
+        backgroundSize: 'cover',
+        aspectRatio: `${images.width} / ${images.height}`,
+        width: '100%',
+    } : undefined;
+
+    return (
+        <picture className="slide-picture">
+            {srcset.avif && <source type="image/avif" srcSet={srcset.avif} sizes="100vw" />}
+            {srcset.webp && <source type="image/webp" srcSet={srcset.webp} sizes="100vw" />}
+            <img
+                src={url}
+                alt={alt}
+                className={className}
+                style={placeholderStyle}
+                onLoad={() => setIsLoaded(true)}
+            />
+        </picture>
+    );
+};
+
 // --- FullScreen Slide Component ---
-const FullScreenSlide = ({ slideUrl, text, onClose, onNext, onPrev, hasNext, hasPrev, isPlaying, onTogglePlay }) => {
+const FullScreenSlide = ({ slideUrl, slideImages, text, onClose, onNext, onPrev, hasNext, hasPrev, isPlaying, onTogglePlay }) => {
     const [isSubtitleVisible, setIsSubtitleVisible] = useState(true);
 
     return (
@@ -75,10 +110,11 @@ const FullScreenSlide = ({ slideUrl, text, onClose, onNext, onPrev, hasNext, has
 
             <div className="fullscreen-content" onClick={(e) => { e.stopPropagation(); onTogglePlay(); }}>
                 {slideUrl ? (
-                                                                    <img
-                        src={slideUrl} 
+                    <SlideImage
+                        url={slideUrl}
+                        images={slideImages}
                         alt="Presentation Slide"
-                        className="fullscreen-image" 
+                        className="fullscreen-image"
                     />
                 ) : (
                     <div className="fullscreen-placeholder">
@@ -351,7 +387,8 @@ function App() {
   // If Sync is ON: Play LIVE audio (from listenLang)
   // If Sync is OFF: Play Viewing Slide audio (from listenLang)
   const activeAudioContent = isLiveMode ? liveContentAudio : viewingContentAudio;
-  const activeAudioUrl = activeAudioContent?.audio_url;
+  const activeAudioUrl = (CAN_PLAY_OPUS && activeAudioContent?.audio_variants?.opus) ||
+      activeAudioContent?.audio_url;
 
   // --- 5. Audio Player Logic ---
   useEffect(() => {
@@ -431,7 +468,9 @@ function App() {
   }
 
   // Priority: Viewing Slide Registry > Live Data (fallback if visual matches)
-  const visualUrl = viewingContentView?.slide_link || (isLiveMode && String(viewingSlideId) === String(liveSlideId) ? liveContentView?.slide_link : null);
+  const visualView = viewingContentView?.slide_link ? viewingContentView : (isLiveMode && String(viewingSlideId) === String(liveSlideId) ? liveContentView : null);
+  const visualUrl = visualView?.slide_link || null;
+  const visualImages = visualView?.slide_images || null;
   
   // Text priority: Viewing Slide text (if browsing) -> Live text (if live)
   // This ensures text matches the audio language
@@ -446,6 +485,7 @@ function App() {
       {isFullScreen && (
           <FullScreenSlide 
               slideUrl={visualUrl} 
+              slideImages={visualImages}
               text={displayText}
               onClose={() => setIsFullScreen(false)}
               onNext={handleNext}
@@ -579,7 +619,7 @@ function App() {
       <div className="main-stage">
           <div className="slide-container" onClick={() => setIsFullScreen(true)}>
             {visualUrl ? (
-                <img src={visualUrl} alt="Current Slide" className="main-slide-image" />
+                <SlideImage url={visualUrl} images={visualImages} alt="Current Slide" className="main-slide-image" />
             ) : (
                 <div className="slide-placeholder">
                     <p>No Slide Image Available</p>